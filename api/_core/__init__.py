@@ -0,0 +1 @@
+"""Núcleo compartido por las funciones de api/ (indicadores, upstream, cachés)."""
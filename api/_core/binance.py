@@ -0,0 +1,168 @@
+"""Hosts de Binance y fetch JSON con fallback compartidos por api/."""
+import contextvars
+import os
+import threading
+import time
+import urllib.error
+
+from . import metrics
+from .hosts import registry as health
+from .lazy import lazy_import
+from .upstream import client, timeout_for
+
+# Diferido: prices/symbols/klines no lanzan nada en paralelo
+futures = lazy_import('concurrent.futures')
+
+# Presupuesto total (s) de una cadena de fallback, para no encadenar 6 timeouts
+FALLBACK_BUDGET = 15.0
+# Hedging opcional: ms de espera antes de disparar un segundo host (0 = apagado)
+HEDGE_MS = int(os.environ.get('UPSTREAM_HEDGE_MS', '0'))
+HEDGE_WORKERS = 8
+# Pool compartido para lanzar fetches en paralelo (klines + tickers, batch, scan)
+IO_WORKERS = int(os.environ.get('UPSTREAM_IO_WORKERS', '16'))
+
+_pool = None
+_io_pool = None
+_pool_lock = threading.Lock()
+
+# Binance FUTURES endpoints (USD-M)
+FUTURES_HOSTS = [
+    "fapi.binance.com",
+]
+
+# Fallback: Spot API
+SPOT_HOSTS = [
+    "api.binance.com",
+    "api1.binance.com",
+    "api2.binance.com",
+    "api3.binance.com",
+    "api4.binance.com",
+    "data-api.binance.vision",
+]
+
+HOSTS = {'futures': FUTURES_HOSTS, 'spot': SPOT_HOSTS}
+
+
+def _is_host_failure(e):
+    """4xx de negocio (p.ej. símbolo inválido) no cuentan contra el host"""
+    if isinstance(e, urllib.error.HTTPError):
+        return e.code >= 500 or e.code in (418, 429)
+    return True
+
+
+def _attempt(host, path, timings, timeout):
+    if not health.begin(host):
+        raise urllib.error.URLError(f'{host}: ya hay un intento de prueba en curso')
+    t0 = time.perf_counter()
+    try:
+        data = client.get_json(host, path, timeout)
+    except Exception as e:
+        health.record(host, time.perf_counter() - t0, not _is_host_failure(e))
+        metrics.upstream(host, time.perf_counter() - t0, False)
+        if timings is not None:
+            timings.append(timing(host, path, t0, False))
+        raise
+    health.record(host, time.perf_counter() - t0, True)
+    metrics.upstream(host, time.perf_counter() - t0, True)
+    if timings is not None:
+        timings.append(timing(host, path, t0, True))
+    return data
+
+
+def _hedge_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = futures.ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='hedge')
+    return _pool
+
+
+def io_pool():
+    """Executor compartido para fetches concurrentes; sus tareas no deben
+    esperar a otras tareas del mismo pool"""
+    global _io_pool
+    if _io_pool is None:
+        with _pool_lock:
+            if _io_pool is None:
+                _io_pool = futures.ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='upstream-io')
+    return _io_pool
+
+
+def submit(fn, *args, **kwargs):
+    # Con el contexto del llamador: las métricas de su request siguen al thread
+    return io_pool().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _fetch_hedged(hosts, path, timings, timeout, budget):
+    """Dispara el siguiente host si el actual no respondió en `budget` segundos
+    (máximo 2 en vuelo); devuelve la primera respuesta válida. Como la cadena
+    sin hedging, no pasa de FALLBACK_BUDGET en total."""
+    pool = _hedge_pool()
+    remaining = iter(hosts)
+    pending = set()
+    last_error = None
+    deadline = time.monotonic() + FALLBACK_BUDGET
+    timeout = timeout or timeout_for(path)
+
+    def launch():
+        left = deadline - time.monotonic()
+        host = next(remaining, None) if left > 0 else None
+        if host is not None:
+            pending.add(pool.submit(contextvars.copy_context().run,
+                                    _attempt, host, path, timings, min(timeout, left)))
+
+    launch()
+    while pending:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            break
+        done, _ = futures.wait(pending, timeout=min(budget, left), return_when=futures.FIRST_COMPLETED)
+        if not done:
+            if len(pending) < 2:
+                launch()
+            continue
+        for f in done:
+            pending.discard(f)
+            try:
+                return f.result()
+            except Exception as e:
+                last_error = e
+                launch()
+    # Los intentos que sigan en vuelo vencen solos: su timeout no pasa del deadline
+    raise last_error or urllib.error.URLError('Presupuesto de fallback agotado')
+
+
+def fetch_json(hosts, path, timings=None, timeout=None, hedge_ms=None):
+    """Intenta múltiples hosts de Binance hasta que uno responda.
+
+    Usa el cliente keep-alive compartido; timeout=None aplica el del endpoint.
+    Los hosts se ordenan por salud y se saltean los de circuito abierto; la
+    cadena de fallback completa no excede FALLBACK_BUDGET. Con hedge_ms (o
+    UPSTREAM_HEDGE_MS) se lanza un segundo host si el primero tarda más.
+    Si se pasa `timings` (list), agrega la latencia de cada intento.
+    """
+    candidates = health.order(hosts)
+    if not candidates:
+        raise urllib.error.URLError(f'Circuito abierto para {", ".join(hosts)}')
+    hedge_ms = HEDGE_MS if hedge_ms is None else hedge_ms
+    if hedge_ms and len(candidates) > 1:
+        return _fetch_hedged(candidates, path, timings, timeout, hedge_ms / 1000)
+
+    deadline = time.monotonic() + FALLBACK_BUDGET
+    last_error = None
+    for host in candidates:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            break
+        try:
+            return _attempt(host, path, timings, min(timeout or timeout_for(path), left))
+        except Exception as e:
+            last_error = e
+            continue
+    raise last_error or urllib.error.URLError('Presupuesto de fallback agotado')
+
+
+def timing(host, path, t0, ok):
+    return {'host': host, 'path': path.split('?')[0],
+            'ms': round((time.perf_counter() - t0) * 1000, 1), 'ok': ok}
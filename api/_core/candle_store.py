@@ -0,0 +1,337 @@
+"""Store local de velas cerradas: un archivo columnar mapeado en memoria por
+symbol/interval.
+
+Layout (little-endian): header de 64 bytes y después una región por
+columna (t, o, h, l, c, v, trades) de `capacity` valores de 8 bytes. Las
+velas se agregan al final de cada columna; cuando se llena la capacidad se
+reescribe el archivo con el doble. Las lecturas devuelven memoryviews
+sobre el mmap (sin copiar) y se ubican por búsqueda binaria sobre `t`.
+
+Cada archivo guarda un solo tramo contiguo [floor_t, última vela] de una
+fuente (futures o spot, en el header). Un llenado baja como mucho las velas
+de la página pedida; si la página no toca el tramo guardado, el archivo se
+reemplaza por ella en vez de llenar el hueco entero.
+
+Solo se guardan velas cerradas: son inmutables. La vela abierta sigue
+saliendo de kline_cache. "Cerrada" se mide sobre la grilla de Binance
+(kline_cache.candle_open), no sobre múltiplos del intervalo desde el epoch:
+las semanales abren los lunes.
+
+Los llenados bajan de upstream sin tomar el lock del archivo; el lock solo
+cubre leer el estado y escribir las filas. Si otro thread cambió el archivo
+mientras tanto, el llenado se vuelve a planificar sobre lo nuevo.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from . import binance
+from .kline_cache import INTERVAL_MS, KLINE_PATHS, candle_open
+
+STORE_DIR = os.environ.get('CANDLE_STORE_DIR', '/tmp/candle-store')
+
+MAGIC = b'CST1'
+HEADER = struct.Struct('<4sIqqqqq')  # magic, source, count, capacity, interval_ms, floor_t, reserved
+HEADER_SIZE = 64
+COLUMNS = (('t', 'q'), ('o', 'd'), ('h', 'd'), ('l', 'd'), ('c', 'd'), ('v', 'd'), ('trades', 'q'))
+SOURCES = ('futures', 'spot')
+INITIAL_CAPACITY = 1024
+PAGE_LIMIT = 1000       # filas por request a Binance
+MAX_PAGES = 50          # tope de páginas por llenado
+MAX_REPLANS = 3         # llenados que pisó otro thread antes de rendirse
+
+
+class CandleView:
+    """Rango [start, stop) de un CandleFile; las columnas son memoryviews"""
+
+    def __init__(self, cf, start, stop):
+        self.source = cf.source
+        self.start = start
+        self.stop = stop
+        self._cols = {name: cf.column(name, start, stop) for name, _ in COLUMNS}
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, name):
+        return self._cols[name]
+
+    def array(self, name):
+        """Columna como ndarray sin copia (requiere NumPy)"""
+        import numpy as np
+        col = self._cols[name]
+        return np.frombuffer(col, dtype=np.int64 if col.format == 'q' else np.float64)
+
+
+class CandleFile:
+    def __init__(self, path, interval_ms, source='futures'):
+        self.path = path
+        self.lock = threading.RLock()
+        if not os.path.exists(path):
+            self._create(path, INITIAL_CAPACITY, interval_ms, source)
+        self._open()
+
+    @staticmethod
+    def _create(path, capacity, interval_ms, source, floor_t=0):
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, SOURCES.index(source), 0, capacity, interval_ms, floor_t, 0)
+                    .ljust(HEADER_SIZE, b'\0'))
+            f.truncate(HEADER_SIZE + capacity * 8 * len(COLUMNS))
+        os.replace(tmp, path)
+
+    def _open(self):
+        with open(self.path, 'r+b') as f:
+            # No se cierra el mmap anterior: puede haber memoryviews vivas apuntándolo
+            self._mm = mmap.mmap(f.fileno(), 0)
+        magic, source, count, capacity, interval_ms, floor_t, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f'Archivo de velas inválido: {self.path}')
+        self.source = SOURCES[source]
+        self.count = count
+        self.capacity = capacity
+        self.interval_ms = interval_ms
+        self.floor_t = floor_t
+
+    def _write_header(self):
+        HEADER.pack_into(self._mm, 0, MAGIC, SOURCES.index(self.source), self.count,
+                         self.capacity, self.interval_ms, self.floor_t, 0)
+
+    def _offset(self, col_index, row):
+        return HEADER_SIZE + (col_index * self.capacity + row) * 8
+
+    def column(self, name, start=0, stop=None):
+        stop = self.count if stop is None else stop
+        i = [c[0] for c in COLUMNS].index(name)
+        mv = memoryview(self._mm)[self._offset(i, start):self._offset(i, stop)]
+        return mv.cast(COLUMNS[i][1])
+
+    def first_t(self):
+        return self.column('t', 0, 1)[0] if self.count else None
+
+    def last_t(self):
+        return self.column('t', self.count - 1, self.count)[0] if self.count else None
+
+    def _rewrite(self, capacity, prefix=()):
+        """Copiar a un archivo nuevo de `capacity` filas, con `prefix` adelante"""
+        n_pre = len(prefix)
+        old = self
+        tmp = f"{self.path}.grow"
+        self._create(tmp, capacity, self.interval_ms, self.source, self.floor_t)
+        with open(tmp, 'r+b') as f:
+            mm = mmap.mmap(f.fileno(), 0)
+            for ci, (name, fmt) in enumerate(COLUMNS):
+                base = HEADER_SIZE + ci * capacity * 8
+                if n_pre:
+                    struct.pack_into(f'<{n_pre}{fmt}', mm, base, *[_field(r, ci) for r in prefix])
+                src = old._offset(ci, 0)
+                mm[base + n_pre * 8:base + (n_pre + old.count) * 8] = old._mm[src:src + old.count * 8]
+            HEADER.pack_into(mm, 0, MAGIC, SOURCES.index(self.source), n_pre + old.count,
+                             capacity, self.interval_ms, self.floor_t, 0)
+            mm.flush()
+            mm.close()
+        os.replace(tmp, self.path)
+        self._open()
+
+    def append(self, rows):
+        """Agregar filas crudas de Binance (ya ordenadas, posteriores a last_t)"""
+        if not rows:
+            return
+        with self.lock:
+            if self.count + len(rows) > self.capacity:
+                cap = self.capacity
+                while cap < self.count + len(rows):
+                    cap *= 2
+                self._rewrite(cap)
+            n = len(rows)
+            for ci, (name, fmt) in enumerate(COLUMNS):
+                struct.pack_into(f'<{n}{fmt}', self._mm, self._offset(ci, self.count),
+                                 *[_field(r, ci) for r in rows])
+            self.count += n
+            self._write_header()
+
+    def prepend(self, rows):
+        """Backfill hacia atrás: reescribe el archivo (poco frecuente)"""
+        with self.lock:
+            cap = self.capacity
+            while cap < self.count + len(rows):
+                cap *= 2
+            self._rewrite(cap, rows)
+
+    def reset(self, rows, floor_t, source=None):
+        """Reemplazar el contenido por `rows` (y opcionalmente la fuente)"""
+        with self.lock:
+            # Las memoryviews del mmap anterior siguen siendo válidas: _open no lo cierra
+            self._create(self.path, INITIAL_CAPACITY, self.interval_ms, source or self.source, floor_t)
+            self._open()
+            self.append(rows)
+
+    def state(self):
+        """Firma del contenido: cambia con cualquier escritura"""
+        return self.source, self.count, self.floor_t, self.first_t(), self.last_t()
+
+    def set_floor(self, t):
+        with self.lock:
+            self.floor_t = t
+            self._write_header()
+
+    def index_range(self, start_t, end_t):
+        t = self.column('t')
+        return bisect_left(t, start_t), bisect_right(t, end_t)
+
+    def view(self, start, stop):
+        return CandleView(self, start, stop)
+
+
+def _last_closed(interval):
+    """Open time de la última vela cerrada de `interval`"""
+    return candle_open(interval, int(time.time() * 1000)) - INTERVAL_MS[interval]
+
+
+def _field(row, ci):
+    v = row[ci if ci < 6 else 8]
+    return int(v) if COLUMNS[ci][1] == 'q' else float(v)
+
+
+class CandleStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def file(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            cf = self._files.get(key)
+            if cf is None:
+                os.makedirs(self.root, exist_ok=True)
+                path = os.path.join(self.root, f"{symbol}_{interval}.bin")
+                cf = self._files[key] = CandleFile(path, INTERVAL_MS[interval])
+            return cf
+
+    def _fetch(self, source, query, fallback):
+        """(filas, fuente); con fallback, Spot si Futures no tiene el par"""
+        try:
+            return binance.fetch_json(binance.HOSTS[source], f"{KLINE_PATHS[source]}{query}"), source
+        except Exception:
+            if not fallback or source == 'spot':
+                raise
+            return binance.fetch_json(binance.HOSTS['spot'], f"{KLINE_PATHS['spot']}{query}"), 'spot'
+
+    def _fetch_range(self, source, symbol, interval, start_t, end_t, max_rows, fallback):
+        """(filas, fuente) con las primeras `max_rows` velas cerradas de
+        [start_t, end_t], paginando de a PAGE_LIMIT"""
+        iv = INTERVAL_MS[interval]
+        now_ms = int(time.time() * 1000)
+        out = []
+        for _ in range(min(MAX_PAGES, -(-max_rows // PAGE_LIMIT))):
+            if start_t > end_t:
+                break
+            page = min(PAGE_LIMIT, max_rows - len(out))
+            query = (f"?symbol={symbol}USDT&interval={interval}"
+                     f"&startTime={start_t}&endTime={end_t}&limit={page}")
+            rows, source = self._fetch(source, query, fallback)
+            fallback = False  # las páginas siguientes, de la fuente que respondió
+            rows = [r for r in rows if r[0] + iv <= now_ms]
+            if not rows:
+                break
+            out.extend(rows)
+            if len(rows) < page:
+                break
+            start_t = rows[-1][0] + iv
+        return out, source
+
+    @staticmethod
+    def _plan(cf, start_t, end_t, limit):
+        """(desde, máximo de filas) a bajar para la página, o None si ya está"""
+        if cf.count == 0 or start_t < cf.floor_t or start_t > cf.last_t() + cf.interval_ms:
+            return start_t, limit
+        # La página arranca dentro del tramo: faltan a lo sumo `limit` velas después de last
+        last = cf.last_t()
+        stored = cf.count - bisect_left(cf.column('t'), start_t)
+        if stored < limit and end_t > last:
+            return last + cf.interval_ms, limit - stored
+        return None
+
+    @staticmethod
+    def _apply(cf, start_t, end_t, rows, source):
+        """Escribir lo bajado según _plan (con cf.lock tomado)"""
+        iv = cf.interval_ms
+        if cf.count == 0 or source != cf.source:
+            # Archivo vacío (o Futures no tenía el par): la fuente va al header
+            cf.reset(rows, start_t, source)
+            return
+        first, last = cf.first_t(), cf.last_t()
+        if start_t >= cf.floor_t and start_t <= last + iv:
+            cf.append([r for r in rows if r[0] > last])
+        elif not rows:
+            if start_t < cf.floor_t and end_t >= first - iv:
+                cf.set_floor(start_t)  # Binance no tiene velas antes del tramo
+        elif start_t > last + iv or rows[-1][0] < first - iv:
+            # La página no toca el tramo guardado: se reemplaza por ella
+            cf.reset(rows, start_t)
+        else:
+            cf.prepend([r for r in rows if r[0] < first])
+            cf.append([r for r in rows if r[0] > last])
+            cf.set_floor(start_t)
+
+    def ensure(self, symbol, interval, start_t, end_t, limit, source=None):
+        """Completar desde upstream lo que falte de las primeras `limit` velas de [start_t, end_t].
+
+        Con `source`, un archivo de otra fuente se descarta y se vuelve a
+        bajar de esa (sin fallback a la otra).
+        """
+        cf = self.file(symbol, interval)
+        end_t = min(end_t, _last_closed(interval))
+        start_t = candle_open(interval, start_t)
+        for _ in range(MAX_REPLANS):
+            with cf.lock:
+                if source is not None and cf.source != source:
+                    cf.reset([], 0, source)
+                if start_t > end_t:
+                    return cf
+                plan = self._plan(cf, start_t, end_t, limit)
+                if plan is None:
+                    return cf
+                state = cf.state()
+            # Sin el lock: los lectores no esperan a upstream
+            rows, got = self._fetch_range(state[0], symbol, interval, plan[0], end_t, plan[1],
+                                          source is None and state[1] == 0)
+            with cf.lock:
+                if cf.state() == state:
+                    self._apply(cf, start_t, end_t, rows, got)
+                    return cf
+        return cf
+
+    def range(self, symbol, interval, start_t, end_t, limit):
+        """(CandleView, next_start_t) de hasta `limit` velas en [start_t, end_t].
+
+        Solo se baja de upstream lo que entra en esta página: next_start_t
+        (X-Next-Start-Time) sigue con la próxima aunque todavía no esté en el store.
+        """
+        cf = self.ensure(symbol, interval, start_t, end_t, limit)
+        iv = cf.interval_ms
+        closed_end = min(end_t, _last_closed(interval))
+        with cf.lock:
+            i, j = cf.index_range(start_t, end_t)
+            stop = min(j, i + limit)
+            if stop < j:
+                nxt = cf.column('t', stop, stop + 1)[0]
+            elif stop - i >= limit and cf.column('t', stop - 1, stop)[0] < closed_end:
+                nxt = cf.column('t', stop - 1, stop)[0] + iv
+            else:
+                nxt = None
+            return cf.view(i, stop), nxt
+
+    def tail(self, symbol, interval, n, source=None):
+        """Últimas `n` velas cerradas (de `source` si se indica)"""
+        start_t = _last_closed(interval) - (n - 1) * INTERVAL_MS[interval]
+        cf = self.ensure(symbol, interval, start_t, int(time.time() * 1000), n, source)
+        with cf.lock:
+            return cf.view(max(0, cf.count - n), cf.count)
+
+
+store = CandleStore()
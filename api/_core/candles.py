@@ -0,0 +1,137 @@
+"""Velas en columnas: CandleSeries.
+
+Cada campo (t, o, h, l, c, v, trades) vive en un buffer contiguo de 8 bytes
+por valor (array('q') / array('d'), o memoryviews del candle store): 56
+bytes por vela contra ~700 de una fila JSON de Binance (lista de 12 con
+strings). Se arma en una pasada desde las filas de /klines y después:
+
+- series['c'] es una memoryview de la columna, sin copia;
+- series[-100:] es otra serie sobre los mismos buffers, sin copia;
+- series.array('c') es un ndarray sobre el mismo buffer (requiere NumPy);
+- series[-1] es la vela como dict {'t', 'o', ..., 'trades'}.
+
+Los buffers no se modifican después de construidos: kline_cache arma una
+serie nueva en cada refresh, así quien tenga la anterior no ve cambios.
+"""
+from array import array
+from operator import itemgetter
+
+from .rolling import np
+
+COLUMNS = (('t', 'q'), ('o', 'd'), ('h', 'd'), ('l', 'd'), ('c', 'd'), ('v', 'd'), ('trades', 'q'))
+NAMES = tuple(name for name, _ in COLUMNS)
+KLINE_FIELDS = (0, 1, 2, 3, 4, 5, 8)  # posición de cada columna en una fila de /klines
+
+
+class MalformedKlines(ValueError):
+    """Filas de /klines que no tienen la forma esperada"""
+
+
+def _buffer(code, values):
+    """array(code) con `values` (copia de memcpy si ya es un buffer del mismo tipo)"""
+    if isinstance(values, (array, memoryview)) and values.itemsize == 8:
+        arr = array(code)
+        arr.frombytes(memoryview(values).cast('B'))
+        return arr
+    return array(code, values)
+
+
+class CandleSeries:
+    __slots__ = ('_cols', '_start', '_stop')
+
+    def __init__(self, cols, start=0, stop=None):
+        self._cols = cols  # nombre -> buffer de la longitud total
+        self._start = start
+        self._stop = len(cols['t']) if stop is None else stop
+
+    # === CONSTRUCCIÓN ===
+
+    @classmethod
+    def from_klines(cls, rows):
+        """Serie desde las filas crudas de /klines: una pasada en C por columna, sin dicts intermedios"""
+        if not rows:
+            return cls.empty()
+        try:
+            cols = {}
+            for (name, code), i in zip(COLUMNS, KLINE_FIELDS):
+                values = map(itemgetter(i), rows)
+                # El open time ya llega como int; precios, volumen y trades pueden ser strings
+                cols[name] = array(code, values if name == 't' else map(int if code == 'q' else float, values))
+        except (IndexError, ValueError, TypeError, OverflowError) as e:
+            raise MalformedKlines(f'Datos de klines malformados: {str(e)}') from None
+        return cls(cols)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Serie desde {nombre: valores}; columnas ausentes quedan en 0"""
+        n = len(next(iter(columns.values()))) if columns else 0
+        return cls({name: _buffer(code, columns[name]) if name in columns else array(code, bytes(8 * n))
+                    for name, code in COLUMNS})
+
+    @classmethod
+    def from_candles(cls, candles):
+        """Serie desde velas dict {'o', 'h', 'l', 'c', 'v'} (el formato anterior)"""
+        keys = [k for k in NAMES if candles and k in candles[0]]
+        return cls.from_columns({k: [c[k] for c in candles] for k in keys})
+
+    @classmethod
+    def coerce(cls, candles):
+        return candles if isinstance(candles, cls) else cls.from_candles(candles)
+
+    @classmethod
+    def empty(cls):
+        return cls({name: array(code) for name, code in COLUMNS})
+
+    @classmethod
+    def concat(cls, parts):
+        """Serie nueva (copiada) con las velas de `parts` en orden"""
+        cols = {}
+        for name, code in COLUMNS:
+            arr = cols[name] = array(code)
+            for part in parts:
+                arr.frombytes(part[name].cast('B'))
+        return cls(cols)
+
+    def compact(self):
+        """La misma serie sin retener el resto de los buffers compartidos"""
+        if (self._start == 0 and self._stop == len(self._cols['t'])
+                and all(isinstance(col, array) for col in self._cols.values())):
+            return self
+        return CandleSeries({name: _buffer(code, self[name]) for name, code in COLUMNS})
+
+    # === ACCESO ===
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return memoryview(self._cols[key])[self._start:self._stop]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError('CandleSeries solo admite slices contiguos')
+            return CandleSeries(self._cols, self._start + start, self._start + max(start, stop))
+        i = range(self._start, self._stop)[key]
+        return {name: self._cols[name][i] for name in NAMES}
+
+    def __iter__(self):
+        for i in range(self._start, self._stop):
+            yield {name: self._cols[name][i] for name in NAMES}
+
+    def array(self, name):
+        """Columna como ndarray sin copia (requiere NumPy)"""
+        col = self[name]
+        return np.frombuffer(col, dtype=np.int64 if col.format == 'q' else np.float64)
+
+    @property
+    def nbytes(self):
+        """Bytes de los buffers que retiene la serie (incluye lo que queda fuera del slice)"""
+        return sum(memoryview(col).nbytes for col in self._cols.values())
+
+    def __reduce__(self):
+        # Al picklear (p.ej. a otro proceso) viaja solo el tramo visible
+        return CandleSeries, (self.compact()._cols,)
+
+    def __repr__(self):
+        return f'<CandleSeries {len(self)} velas>'
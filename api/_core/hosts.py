@@ -0,0 +1,131 @@
+"""Salud de hosts upstream: latencia EWMA, tasa de error y circuit breaker.
+
+order(hosts) devuelve los hosts utilizables, primero los más rápidos y
+sanos; los que tienen el circuito abierto se saltean hasta que vence su
+cooldown, y entonces se permite un único intento de prueba (half-open).
+El intento de prueba se reserva con begin() recién cuando arranca: que un
+host half-open aparezca en un orden que después no llega a usarse no gasta
+la ventana de prueba.
+"""
+import threading
+import time
+
+ALPHA = 0.3              # peso de la última muestra en las EWMA
+FAILURE_THRESHOLD = 3    # fallos seguidos para abrir el circuito
+COOLDOWN = 15.0          # segundos con el circuito abierto (se duplica en cada reapertura)
+MAX_COOLDOWN = 240.0
+PROBE_WINDOW = 10.0      # un solo intento half-open por ventana
+ERROR_PENALTY = 4.0      # score = latencia * (1 + ERROR_PENALTY * tasa_error)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class HostHealth:
+    def __init__(self, host):
+        self.host = host
+        self.latency = None     # EWMA en segundos
+        self.error_rate = 0.0   # EWMA de 0/1
+        self.samples = 0
+        self.failures = 0       # consecutivos
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.cooldown = COOLDOWN
+        self.probe_started = None
+
+    def score(self):
+        if self.latency is None:
+            return None
+        return self.latency * (1 + ERROR_PENALTY * self.error_rate)
+
+    def as_dict(self):
+        return {
+            'state': self.state,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'samples': self.samples,
+            'consecutive_failures': self.failures,
+        }
+
+
+class HostRegistry:
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _get(self, host):
+        h = self._hosts.get(host)
+        if h is None:
+            h = self._hosts[host] = HostHealth(host)
+        return h
+
+    def order(self, hosts):
+        """Hosts utilizables ordenados por score; el orden original desempata"""
+        now = time.monotonic()
+        usable = []
+        with self._lock:
+            for i, host in enumerate(hosts):
+                h = self._get(host)
+                if h.state == OPEN:
+                    if now < h.open_until:
+                        continue
+                    h.state = HALF_OPEN
+                    h.probe_started = None
+                if h.state == HALF_OPEN and self._probing(h, now):
+                    continue
+                score = h.score()
+                usable.append((score is None, score or 0.0, i, host))
+        usable.sort()
+        return [u[3] for u in usable]
+
+    @staticmethod
+    def _probing(h, now):
+        return h.probe_started is not None and now - h.probe_started < PROBE_WINDOW
+
+    def begin(self, host):
+        """Marcar el comienzo de un intento; False si `host` está half-open y
+        otro intento ya tomó la prueba de esta ventana"""
+        now = time.monotonic()
+        with self._lock:
+            h = self._get(host)
+            if h.state != HALF_OPEN:
+                return True
+            if self._probing(h, now):
+                return False
+            h.probe_started = now
+            return True
+
+    def record(self, host, latency, ok):
+        with self._lock:
+            h = self._get(host)
+            h.samples += 1
+            h.error_rate = ALPHA * (0.0 if ok else 1.0) + (1 - ALPHA) * h.error_rate
+            if ok:
+                h.latency = latency if h.latency is None else ALPHA * latency + (1 - ALPHA) * h.latency
+                h.failures = 0
+                h.state = CLOSED
+                h.cooldown = COOLDOWN
+                h.probe_started = None
+                return
+            h.failures += 1
+            if h.state == HALF_OPEN:
+                h.cooldown = min(h.cooldown * 2, MAX_COOLDOWN)
+                self._open(h)
+            elif h.failures >= FAILURE_THRESHOLD:
+                self._open(h)
+
+    @staticmethod
+    def _open(h):
+        h.state = OPEN
+        h.probe_started = None
+        h.open_until = time.monotonic() + h.cooldown
+
+    def snapshot(self):
+        with self._lock:
+            return {host: h.as_dict() for host, h in self._hosts.items()}
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
+
+
+registry = HostRegistry()
@@ -0,0 +1,78 @@
+"""Series de indicadores sobre columnas OHLCV.
+
+Trabaja sobre columnas contiguas float64 (o/h/l/c/v) y devuelve la serie
+completa alineada con las velas de entrada: las posiciones de calentamiento
+quedan en NaN. Las series cortas (o sin NumPy instalado) se calculan con
+listas de Python con exactamente la misma semántica; ver rolling.vectorized().
+
+Solo están las series que analyze.py usa (stochastic()). Las recursiones de
+EMA y Wilder viven en las funciones escalares de analyze.py y, para una vela
+por vez, en streaming.py; tests/test_indicators.py y tests/test_streaming.py
+comparan las dos contra las fórmulas base.
+"""
+import math
+from collections import namedtuple
+
+from .candles import CandleSeries
+from .rolling import np, rolling_max, rolling_min, vectorized
+
+NAN = float('nan')
+
+OHLCV = namedtuple('OHLCV', ['o', 'h', 'l', 'c', 'v'])
+
+
+# === CONVERSIÓN ===
+
+def as_array(values):
+    """Columna float64 contigua (ndarray si la serie se vectoriza, si no list)"""
+    if vectorized(len(values)):
+        return np.ascontiguousarray(values, dtype=np.float64)
+    return [float(x) for x in values]
+
+
+def columns(candles):
+    """Columnas OHLCV de una CandleSeries o de velas {'o','h','l','c','v'}"""
+    if isinstance(candles, CandleSeries):
+        return OHLCV(*(as_array(candles[k]) for k in OHLCV._fields))
+    return OHLCV(
+        as_array([c['o'] for c in candles]),
+        as_array([c['h'] for c in candles]),
+        as_array([c['l'] for c in candles]),
+        as_array([c['c'] for c in candles]),
+        as_array([c['v'] for c in candles]),
+    )
+
+
+def _nan(n):
+    if vectorized(n):
+        return np.full(n, np.nan)
+    return [NAN] * n
+
+
+def _tolist(values):
+    return values if isinstance(values, list) else values.tolist()
+
+
+# === SERIES ===
+
+def stochastic_series(high, low, close, k_period=14, d_period=3):
+    c = as_array(close)
+    n = len(c)
+    hh = rolling_max(high, k_period)
+    ll = rolling_min(low, k_period)
+    if vectorized(n):
+        rng = hh - ll
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = np.where(rng == 0, 50.0, (c - ll) / rng * 100)
+        k[np.isnan(hh)] = np.nan
+    else:
+        k = [NAN if math.isnan(hi) else (50.0 if hi == lo else (cl - lo) / (hi - lo) * 100)
+             for hi, lo, cl in zip(hh, ll, c)]
+    d = _nan(n)
+    if n >= k_period:
+        kl = _tolist(k)
+        first = k_period - 1
+        for i in range(first, n):
+            lo = max(first, i - d_period + 1)
+            d[i] = sum(kl[lo:i + 1]) / (i + 1 - lo)
+    return {'k': k, 'd': d}
@@ -0,0 +1,268 @@
+"""Caché LRU de klines que entiende el cierre de velas.
+
+Las velas cerradas son inmutables y se guardan hasta que la entrada se
+desaloja. Al vencer el TTL solo se pide la cola desde el open time de la
+última vela cacheada (la que sigue abierta), así un refresh típico baja
+1-2 filas en vez de 100.
+
+Las filas se guardan ya parseadas como CandleSeries (columnas de 8 bytes
+por valor): get() devuelve un slice sin copia de la serie cacheada.
+
+Misses y refreshes pasan por un single-flight por (symbol, interval): si
+varias requests piden la misma clave a la vez, sale un solo fetch a Binance
+y las demás esperan ese resultado (o esa excepción).
+
+Cada entrada lleva además el estado incremental (streaming.WindowState) de
+la última ventana que se analizó: pasa de una entrada a la siguiente en cada
+refresh de la cola y sigue valiendo mientras no cierre una vela, así que un
+tick solo suma la vela abierta.
+
+Vencido el TTL, la entrada se sigue sirviendo stale durante swr.GRACE
+segundos mientras un thread de fondo refresca la cola (ver swr.py), salvo
+que ya haya abierto una vela nueva: a esa serie le faltaría la vela actual.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from . import binance, metrics, singleflight, streaming, swr, warm_snapshot
+from .candles import CandleSeries, MalformedKlines
+
+INTERVAL_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '1d': 86_400_000, '1w': 604_800_000,
+}
+
+KLINE_PATHS = {
+    'futures': '/fapi/v1/klines',
+    'spot': '/api/v3/klines',
+}
+
+# Binance abre las velas semanales los lunes 00:00 UTC; el epoch cayó jueves
+INTERVAL_OFFSET_MS = {'1w': 4 * 86_400_000}
+
+REFRESH_TTL = 5       # segundos antes de refrescar la vela abierta
+MAX_ENTRIES = 256     # claves (symbol, interval)
+MAX_ROWS = 1000       # filas retenidas por clave
+MAX_TAIL = 500        # si faltan más velas que esto, se rehace la descarga completa
+
+
+def candle_open(interval, t_ms):
+    """Open time de la vela de `interval` que contiene t_ms, en la grilla de Binance"""
+    iv = INTERVAL_MS[interval]
+    off = INTERVAL_OFFSET_MS.get(interval, 0)
+    return (t_ms - off) // iv * iv + off
+
+
+class KlineEntry:
+    __slots__ = ('series', 'source', 'refreshed_at', 'exhausted', 'window')
+
+    def __init__(self, series, source, refreshed_at, exhausted=False, window=None):
+        self.series = series
+        self.source = source
+        self.refreshed_at = refreshed_at
+        self.exhausted = exhausted  # Binance no tiene más historia que esta
+        self.window = window        # streaming.WindowState de la última ventana pedida
+
+
+class KlineCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=REFRESH_TTL, max_rows=MAX_ROWS, grace=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.grace = swr.GRACE if grace is None else grace
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = singleflight.Group('klines')
+        self._revalidator = swr.Revalidator('klines')
+        self._stats = {'hits': 0, 'stale_hits': 0, 'tail_refreshes': 0, 'full_fetches': 0,
+                       'rows_fetched': 0, 'evictions': 0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def get(self, symbol, interval, limit=100, timings=None):
+        """(CandleSeries, source) con las últimas `limit` velas.
+
+        Si Binance responde algo que no es una lista de klines se devuelve tal
+        cual en lugar de la serie; filas malformadas levantan MalformedKlines.
+        """
+        key = (symbol, interval)
+        while True:
+            entry = self._lookup(key)
+            state = self._state(key, entry, limit)
+            if state == swr.FRESH:
+                self._count('hits')
+                metrics.cache('klines', 'fresh')
+                return entry.series[-limit:], entry.source
+            if state == swr.STALE:
+                self._count('stale_hits')
+                metrics.cache('klines', 'stale')
+                self._revalidator.trigger(key, self._revalidate, key, limit)
+                return entry.series[-limit:], entry.source
+
+            (series, source), leader = self._flights.do(
+                f'klines:{symbol}:{interval}', self._load, key, limit, timings)
+            if not isinstance(series, CandleSeries):
+                return series, source
+            if leader or len(series) >= limit or not len(series):
+                return series[-limit:], source
+            # El vuelo compartido pidió menos velas de las que hacen falta acá
+            # (p.ej. el poller SSE con limit=2): volver a consultar la caché
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _covers(self, entry, limit):
+        return len(entry.series) >= limit or entry.exhausted
+
+    def _state(self, key, entry, limit):
+        """swr.FRESH / STALE / EXPIRED; None si no hay entrada que sirva para `limit`"""
+        if entry is None or not self._covers(entry, limit):
+            return None
+        now = time.time()
+        state = swr.state(now - entry.refreshed_at, self.ttl, self.grace)
+        # Si ya abrió la vela siguiente, a la serie cacheada le falta la actual
+        if state == swr.STALE and now * 1000 >= entry.series['t'][-1] + INTERVAL_MS[key[1]]:
+            return swr.EXPIRED
+        return state
+
+    def peek(self, symbol, interval, limit=100):
+        """Estado de la entrada sin tocar upstream: swr.FRESH / STALE / EXPIRED,
+        o None si no hay una que alcance para `limit`"""
+        key = (symbol, interval)
+        return self._state(key, self._lookup(key), limit)
+
+    def window(self, symbol, interval, series):
+        """streaming.WindowState de las velas cerradas de `series` (una ventana
+        que devolvió get()); None si es muy corta.
+
+        Se reusa mientras la ventana tenga las mismas velas cerradas: las
+        velas cerradas no cambian, solo la abierta. Cuando cierra una vela la
+        ventana se corre y el estado se rearma una vez (las recursiones de
+        analyze.py arrancan en la primera vela de la ventana).
+        """
+        if len(series) < 2:
+            return None
+        t = series['t']
+        wkey = (t[0], t[-2], len(series))
+        with self._lock:
+            entry = self._entries.get((symbol, interval))
+            state = entry.window if entry is not None else None
+            if state is None or state.key != wkey:
+                state = streaming.WindowState(wkey, series[:-1])
+                if entry is not None:
+                    entry.window = state
+            return state
+
+    def _fresh(self, key, limit):
+        entry = self._lookup(key)
+        return entry if self._state(key, entry, limit) == swr.FRESH else None
+
+    def _revalidate(self, key, limit):
+        """Refresh de fondo de una entrada stale (por el mismo single-flight)"""
+        symbol, interval = key
+        self._flights.do(f'klines:{symbol}:{interval}', self._load, key, limit, None)
+
+    def _load(self, key, limit, timings):
+        """(serie completa, source): refresh de la cola o descarga completa.
+        Corre una vez por vuelo, en el thread líder."""
+        # Otro vuelo pudo terminar justo antes de que este empezara
+        entry = self._fresh(key, limit)
+        if entry is not None:
+            self._count('hits')
+            metrics.cache('klines', 'fresh')
+            return entry.series, entry.source
+
+        now = time.time()
+        entry = self._lookup(key)
+        if entry is not None and self._covers(entry, limit):
+            series = self._refresh_tail(key, entry, now, timings)
+            if series is not None:
+                metrics.cache('klines', 'refresh')
+                return series, entry.source
+
+        metrics.cache('klines', 'miss')
+        symbol, interval = key
+        rows, source = self._fetch_full(symbol, interval, limit, timings)
+        if not isinstance(rows, list):
+            return rows, source
+        series = CandleSeries.from_klines(rows)
+        if len(series):
+            self._store(key, KlineEntry(series[-self.max_rows:].compact(), source, now, len(series) < limit))
+        return series, source
+
+    def _fetch_full(self, symbol, interval, limit, timings):
+        self._count('full_fetches')
+        query = f"?symbol={symbol}USDT&interval={interval}&limit={limit}"
+        source, fallback = warm_snapshot.source_order(symbol)
+        try:
+            rows = binance.fetch_json(binance.HOSTS[source], f"{KLINE_PATHS[source]}{query}", timings)
+        except Exception:
+            rows = binance.fetch_json(binance.HOSTS[fallback], f"{KLINE_PATHS[fallback]}{query}", timings)
+            source = fallback
+        if isinstance(rows, list):
+            self._count('rows_fetched', len(rows))
+        return rows, source
+
+    def _refresh_tail(self, key, entry, now, timings):
+        """Pedir solo desde la vela abierta; None si hay que rehacer todo"""
+        symbol, interval = key
+        last_open = entry.series['t'][-1]
+        missing = int((now * 1000 - last_open) // INTERVAL_MS[interval]) + 1
+        if missing > MAX_TAIL:
+            return None
+        query = (f"?symbol={symbol}USDT&interval={interval}"
+                 f"&startTime={last_open}&limit={missing + 1}")
+        try:
+            fresh = binance.fetch_json(binance.HOSTS[entry.source],
+                                       f"{KLINE_PATHS[entry.source]}{query}", timings)
+        except Exception:
+            return None
+        if not isinstance(fresh, list) or not fresh:
+            return None
+        try:
+            fresh = CandleSeries.from_klines(fresh)
+        except MalformedKlines:
+            return None
+        self._count('tail_refreshes')
+        self._count('rows_fetched', len(fresh))
+        # Serie nueva: otros threads pueden estar leyendo la anterior
+        cut = bisect_left(entry.series['t'], fresh['t'][0])
+        keep = entry.series[max(0, cut + len(fresh) - self.max_rows):cut]
+        series = CandleSeries.concat([keep, fresh])[-self.max_rows:]
+        self._store(key, KlineEntry(series, entry.source, now, entry.exhausted, entry.window))
+        return series
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats, entries=len(self._entries),
+                       bytes=sum(e.series.nbytes for e in self._entries.values()))
+        out['coalesced'] = self._flights.stats()['coalesced']
+        out['revalidations'] = self._revalidator.stats()
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = KlineCache()
+
+
+def get_klines(symbol, interval, limit=100, timings=None):
+    return cache.get(symbol, interval, limit, timings)
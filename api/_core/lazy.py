@@ -0,0 +1,27 @@
+"""Imports diferidos para el cold start.
+
+lazy_import('numpy') devuelve el módulo sin ejecutarlo: el costo del import
+se paga recién al primer acceso a un atributo. Si el paquete no está
+instalado devuelve None, igual que el `except ImportError: np = None` de
+siempre, sin haber importado nada.
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or spec.loader is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
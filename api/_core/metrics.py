@@ -0,0 +1,278 @@
+"""Instrumentación por request: header Server-Timing y /api/metrics.
+
+Cada handler decora su do_GET/do_POST con @timed('<endpoint>') y hereda de
+ServerTiming. Durante la request:
+
+- phase('fetch') / phase('analysis') / ... miden fases con nombre;
+- binance y las cachés reportan solos el host upstream usado (y sus fallos)
+  y cómo respondió cada caché: fresh/stale (swr.py), refresh, miss o
+  coalesced si esperó el fetch en vuelo de otra request (singleflight.py).
+
+Al enviar los headers se agrega Server-Timing (fases, upstream, caché y
+total); al terminar, las duraciones van a histogramas por endpoint y fase
+que /api/metrics expone en formato texto de Prometheus. Las métricas son por
+proceso: en Vercel, por instancia warm.
+
+La request actual viaja en un ContextVar; binance.submit() copia el contexto
+a los threads del pool, así los fetches en paralelo también se atribuyen.
+METRICS=0 apaga todo (los decoradores devuelven la función tal cual).
+"""
+import contextvars
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+ENABLED = os.environ.get('METRICS', '1') != '0'
+
+# Límites superiores de los buckets, en segundos
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._phases = {}     # (endpoint, phase) -> Histogram
+        self._upstream = {}   # host -> Histogram
+        self._counters = {}   # (métrica, (label, valor), ...) -> n
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, phase, seconds):
+        with self._lock:
+            h = self._phases.get((endpoint, phase))
+            if h is None:
+                h = self._phases[(endpoint, phase)] = Histogram()
+            h.observe(seconds)
+
+    def observe_upstream(self, host, seconds, ok):
+        with self._lock:
+            h = self._upstream.get(host)
+            if h is None:
+                h = self._upstream[host] = Histogram()
+            h.observe(seconds)
+            key = ('api_upstream_requests_total', ('host', host), ('ok', 'true' if ok else 'false'))
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def inc(self, name, **labels):
+        key = (name, *sorted(labels.items()))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._phases.clear()
+            self._upstream.clear()
+            self._counters.clear()
+
+    def render(self):
+        """Exposición en formato texto de Prometheus (0.0.4)"""
+        with self._lock:
+            phases = {k: (list(h.counts), h.sum, h.count) for k, h in self._phases.items()}
+            upstream = {k: (list(h.counts), h.sum, h.count) for k, h in self._upstream.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        _histogram(lines, 'api_phase_duration_seconds', 'Duración por endpoint y fase',
+                   {(('endpoint', e), ('phase', p)): v for (e, p), v in sorted(phases.items())})
+        _histogram(lines, 'api_upstream_duration_seconds', 'Latencia de cada intento contra Binance',
+                   {(('host', h),): v for h, v in sorted(upstream.items())})
+        by_name = {}
+        for (name, *labels), n in sorted(counters.items()):
+            by_name.setdefault(name, []).append((labels, n))
+        for name, rows in by_name.items():
+            lines.append(f'# HELP {name} {COUNTER_HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} counter')
+            lines.extend(f'{name}{_labels(labels)} {n}' for labels, n in rows)
+        return '\n'.join(lines) + '\n'
+
+
+COUNTER_HELP = {
+    'api_requests_total': 'Requests atendidas por endpoint y status',
+    'api_cache_lookups_total': 'Consultas a cachés por resultado',
+    'api_upstream_requests_total': 'Intentos contra Binance por host y resultado',
+    'api_singleflight_total': 'Fetches por grupo: líder (sale a Binance) o coalesced (espera al líder)',
+    'api_revalidations_total': 'Refrescos en segundo plano de entradas stale por caché y resultado',
+}
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+def _histogram(lines, name, help_text, series):
+    if not series:
+        return
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for labels, (counts, total, count) in series.items():
+        cumulative = 0
+        for le, n in zip((*map(str, BUCKETS), '+Inf'), counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{_labels((*labels, ("le", le)))} {cumulative}')
+        lines.append(f'{name}_sum{_labels(labels)} {total:.6f}')
+        lines.append(f'{name}_count{_labels(labels)} {count}')
+
+
+registry = Registry()
+
+
+# === REQUEST ===
+
+class RequestMetrics:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.t0 = time.perf_counter()
+        self.status = None
+        self.phases = {}      # fase -> segundos (acumulado)
+        self.caches = {}      # caché -> resultado de la última consulta
+        self.upstream = []    # (host, segundos, ok)
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def note_cache(self, name, result):
+        with self._lock:
+            self.caches[name] = result
+
+    def note_upstream(self, host, seconds, ok):
+        with self._lock:
+            self.upstream.append((host, seconds, ok))
+
+    def server_timing(self):
+        with self._lock:
+            phases = list(self.phases.items())
+            caches = list(self.caches.items())
+            upstream = list(self.upstream)
+        parts = [f'{name};dur={s * 1000:.1f}' for name, s in phases]
+        if upstream:
+            hosts = [h for h, _, ok in upstream if ok] or [upstream[-1][0]]
+            parts.append(f'upstream;dur={sum(s for _, s, _ in upstream) * 1000:.1f};desc="{hosts[-1]}"')
+            failed = sum(1 for _, _, ok in upstream if not ok)
+            if failed:
+                parts.append(f'fallback;desc="{failed}"')
+        if caches:
+            parts.append('cache;desc="' + ' '.join(f'{c}={r}' for c, r in caches) + '"')
+        parts.append(f'total;dur={(time.perf_counter() - self.t0) * 1000:.1f}')
+        return ', '.join(parts)
+
+    def finish(self):
+        registry.observe(self.endpoint, 'total', time.perf_counter() - self.t0)
+        with self._lock:
+            phases = list(self.phases.items())
+        for phase, seconds in phases:
+            registry.observe(self.endpoint, phase, seconds)
+        registry.inc('api_requests_total', endpoint=self.endpoint, status=str(self.status or 0))
+
+
+def current():
+    return _current.get()
+
+
+def timed(endpoint):
+    """Decorador de do_GET/do_POST: abre las métricas de la request"""
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            m = RequestMetrics(endpoint)
+            token = _current.set(m)
+            try:
+                return fn(self, *args, **kwargs)
+            finally:
+                _current.reset(token)
+                m.finish()
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def phase(name):
+    m = _current.get()
+    if m is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        m.add(name, time.perf_counter() - t0)
+
+
+def cache(name, result):
+    """Registrar una consulta a la caché `name` ('fresh', 'stale', 'miss', 'refresh'...)"""
+    if not ENABLED:
+        return
+    registry.inc('api_cache_lookups_total', cache=name, result=result)
+    m = _current.get()
+    if m is not None:
+        m.note_cache(name, result)
+
+
+def flight(group, role):
+    """Registrar una llamada single-flight ('leader' o 'coalesced')"""
+    if not ENABLED:
+        return
+    registry.inc('api_singleflight_total', group=group, role=role)
+    m = _current.get()
+    if m is not None and role == 'coalesced':
+        m.note_cache(group, 'coalesced')
+
+
+def revalidation(name, ok):
+    """Registrar un refresh en segundo plano (lo llama swr.Revalidator)"""
+    if not ENABLED:
+        return
+    registry.inc('api_revalidations_total', cache=name, result='ok' if ok else 'error')
+
+
+def upstream(host, seconds, ok):
+    """Registrar un intento contra Binance (lo llama binance._attempt)"""
+    if not ENABLED:
+        return
+    registry.observe_upstream(host, seconds, ok)
+    m = _current.get()
+    if m is not None:
+        m.note_upstream(host, seconds, ok)
+
+
+class ServerTiming:
+    """Mixin para los handlers: status y header Server-Timing de la request actual"""
+
+    def send_response(self, code, message=None):
+        m = _current.get()
+        if m is not None:
+            m.status = code
+        super().send_response(code, message)
+
+    def end_headers(self):
+        m = _current.get()
+        if m is not None:
+            self.send_header('Server-Timing', m.server_timing())
+        super().end_headers()
+
+
+def render():
+    return registry.render()
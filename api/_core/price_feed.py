@@ -0,0 +1,103 @@
+"""Snapshot versionado de precios para polling con deltas.
+
+Cada vez que entra un snapshot de tickers nuevo se comparan las filas de los
+símbolos seguidos; si alguna cambió, la versión avanza y se recuerda qué
+símbolos cambiaron. delta(since) devuelve solo lo que cambió desde `since`,
+o el payload completo si `since` es de otra instancia o ya salió del
+historial.
+
+Las versiones llevan en los bits altos un id aleatorio de la instancia, así
+un cliente que rebota entre instancias warm nunca recibe un delta contra una
+versión ajena (cabe en los 53 bits de un Number de JS).
+"""
+import json
+import random
+import threading
+from collections import deque
+
+HISTORY = 120  # versiones recordadas (~10 min con refresh de 5s)
+
+
+def ticker_row(ticker, source):
+    return {
+        'price': ticker.price,
+        'change': ticker.change,
+        'volume': ticker.volume,
+        'high24h': ticker.high,
+        'low24h': ticker.low,
+        'source': source,
+    }
+
+
+class PriceFeed:
+    def __init__(self, symbols, history=HISTORY):
+        self.symbols = list(symbols)
+        self.base = random.getrandbits(20) << 32
+        self.version = self.base
+        self.rows = {}
+        self._seq = 0  # seq del último snapshot aplicado
+        self._changes = deque(maxlen=history)  # (versión, símbolos cambiados)
+        self._full_body = None
+        self._lock = threading.Lock()
+
+    def update(self, snapshot):
+        """Incorporar un TickerSnapshot.
+
+        No-op si es el mismo de la última vez o uno anterior: una request que
+        leyó el snapshot viejo justo antes del refresh puede llegar acá
+        después que otra con el nuevo, y no debe pisarlo.
+        """
+        if snapshot.seq <= self._seq:
+            return self.version
+        with self._lock:
+            if snapshot.seq <= self._seq:
+                return self.version
+            rows = {}
+            for sym in self.symbols:
+                t = snapshot.get(f'{sym}USDT')
+                if t:
+                    rows[sym] = ticker_row(t, snapshot.source)
+            changed = {s for s in rows.keys() | self.rows.keys() if rows.get(s) != self.rows.get(s)}
+            if changed:
+                self.version += 1
+                self._changes.append((self.version, frozenset(changed)))
+                self.rows = rows
+                self._full_body = None
+            self._seq = snapshot.seq
+            return self.version
+
+    def full(self):
+        with self._lock:
+            return {'version': self.version, 'full': True, 'data': self.rows, 'removed': []}
+
+    def full_body(self):
+        """(versión, payload legacy): dict símbolo -> fila, serializado una vez por versión.
+
+        Se arma bajo el mismo lock que update(), así el body cacheado siempre
+        es el de la versión que se devuelve junto a él.
+        """
+        with self._lock:
+            if self._full_body is None:
+                self._full_body = json.dumps(self.rows).encode()
+            return self.version, self._full_body
+
+    def delta(self, since):
+        """Cambios posteriores a `since`; payload completo si no se puede"""
+        with self._lock:
+            version, rows, changes = self.version, self.rows, list(self._changes)
+        if since == version:
+            return {'version': version, 'full': False, 'data': {}, 'removed': []}
+        oldest = changes[0][0] if changes else version + 1
+        # `since` válido: de esta instancia, no futuro y con historial completo
+        if not (self.base <= since < version and since >= oldest - 1):
+            return {'version': version, 'full': True, 'data': rows, 'removed': []}
+        changed = set()
+        for v, syms in changes:
+            if v > since:
+                changed |= syms
+        return {
+            'version': version,
+            'full': False,
+            'data': {s: rows[s] for s in changed if s in rows},
+            'removed': sorted(s for s in changed if s not in rows),
+        }
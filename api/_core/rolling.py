@@ -0,0 +1,224 @@
+"""Primitivas de ventana deslizante.
+
+- MonotonicWindow: máximo o mínimo móvil (según la comparación que recibe)
+  con un deque monotónico, O(1) amortizado por push.
+- RollingStats: suma y varianza móviles con sumas acumuladas; cada `period`
+  pushes se re-suma la ventana para que el error de redondeo no se acumule.
+
+Las funciones rolling_* devuelven la serie completa alineada con la entrada
+(NaN durante el calentamiento). Con NumPy y series largas usan kernels
+vectorizados O(n); si no, las clases de arriba.
+
+NumPy se importa recién la primera vez que una serie llega a NUMPY_MIN_LEN:
+con las 100 velas de /api/analyze las listas son igual de rápidas y el cold
+start se ahorra el import.
+"""
+import operator
+from collections import deque
+
+from .lazy import lazy_import
+
+np = lazy_import('numpy')
+
+NAN = float('nan')
+NUMPY_MIN_LEN = 256
+SUM_BLOCK = 256  # ventanas por bloque de sumas acumuladas (cada bloque con su propio corrimiento)
+
+
+def vectorized(n):
+    """Si una serie de n puntos se procesa con NumPy"""
+    return np is not None and n >= NUMPY_MIN_LEN
+
+
+class MonotonicWindow:
+    """Extremo de las últimas `period` observaciones: con operator.gt el
+    máximo, con operator.lt el mínimo"""
+
+    def __init__(self, period, dominates):
+        self.period = period
+        self.count = 0
+        self._dominates = dominates
+        self._dq = deque()  # (índice, valor), extremos en orden
+
+    def push(self, x):
+        dq = self._dq
+        while dq and not self._dominates(dq[-1][1], x):
+            dq.pop()
+        dq.append((self.count, x))
+        self.count += 1
+        if dq[0][0] <= self.count - 1 - self.period:
+            dq.popleft()
+        return dq[0][1]
+
+    def warm(self, values):
+        for x in values:
+            self.push(x)
+        return self
+
+    @property
+    def full(self):
+        return self.count >= self.period
+
+    @property
+    def value(self):
+        return self._dq[0][1] if self._dq else None
+
+
+class RollingStats:
+    """Media / varianza poblacional de las últimas `period` observaciones"""
+
+    def __init__(self, period):
+        self.period = period
+        self._win = deque()
+        self._pushes = 0
+        self.total = 0
+        self._m2 = 0.0
+
+    @classmethod
+    def from_window(cls, values, period):
+        """Estado de la última ventana de `values` en O(period): suma y
+        varianza en dos pasadas directas (lo mismo que deja el resync de
+        `period` pushes) en vez de la recurrencia push a push"""
+        st = cls(period)
+        st._win.extend(values[-period:])
+        st._pushes = len(st._win)
+        if st._win:
+            st._resync()
+        return st
+
+    def push(self, x):
+        win = self._win
+        n_old = len(win)
+        mean_old = self.total / n_old if n_old else 0.0
+        win.append(x)
+        if n_old < self.period:
+            self.total += x
+            self._m2 += (x - mean_old) * (x - self.total / len(win))
+        else:
+            y = win.popleft()
+            self.total += x - y
+            self._m2 += (x - y) * (x - self.total / self.period + y - mean_old)
+        self._pushes += 1
+        if self._pushes % self.period == 0:
+            self._resync()
+        return self
+
+    def _resync(self):
+        self.total = sum(self._win)
+        mu = self.total / len(self._win)
+        self._m2 = sum((v - mu) ** 2 for v in self._win)
+
+    def warm(self, values):
+        for x in values:
+            self.push(x)
+        return self
+
+    @property
+    def full(self):
+        return len(self._win) >= self.period
+
+    @property
+    def mean(self):
+        return self.total / len(self._win) if self._win else 0.0
+
+    @property
+    def variance(self):
+        return max(self._m2, 0.0) / len(self._win) if self._win else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+
+# === SERIES ===
+
+def _as_float_list(values):
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _nan(n):
+    return np.full(n, np.nan) if vectorized(n) else [NAN] * n
+
+
+def _extreme_numpy(x, period, ufunc, fill):
+    # van Herk / Gil-Werman: prefijos y sufijos por bloques de `period`, O(n)
+    n = len(x)
+    pad = (-n) % period
+    xp = np.concatenate([x, np.full(pad, fill)]).reshape(-1, period)
+    pre = ufunc.accumulate(xp, axis=1).ravel()
+    suf = ufunc.accumulate(xp[:, ::-1], axis=1)[:, ::-1].ravel()
+    return ufunc(suf[:n - period + 1], pre[period - 1:n])
+
+
+def _rolling_extreme(values, period, dominates):
+    n = len(values)
+    out = _nan(n)
+    if n < period:
+        return out
+    if vectorized(n):
+        x = np.ascontiguousarray(values, dtype=np.float64)
+        if dominates is operator.gt:
+            out[period - 1:] = _extreme_numpy(x, period, np.maximum, -np.inf)
+        else:
+            out[period - 1:] = _extreme_numpy(x, period, np.minimum, np.inf)
+        return out
+    win = MonotonicWindow(period, dominates)
+    for i, x in enumerate(_as_float_list(values)):
+        v = win.push(x)
+        if i >= period - 1:
+            out[i] = v
+    return out
+
+
+def rolling_max(values, period):
+    return _rolling_extreme(values, period, operator.gt)
+
+
+def rolling_min(values, period):
+    return _rolling_extreme(values, period, operator.lt)
+
+
+def _mean_std_numpy(x, period):
+    """Media y desviación de cada ventana con sumas acumuladas de x y x², O(n).
+
+    Por bloques de SUM_BLOCK ventanas, cada uno corrido por su primer valor:
+    así E[x²] - E[x]² no cancela con precios grandes y el error de las sumas
+    acumuladas no crece con el largo de la serie. Las ventanas planas (máximo
+    == mínimo) dan 0 exacto, como las dos pasadas, en vez del ruido de la resta.
+    """
+    m = len(x) - period + 1
+    mean, std = np.empty(m), np.empty(m)
+    for s in range(0, m, SUM_BLOCK):
+        e = min(m, s + SUM_BLOCK)
+        y = x[s:e + period - 1] - x[s]
+        c1 = np.concatenate(([0.0], np.cumsum(y)))
+        c2 = np.concatenate(([0.0], np.cumsum(y * y)))
+        mu = (c1[period:] - c1[:-period]) / period
+        mean[s:e] = mu + x[s]
+        std[s:e] = np.sqrt(np.maximum((c2[period:] - c2[:-period]) / period - mu * mu, 0.0))
+    std[_extreme_numpy(x, period, np.maximum, -np.inf) == _extreme_numpy(x, period, np.minimum, np.inf)] = 0.0
+    return mean, std
+
+
+def rolling_mean_std(values, period):
+    """Media y desviación poblacional por ventana"""
+    n = len(values)
+    mean, std = _nan(n), _nan(n)
+    if n < period:
+        return mean, std
+    if vectorized(n):
+        mean[period - 1:], std[period - 1:] = _mean_std_numpy(
+            np.ascontiguousarray(values, dtype=np.float64), period)
+        return mean, std
+    st = RollingStats(period)
+    for i, x in enumerate(_as_float_list(values)):
+        st.push(x)
+        if i >= period - 1:
+            mean[i] = st.mean
+            std[i] = st.std
+    return mean, std
+
+
+def window_stats(values, period):
+    """RollingStats de la última ventana de `values` (O(period))"""
+    return RollingStats.from_window(values, period)
@@ -0,0 +1,68 @@
+"""Single-flight: un solo fetch en vuelo por clave.
+
+El primer thread que pide una clave (el líder) hace el trabajo; los que
+llegan mientras tanto esperan ese mismo resultado en vez de salir a Binance
+cada uno. Si el fetch falla, la excepción les llega a todos: no reintentan
+uno detrás del otro contra un upstream que ya está fallando.
+
+Acá no se cachea nada: al terminar el vuelo la clave se libera y la caché
+que lo usa decide si el próximo pedido necesita otro fetch.
+"""
+import threading
+
+from . import metrics
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class Group:
+    def __init__(self, name):
+        self.name = name  # etiqueta en métricas y Server-Timing
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'coalesced': 0, 'errors': 0, 'errors_shared': 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """(resultado de fn, leader); leader=False si se compartió el vuelo de otro thread"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats['leaders'] += 1
+            else:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+        metrics.flight(self.name, 'leader' if leader else 'coalesced')
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result, True
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is not None:
+                    self._stats['errors'] += 1
+                    self._stats['errors_shared'] += call.waiters
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls))
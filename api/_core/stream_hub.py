@@ -0,0 +1,166 @@
+"""Fan-out de tickers y velas abiertas a suscriptores de streaming (SSE).
+
+Un único poller en background consulta el snapshot de tickers y la caché de
+klines solo para lo que algún suscriptor sigue, y publica lo que cambió. N
+clientes cuestan un poller contra upstream, no N loops de polling.
+
+Backpressure: cada suscriptor tiene una cola con conflación por clave. Si un
+cliente no lee a tiempo, de cada símbolo/vela queda solo el último evento,
+así la memoria por cliente está acotada por su filtro y un cliente lento no
+frena a los demás.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from . import kline_cache, tickers
+from .price_feed import ticker_row
+
+POLL_INTERVAL = 1.0   # segundos entre pasadas del poller
+IDLE_STOP = 30.0      # segundos sin suscriptores antes de parar el poller
+
+
+class Subscriber:
+    def __init__(self, symbols, candles):
+        self.symbols = frozenset(symbols)
+        self.candles = frozenset(candles)  # {(symbol, interval)}
+        self.sent = 0
+        self.conflated = 0
+        self.closed = False
+        self._pending = OrderedDict()  # (evento, clave) -> data
+        self._cond = threading.Condition()
+
+    def wants(self, event, key):
+        if event == 'ticker':
+            return key in self.symbols
+        if event == 'candle':
+            return key in self.candles
+        return True
+
+    def push(self, event, key, data):
+        with self._cond:
+            k = (event, key)
+            if k in self._pending:
+                # El cliente no leyó el anterior: se reemplaza por el último
+                del self._pending[k]
+                self.conflated += 1
+            self._pending[k] = data
+            self._cond.notify()
+
+    def drain(self, timeout):
+        """Eventos pendientes [(evento, clave, data)]; [] si venció `timeout`"""
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            events = [(e, k, d) for (e, k), d in self._pending.items()]
+            self._pending.clear()
+        self.sent += len(events)
+        return events
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class Hub:
+    def __init__(self, poll_interval=POLL_INTERVAL, idle_stop=IDLE_STOP):
+        self.poll_interval = poll_interval
+        self.idle_stop = idle_stop
+        self.rows = {}       # symbol -> último evento ticker publicado
+        self.candles = {}    # (symbol, interval) -> vela abierta publicada
+        self._subs = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {'polls': 0, 'events': 0, 'errors': 0}
+
+    def subscribe(self, symbols, candles=()):
+        """Nuevo suscriptor; recibe de entrada el último estado conocido de su filtro"""
+        sub = Subscriber(symbols, candles)
+        with self._lock:
+            self._subs.add(sub)
+            for sym in sub.symbols:
+                if sym in self.rows:
+                    sub.push('ticker', sym, self.rows[sym])
+            for key in sub.candles:
+                if key in self.candles:
+                    sub.push('candle', key, self.candles[key])
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stream-hub', daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.close()
+        with self._lock:
+            self._subs.discard(sub)
+
+    def _run(self):
+        idle_since = None
+        while True:
+            with self._lock:
+                if self._subs:
+                    idle_since = None
+                elif idle_since is None:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= self.idle_stop:
+                    self._thread = None
+                    return
+            if idle_since is None:
+                self.poll_once()
+            time.sleep(self.poll_interval)
+
+    def poll_once(self):
+        """Una pasada: tickers y velas abiertas de la unión de los filtros"""
+        with self._lock:
+            subs = list(self._subs)
+        symbols = set().union(*(s.symbols for s in subs)) if subs else set()
+        keys = set().union(*(s.candles for s in subs)) if subs else set()
+        self._count('polls')
+
+        if symbols:
+            try:
+                snapshot = tickers.get_snapshot('futures')
+            except Exception:
+                self._count('errors')
+            else:
+                for sym in symbols:
+                    t = snapshot.get(f'{sym}USDT')
+                    if t is None:
+                        continue
+                    self._publish(self.rows, 'ticker', sym, dict(ticker_row(t, snapshot.source), symbol=sym))
+
+        for sym, interval in keys:
+            try:
+                series, source = kline_cache.get_klines(sym, interval, 2)
+                candle = {'symbol': sym, 'interval': interval, **series[-1], 'source': source}
+            except Exception:
+                self._count('errors')
+                continue
+            self._publish(self.candles, 'candle', (sym, interval), candle)
+
+    def _publish(self, state, event, key, data):
+        """Guardar y repartir si cambió; bajo el lock para que subscribe() no
+        se pierda un evento entre leer el estado y registrarse"""
+        with self._lock:
+            if state.get(key) == data:
+                return
+            state[key] = data
+            for sub in self._subs:
+                if sub.wants(event, key):
+                    sub.push(event, key, data)
+                    self._stats['events'] += 1
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def stats(self):
+        with self._lock:
+            subs = list(self._subs)
+            out = dict(self._stats, subscribers=len(subs), running=self._thread is not None)
+        out['conflated'] = sum(s.conflated for s in subs)
+        return out
+
+
+hub = Hub()
@@ -0,0 +1,249 @@
+"""Indicadores incrementales: O(1) por vela nueva.
+
+Cada objeto guarda su estado de suavizado (EMA / Wilder) y recibe una vela
+cerrada por vez con update(candle). peek(candle) devuelve el valor
+provisional con la vela aún abierta sin modificar el estado.
+
+Después de n updates, `value` es idéntico al de la función escalar de
+analyze.py sobre esas mismas n velas (incluidos los valores por defecto
+cuando todavía no hay datos suficientes). Las siembras que analyze.py hace
+con sum() se hacen con sum() sobre las mismas velas, así la igualdad no
+depende de cómo sume floats cada versión de Python.
+
+WindowState guarda estos objetos para las velas cerradas de una ventana de
+kline_cache: mientras no cierre una vela, cada tick solo hace peek() con la
+vela abierta.
+"""
+import threading
+
+
+class _Streaming:
+    """Mixin de peek()/warm() para clases con update(candle) y `value`.
+
+    El estado son escalares y tuplas, así que peek() es una copia plana.
+    """
+
+    def peek(self, candle):
+        state = self.__dict__.copy()
+        try:
+            self.update(candle)
+            return self.value
+        finally:
+            self.__dict__ = state
+
+    def warm(self, candles):
+        for c in candles:
+            self.update(c)
+        return self
+
+
+class StreamingEMA(_Streaming):
+    def __init__(self, period, source='c'):
+        self.period = period
+        self.source = source
+        self.k = 2 / (period + 1)
+        self.count = 0
+        self.seed = ()
+        self.last_input = None
+        self.val = None
+
+    def push(self, x):
+        self.count += 1
+        self.last_input = x
+        if self.count < self.period:
+            self.seed += (x,)
+        elif self.count == self.period:
+            self.val = sum(self.seed + (x,)) / self.period
+            self.seed = ()
+        else:
+            self.val = x * self.k + self.val * (1 - self.k)
+
+    def update(self, candle):
+        self.push(candle[self.source])
+
+    @property
+    def ready(self):
+        return self.val is not None
+
+    @property
+    def value(self):
+        if self.val is not None:
+            return self.val
+        return self.last_input if self.last_input is not None else 0.0
+
+
+class StreamingRSI(_Streaming):
+    def __init__(self, period=14):
+        self.period = period
+        self.prev = None
+        self.count = 0
+        self.gain_sum = 0
+        self.loss_sum = 0
+        self.avg_gain = None
+        self.avg_loss = None
+
+    def push(self, x):
+        prev, self.prev = self.prev, x
+        if prev is None:
+            return
+        change = x - prev
+        gain = change if change > 0 else 0.0
+        loss = 0.0 if change > 0 else -change
+        self.count += 1
+        p = self.period
+        if self.avg_gain is None:
+            self.gain_sum += gain
+            self.loss_sum += loss
+            if self.count == p:
+                self.avg_gain = self.gain_sum / p
+                self.avg_loss = self.loss_sum / p
+        else:
+            self.avg_gain = (self.avg_gain * (p - 1) + gain) / p
+            self.avg_loss = (self.avg_loss * (p - 1) + loss) / p
+
+    def update(self, candle):
+        self.push(candle['c'])
+
+    @property
+    def ready(self):
+        return self.avg_gain is not None
+
+    @property
+    def value(self):
+        if self.avg_gain is None:
+            return 50.0
+        if self.avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + self.avg_gain / self.avg_loss))
+
+
+class StreamingATR(_Streaming):
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.count = 0
+        self.ranges = ()
+        self.trs = ()
+        self.val = None
+
+    def update(self, candle):
+        h, l, c = candle['h'], candle['l'], candle['c']
+        pc, self.prev_close = self.prev_close, c
+        self.count += 1
+        if self.count <= self.period:
+            # Solo se usa mientras no hay `period` TRs (mismo fallback que atr())
+            self.ranges += (h - l,)
+        if pc is None:
+            return
+        tr = max(h - l, abs(h - pc), abs(l - pc))
+        p = self.period
+        if self.val is None:
+            self.trs += (tr,)
+            if self.count == p + 1:
+                self.val = sum(self.trs) / p
+                self.ranges = self.trs = ()
+        else:
+            self.val = (self.val * (p - 1) + tr) / p
+
+    @property
+    def ready(self):
+        return self.val is not None
+
+    @property
+    def value(self):
+        if self.val is not None:
+            return self.val
+        if self.count >= 2:
+            return sum(self.ranges) / self.count
+        return 0.0
+
+
+class StreamingMACD(_Streaming):
+    """MACD incremental con la misma siembra que macd() (EMA rápida congelada
+    hasta la vela `slow`)"""
+
+    def __init__(self, fast=12, slow=26, signal_period=9):
+        self.fast = fast
+        self.slow = slow
+        self.signal_period = signal_period
+        self.k_fast = 2 / (fast + 1)
+        self.k_slow = 2 / (slow + 1)
+        self.k_sig = 2 / (signal_period + 1)
+        self.count = 0
+        self.seed = ()
+        self.ema_fast = None
+        self.ema_slow = None
+        self.macd_count = 0
+        self.macd_seed = ()
+        self.macd_val = None
+        self.signal_val = None
+
+    def push(self, x):
+        self.count += 1
+        if self.ema_slow is None:
+            self.seed += (x,)
+            if self.count == self.slow:
+                self.ema_fast = sum(self.seed[:self.fast]) / self.fast
+                self.ema_slow = sum(self.seed) / self.slow
+                self.seed = ()
+            return
+        self.ema_fast = x * self.k_fast + self.ema_fast * (1 - self.k_fast)
+        self.ema_slow = x * self.k_slow + self.ema_slow * (1 - self.k_slow)
+        m = self.ema_fast - self.ema_slow
+        self.macd_val = m
+        self.macd_count += 1
+        if self.signal_val is None:
+            self.macd_seed += (m,)
+            if self.macd_count == self.signal_period:
+                self.signal_val = sum(self.macd_seed) / self.signal_period
+                self.macd_seed = ()
+        else:
+            self.signal_val = m * self.k_sig + self.signal_val * (1 - self.k_sig)
+
+    def update(self, candle):
+        self.push(candle['c'])
+
+    @property
+    def ready(self):
+        return self.count >= self.slow + self.signal_period
+
+    @property
+    def value(self):
+        if not self.ready:
+            return {'macd': 0, 'signal': 0, 'histogram': 0}
+        return {'macd': self.macd_val, 'signal': self.signal_val,
+                'histogram': self.macd_val - self.signal_val}
+
+
+# === ESTADO POR VENTANA ===
+
+STREAMS = {'ema': StreamingEMA, 'rsi': StreamingRSI, 'atr': StreamingATR, 'macd': StreamingMACD}
+
+
+class WindowState:
+    """Indicadores incrementales sobre las velas cerradas de una ventana.
+
+    `key` identifica la ventana (open time de la primera y de la última
+    cerrada, largo): mientras no cambie, value() cuesta un peek() con la vela
+    abierta. Cada indicador se calienta la primera vez que se pide.
+    """
+
+    def __init__(self, key, closed):
+        self.key = key
+        self.closed = closed  # CandleSeries de las velas cerradas de la ventana
+        self._streams = {}
+        self._lock = threading.Lock()  # peek() cambia el estado por un momento
+
+    def value(self, spec, candle):
+        """Valor de STREAMS[spec[0]](*spec[1:]) sobre closed + `candle`"""
+        with self._lock:
+            stream = self._streams.get(spec)
+            if stream is None:
+                stream = STREAMS[spec[0]](*spec[1:])
+                if isinstance(stream, StreamingATR):
+                    stream.warm(self.closed)
+                else:
+                    for x in self.closed['c']:
+                        stream.push(x)
+                self._streams[spec] = stream
+            return stream.peek(candle)
@@ -0,0 +1,80 @@
+"""Stale-while-revalidate en las cachés de proceso (klines y tickers).
+
+Mismo criterio que el `stale-while-revalidate=10` de vercel.json, pero del
+lado del servidor:
+
+- edad < ttl: fresh, se sirve tal cual;
+- ttl <= edad < ttl + GRACE: stale, se sirve ya y se refresca en un thread
+  de fondo (uno por clave; el refresh pasa por el single-flight de la caché,
+  así una request que llegue a bloquearse espera ese mismo fetch);
+- edad >= ttl + GRACE: nunca se sirve (máximo stale duro); la request espera
+  un fetch bloqueante, como antes.
+
+Cada consulta se reporta con metrics.cache(<caché>, 'fresh' | 'stale' |
+'refresh' | 'miss' | 'coalesced'), así Server-Timing dice cómo salió cada
+caché de la request y /api/metrics cuántas respuestas fueron stale.
+
+En Vercel la instancia se congela entre invocaciones: si el refresh de fondo
+no llegó a terminar, la próxima request dentro de la ventana vuelve a servir
+stale y, pasada la ventana, espera el fetch. SWR_GRACE=0 lo desactiva.
+"""
+import os
+import threading
+
+from . import metrics
+
+GRACE = float(os.environ.get('SWR_GRACE', '10'))  # segundos servibles después del TTL
+
+FRESH = 'fresh'
+STALE = 'stale'
+EXPIRED = 'expired'
+
+
+def state(age, ttl, grace=None):
+    """FRESH, STALE (servir y revalidar) o EXPIRED (fetch bloqueante)"""
+    grace = GRACE if grace is None else grace
+    if age < ttl:
+        return FRESH
+    if age < ttl + grace:
+        return STALE
+    return EXPIRED
+
+
+class Revalidator:
+    """Refrescos en segundo plano: como mucho uno en curso por clave"""
+
+    def __init__(self, name):
+        self.name = name
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stats = {'started': 0, 'failed': 0}
+
+    def trigger(self, key, fn, *args):
+        """Correr fn(*args) en un thread daemon si no hay otro para `key`"""
+        with self._lock:
+            if key in self._running:
+                return False
+            self._running.add(key)
+            self._stats['started'] += 1
+        # Thread nuevo = contexto vacío: el fetch no se atribuye a la request que lo disparó
+        threading.Thread(target=self._run, args=(key, fn, args),
+                         name=f'swr-{self.name}', daemon=True).start()
+        return True
+
+    def _run(self, key, fn, args):
+        ok = False
+        try:
+            fn(*args)
+            ok = True
+        except Exception:
+            # La próxima request stale reintenta; pasada la ventana, fetch bloqueante
+            with self._lock:
+                self._stats['failed'] += 1
+        finally:
+            with self._lock:
+                self._running.discard(key)
+            metrics.revalidation(self.name, ok)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, running=len(self._running))
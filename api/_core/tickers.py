@@ -0,0 +1,116 @@
+"""Snapshot del ticker 24h indexado por símbolo.
+
+Se descarga una vez por TTL y por fuente (futures / spot), con los floats
+ya convertidos, así analyze, prices y symbols hacen lookups O(1) en vez de
+recorrer ~300 filas por request. Vencido el TTL el snapshot se sigue
+sirviendo stale durante swr.GRACE segundos mientras se refresca de fondo;
+pasada esa ventana las requests concurrentes comparten un solo fetch
+bloqueante por fuente (singleflight), también si falla.
+"""
+import itertools
+import time
+from collections import namedtuple
+
+from . import binance, metrics, singleflight, swr
+
+TTL = 5  # segundos
+
+TICKER_PATHS = {
+    'futures': '/fapi/v1/ticker/24hr',
+    'spot': '/api/v3/ticker/24hr',
+}
+
+Ticker = namedtuple('Ticker', ['symbol', 'price', 'change', 'volume', 'high', 'low'])
+
+# Orden de creación de los snapshots (monótono en el proceso, a diferencia de fetched_at)
+_seq = itertools.count(1)
+
+
+class TickerSnapshot:
+    def __init__(self, source, rows, fetched_at=None):
+        if not isinstance(rows, list):
+            raise ValueError('Respuesta de tickers inválida')
+        self.source = source
+        self.seq = next(_seq)
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.by_symbol = {}
+        for t in rows:
+            try:
+                sym = t['symbol']
+                self.by_symbol[sym] = Ticker(
+                    sym,
+                    float(t.get('lastPrice', 0)),
+                    float(t.get('priceChangePercent', 0)),
+                    float(t.get('quoteVolume', 0)),
+                    float(t.get('highPrice', 0)),
+                    float(t.get('lowPrice', 0)),
+                )
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+
+    def get(self, symbol):
+        return self.by_symbol.get(symbol)
+
+    def change(self, symbol, default=0.0):
+        t = self.by_symbol.get(symbol)
+        return t.change if t else default
+
+    def values(self):
+        return self.by_symbol.values()
+
+    def __len__(self):
+        return len(self.by_symbol)
+
+    def __contains__(self, symbol):
+        return symbol in self.by_symbol
+
+
+_snapshots = {}
+_flights = singleflight.Group('tickers')
+_revalidator = swr.Revalidator('tickers')
+
+
+def _state(snap):
+    return None if snap is None else swr.state(time.time() - snap.fetched_at, TTL)
+
+
+def _fresh(source):
+    snap = _snapshots.get(source)
+    return snap if _state(snap) == swr.FRESH else None
+
+
+def _load(source, timings=None):
+    snap = _snapshots.get(source)
+    state = _state(snap)
+    if state == swr.FRESH:
+        metrics.cache('tickers', 'fresh')
+        return snap
+    if state == swr.STALE:
+        metrics.cache('tickers', 'stale')
+        _revalidator.trigger(source, _flights.do, source, _fetch, source, None)
+        return snap
+    snap, _ = _flights.do(source, _fetch, source, timings)
+    return snap
+
+
+def _fetch(source, timings):
+    # Otro vuelo pudo refrescarlo justo antes de que este empezara
+    snap = _fresh(source)
+    if snap is not None:
+        metrics.cache('tickers', 'fresh')
+        return snap
+    metrics.cache('tickers', 'miss')
+    rows = binance.fetch_json(binance.HOSTS[source], TICKER_PATHS[source], timings)
+    snap = _snapshots[source] = TickerSnapshot(source, rows)
+    return snap
+
+
+def get_snapshot(source='futures', fallback=True, timings=None):
+    """Snapshot de `source`; si falla y fallback=True, el de la otra fuente"""
+    try:
+        return _load(source, timings)
+    except Exception:
+        if not fallback:
+            raise
+        other = 'spot' if source == 'futures' else 'futures'
+        return _load(other, timings)
@@ -0,0 +1,128 @@
+"""Universo de pares USDT operables, derivado del snapshot de tickers."""
+import heapq
+import threading
+
+from . import tickers
+
+# Bases con estos fragmentos son tokens apalancados o de prueba...
+EXCLUDED_PARTS = ['UP', 'DOWN', 'BULL', 'BEAR', '1000', 'BULL', 'HALF']
+# ...salvo los contratos 1000x de Futures
+ALLOWED_1000X = ['1000PEPE', '1000SHIB', '1000FLOKI', '1000BONK', '1000SATS', '1000LUNC', '1000XEC', '1000RATS']
+
+
+def usdt_pairs(snapshot):
+    """Filas {'symbol','pair','price','change','volume',...} de los pares USDT válidos"""
+    source = snapshot.source
+    pairs = []
+    for t in snapshot.values():
+        sym = t.symbol
+        if not sym.endswith('USDT'):
+            continue
+        base = sym.replace('USDT', '')
+        # Skip leveraged tokens, test tokens, etc
+        if any(x in base for x in EXCLUDED_PARTS):
+            if base not in ALLOWED_1000X:
+                continue
+
+        price = t.price
+        if price <= 0:
+            continue
+
+        high = t.high
+        low = t.low
+
+        # Volatility = (high - low) / low * 100
+        volatility = ((high - low) / low * 100) if low > 0 else 0
+
+        pairs.append({
+            'symbol': base,
+            'pair': sym,
+            'price': price,
+            'change': round(t.change, 2),
+            'volume': round(t.volume, 0),
+            'high': high,
+            'low': low,
+            'volatility': round(volatility, 2),
+            'source': source,
+        })
+    return pairs
+
+
+# === SNAPSHOT RANKEADO ===
+
+TOP_N = 15
+
+
+def _rankings(pairs, n=TOP_N):
+    """Top gainers/losers/volumen/volatilidad por selección con heap (mismo orden que sorted()[:n])"""
+    return {
+        'top_gainers': heapq.nlargest(n, pairs, key=lambda x: x['change']),
+        'top_losers': heapq.nsmallest(n, pairs, key=lambda x: x['change']),
+        'top_volume': heapq.nlargest(n, pairs, key=lambda x: x['volume']),
+        'top_volatile': heapq.nlargest(n, pairs, key=lambda x: x['volatility']),
+    }
+
+
+class MarketSnapshot:
+    """Pares USDT de un TickerSnapshot con rankings e índice de búsqueda.
+
+    Se arma una vez por refresh del ticker; los modos de /api/symbols pasan
+    a ser lookups.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.source = snapshot.source
+        self.pairs = usdt_pairs(snapshot)
+        self.by_volume = sorted(self.pairs, key=lambda x: x['volume'], reverse=True)
+        self.rankings = _rankings(self.pairs)
+        volume_rank = {id(p): i for i, p in enumerate(self.by_volume)}
+        self._volume_rank = [volume_rank[id(p)] for p in self.pairs]
+        # substring -> índices en self.pairs (orden del snapshot)
+        index = {}
+        for i, p in enumerate(self.pairs):
+            sym = p['symbol']
+            subs = {sym[a:b] for a in range(len(sym)) for b in range(a + 1, len(sym) + 1)}
+            for s in subs:
+                index.setdefault(s, []).append(i)
+        self._index = index
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def _matches(self, q):
+        return self._index.get(q, ())
+
+    def search(self, q):
+        """Pares cuyo símbolo contiene `q`, en orden del snapshot"""
+        if not q:
+            return self.pairs
+        return [self.pairs[i] for i in self._matches(q)]
+
+    def search_by_volume(self, q):
+        """Pares que contienen `q` ordenados por volumen descendente"""
+        if not q:
+            return self.by_volume
+        return [self.by_volume[r] for r in sorted(self._volume_rank[i] for i in self._matches(q))]
+
+    def top_movers(self, q=''):
+        if not q:
+            return self.rankings
+        return _rankings(self.search(q))
+
+
+_markets = {}
+_markets_lock = threading.Lock()
+
+
+def get_market(source='futures'):
+    """MarketSnapshot del snapshot de tickers vigente (se rearma solo si cambió)"""
+    snapshot = tickers.get_snapshot(source)
+    market = _markets.get(snapshot.source)
+    if market is not None and market.snapshot is snapshot:
+        return market
+    with _markets_lock:
+        market = _markets.get(snapshot.source)
+        if market is None or market.snapshot is not snapshot:
+            market = _markets[snapshot.source] = MarketSnapshot(snapshot)
+        return market
@@ -0,0 +1,174 @@
+"""Cliente HTTPS con conexiones persistentes para todas las llamadas a Binance.
+
+Un único SSLContext y un pool de HTTPSConnection keep-alive por host, así
+una instancia warm deja de pagar TCP + TLS handshake en cada request.
+Acepta gzip y aplica timeouts por endpoint.
+
+Los errores se levantan como urllib.error.URLError / HTTPError para que los
+handlers sigan mapeándolos a 502 igual que con urlopen.
+
+UPSTREAM_OVERRIDE=http://127.0.0.1:8081 redirige todos los hosts a un
+Binance falso local (benchmarks, pruebas sin red).
+"""
+import gzip
+import http.client
+import json
+import os
+import ssl
+import threading
+import time
+import urllib.error
+from urllib.parse import urlparse
+
+from . import metrics
+
+USER_AGENT = "Mozilla/5.0"
+DEFAULT_TIMEOUT = 10
+MAX_IDLE_PER_HOST = 8
+IDLE_TIMEOUT = 30  # segundos; Binance cierra keep-alives inactivos
+
+# Timeouts por endpoint (prefijo del path, en segundos)
+TIMEOUTS = {
+    '/fapi/v1/klines': 6,
+    '/api/v3/klines': 6,
+    '/fapi/v1/ticker/24hr': 8,
+    '/api/v3/ticker/24hr': 8,
+}
+
+
+def timeout_for(path):
+    for prefix, timeout in TIMEOUTS.items():
+        if path.startswith(prefix):
+            return timeout
+    return DEFAULT_TIMEOUT
+
+
+class UpstreamClient:
+    def __init__(self, max_idle=MAX_IDLE_PER_HOST, override=None):
+        self.max_idle = max_idle
+        self.override = urlparse(override) if override else None
+        self._ssl = None
+        self._idle = {}  # host -> [(conn, last_used)]
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'connections_opened': 0, 'connections_reused': 0,
+                       'errors': 0, 'gzip_responses': 0, 'bytes_in': 0}
+
+    @property
+    def ssl_context(self):
+        if self._ssl is None:
+            self._ssl = ssl.create_default_context()
+        return self._ssl
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _connect(self, host, timeout):
+        self._count('connections_opened')
+        if self.override is not None:
+            o = self.override
+            if o.scheme == 'http':
+                return http.client.HTTPConnection(o.hostname, o.port or 80, timeout=timeout)
+            return http.client.HTTPSConnection(o.hostname, o.port or 443, timeout=timeout,
+                                               context=self.ssl_context)
+        return http.client.HTTPSConnection(host, timeout=timeout, context=self.ssl_context)
+
+    def _checkout(self, host, timeout):
+        now = time.monotonic()
+        with self._lock:
+            pool = self._idle.get(host, [])
+            while pool:
+                conn, last_used = pool.pop()
+                if now - last_used < IDLE_TIMEOUT:
+                    conn.timeout = timeout
+                    if conn.sock is not None:
+                        conn.sock.settimeout(timeout)
+                    self._stats['connections_reused'] += 1
+                    return conn, True
+                conn.close()
+        return self._connect(host, timeout), False
+
+    def _checkin(self, host, conn):
+        with self._lock:
+            pool = self._idle.setdefault(host, [])
+            if len(pool) < self.max_idle:
+                pool.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    @staticmethod
+    def _send(conn, path):
+        conn.request('GET', path, headers={
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': 'gzip',
+            'Connection': 'keep-alive',
+        })
+        resp = conn.getresponse()
+        return resp, resp.read()
+
+    def _request(self, host, path, timeout):
+        conn, reused = self._checkout(host, timeout)
+        try:
+            try:
+                resp, body = self._send(conn, path)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                # El server cerró el keep-alive mientras estaba idle: reintento con conexión nueva
+                conn.close()
+                conn = self._connect(host, timeout)
+                resp, body = self._send(conn, path)
+        except Exception:
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            self._checkin(host, conn)
+        return resp, body
+
+    def get(self, host, path, timeout=None):
+        """GET https://{host}{path} -> bytes (ya descomprimidos)"""
+        timeout = timeout if timeout is not None else timeout_for(path)
+        url = f"https://{host}{path}"
+        self._count('requests')
+        try:
+            resp, body = self._request(host, path, timeout)
+        except (OSError, http.client.HTTPException) as e:
+            self._count('errors')
+            if isinstance(e, urllib.error.URLError):
+                raise
+            raise urllib.error.URLError(e)
+        self._count('bytes_in', len(body))
+        if resp.getheader('Content-Encoding', '').lower() == 'gzip':
+            self._count('gzip_responses')
+            body = gzip.decompress(body)
+        if resp.status >= 400:
+            self._count('errors')
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+        return body
+
+    def get_json(self, host, path, timeout=None):
+        body = self.get(host, path, timeout)
+        with metrics.phase('upstream_json'):
+            return json.loads(body.decode())
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out['idle_connections'] = {h: len(p) for h, p in self._idle.items() if p}
+        return out
+
+    def close(self):
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for pool in pools.values():
+            for conn, _ in pool:
+                conn.close()
+
+
+client = UpstreamClient(override=os.environ.get('UPSTREAM_OVERRIDE'))
+
+
+def stats():
+    return client.stats()
@@ -0,0 +1,100 @@
+"""Snapshot de arranque empaquetado con el deploy.
+
+Pares USDT en trading de Futures y Spot (exchangeInfo). Lo genera el
+buildCommand de vercel.json en cada deploy y viaja con las funciones
+(includeFiles) como api/_core/warm_snapshot.json. A mano:
+
+    python -m api._core.warm_snapshot
+
+Si la red del build no llega a fapi (Binance Futures bloquea algunas
+regiones) no se escribe nada y el build sigue: queda el archivo que hubiera
+o, sin archivo, el orden de siempre.
+
+Se lee recién la primera vez que algo lo consulta. Es solo una pista de
+fuente: los pares que no existen en Futures van directo a Spot sin gastar un
+round trip en el 400 de fapi. Nunca se usa para rechazar un símbolo, así que
+un snapshot viejo o ausente solo vuelve al orden futures -> spot de siempre.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'warm_snapshot.json')
+EXCHANGE_INFO_PATHS = {
+    'futures': '/fapi/v1/exchangeInfo',
+    'spot': '/api/v3/exchangeInfo',
+}
+DEFAULT_ORDER = ('futures', 'spot')
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+        return {
+            'generated_at': raw.get('generated_at'),
+            **{source: frozenset(raw.get(source) or ()) for source in EXCHANGE_INFO_PATHS},
+        }
+    except (OSError, ValueError, AttributeError):
+        return {'generated_at': None, **{source: frozenset() for source in EXCHANGE_INFO_PATHS}}
+
+
+def load():
+    """{'generated_at', 'futures': frozenset, 'spot': frozenset}; sets vacíos sin archivo"""
+    global _snapshot
+    if _snapshot is None:
+        with _lock:
+            if _snapshot is None:
+                _snapshot = _read(SNAPSHOT_PATH)
+    return _snapshot
+
+
+def source_order(symbol):
+    """Fuentes a probar para klines/tickers de `symbol`, la más probable primero"""
+    snap = load()
+    if snap['futures'] and symbol not in snap['futures'] and symbol in snap['spot']:
+        return ('spot', 'futures')
+    return DEFAULT_ORDER
+
+
+# === BUILD ===
+
+def _usdt_pairs(info):
+    return sorted(s['symbol'][:-4] for s in info.get('symbols', [])
+                  if s.get('status') == 'TRADING' and s.get('symbol', '').endswith('USDT'))
+
+
+def build():
+    """exchangeInfo de cada fuente que responda (Futures puede estar bloqueado por región)"""
+    from . import binance
+
+    out = {'generated_at': int(time.time())}
+    for source, path in EXCHANGE_INFO_PATHS.items():
+        try:
+            out[source] = _usdt_pairs(binance.fetch_json(binance.HOSTS[source], path, timeout=20))
+        except Exception as e:
+            print(f'{source}: sin exchangeInfo ({e})')
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Generar el snapshot de arranque')
+    ap.add_argument('--output', default=SNAPSHOT_PATH)
+    args = ap.parse_args(argv)
+    snap = build()
+    # Sin Futures el snapshot no aporta nada; mejor no escribir uno a medias
+    if 'futures' not in snap:
+        print('Snapshot no generado: se usa el orden futures -> spot')
+        return
+    with open(args.output, 'w') as f:
+        json.dump(snap, f, separators=(',', ':'))
+    print(f"{args.output}: {len(snap['futures'])} futures, {len(snap.get('spot', []))} spot")
+
+
+if __name__ == '__main__':
+    main()
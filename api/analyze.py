@@ -1,8 +1,20 @@
 from http.server import BaseHTTPRequestHandler
+from bisect import bisect_right
 import json
-import urllib.request
-import ssl
+import urllib.error
 import math
+import time
+
+from api._core import binance
+from api._core import indicators as engine
+from api._core import candle_store
+from api._core import kline_cache
+from api._core import metrics
+from api._core import rolling
+from api._core import tickers as ticker_snapshot
+from api._core import warm_snapshot
+from api._core.candles import NAMES, CandleSeries, MalformedKlines
+from api._core.streaming import StreamingRSI
 
 # === CONSTANTES ===
 GRADE_A = ['BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'ADA', 'DOGE', 'AVAX', 'DOT', 'LINK', 'POL', 'LTC']
@@ -85,26 +97,38 @@ def round_price(value, price):
 
 # === INDICADORES ===
 
+def _column(candles, key):
+    """Columna de una CandleSeries (memoryview) o de velas dict (list)"""
+    if isinstance(candles, CandleSeries):
+        return candles[key]
+    return [c[key] for c in candles]
+
+
 def rsi(closes, period=14):
+    # Última vela en una pasada; StreamingRSI (streaming.py) repite la recursión vela a vela
     if len(closes) < period + 1:
         return 50.0
     gains, losses = 0.0, 0.0
-    for i in range(1, period + 1):
-        change = closes[i] - closes[i - 1]
+    prev = closes[0]
+    for x in closes[1:period + 1]:
+        change = x - prev
+        prev = x
         if change > 0:
             gains += change
         else:
             losses -= change
     avg_gain = gains / period
     avg_loss = losses / period
-    for i in range(period + 1, len(closes)):
-        change = closes[i] - closes[i - 1]
+    p1 = period - 1
+    for x in closes[period + 1:]:
+        change = x - prev
+        prev = x
         if change > 0:
-            avg_gain = (avg_gain * (period - 1) + change) / period
-            avg_loss = (avg_loss * (period - 1)) / period
+            avg_gain = (avg_gain * p1 + change) / period
+            avg_loss = (avg_loss * p1) / period
         else:
-            avg_gain = (avg_gain * (period - 1)) / period
-            avg_loss = (avg_loss * (period - 1) - change) / period
+            avg_gain = (avg_gain * p1) / period
+            avg_loss = (avg_loss * p1 - change) / period
     if avg_loss == 0:
         return 100.0
     rs = avg_gain / avg_loss
@@ -115,9 +139,10 @@ def ema(data, period):
     if not data or len(data) < period:
         return data[-1] if data else 0.0
     k = 2 / (period + 1)
+    k1 = 1 - k
     val = sum(data[:period]) / period
     for x in data[period:]:
-        val = x * k + val * (1 - k)
+        val = x * k + val * k1
     return val
 
 
@@ -130,18 +155,31 @@ def sma(data, period):
 def atr(candles, period=14):
     if len(candles) < period + 1:
         if len(candles) >= 2:
-            trs = [c['h'] - c['l'] for c in candles[-min(len(candles), period):]]
+            tail = candles[-min(len(candles), period):]
+            trs = [h - l for h, l in zip(_column(tail, 'h'), _column(tail, 'l'))]
             return sum(trs) / len(trs) if trs else 0.0
         return 0.0
+    if isinstance(candles, CandleSeries):
+        rows = zip(candles['h'], candles['l'], candles['c'])
+    else:
+        rows = ((c['h'], c['l'], c['c']) for c in candles)
+    _, _, pc = next(rows)
     trs = []
-    for i in range(1, len(candles)):
-        h, l, pc = candles[i]['h'], candles[i]['l'], candles[i - 1]['c']
-        trs.append(max(h - l, abs(h - pc), abs(l - pc)))
-    if not trs:
-        return 0.0
+    for h, l, c in rows:
+        # max(h - l, |h - pc|, |l - pc|) sin la llamada a max() por vela
+        tr = h - l
+        x = abs(h - pc)
+        if x > tr:
+            tr = x
+        x = abs(l - pc)
+        if x > tr:
+            tr = x
+        trs.append(tr)
+        pc = c
     atr_val = sum(trs[:period]) / period
+    p1 = period - 1
     for tr in trs[period:]:
-        atr_val = (atr_val * (period - 1) + tr) / period
+        atr_val = (atr_val * p1 + tr) / period
     return atr_val
 
 
@@ -150,20 +188,21 @@ def macd(closes, fast=12, slow=26, signal_period=9):
         return {'macd': 0, 'signal': 0, 'histogram': 0}
     k_fast = 2 / (fast + 1)
     k_slow = 2 / (slow + 1)
+    k_fast1 = 1 - k_fast
+    k_slow1 = 1 - k_slow
     ema_fast = sum(closes[:fast]) / fast
     ema_slow = sum(closes[:slow]) / slow
-    macd_series = []
-    for i in range(slow, len(closes)):
-        ema_fast = closes[i] * k_fast + ema_fast * (1 - k_fast)
-        ema_slow = closes[i] * k_slow + ema_slow * (1 - k_slow)
-        macd_series.append(ema_fast - ema_slow)
-    if len(macd_series) < signal_period:
-        return {'macd': macd_series[-1] if macd_series else 0, 'signal': 0, 'histogram': 0}
+    macd_line = []
+    for x in closes[slow:]:
+        ema_fast = x * k_fast + ema_fast * k_fast1
+        ema_slow = x * k_slow + ema_slow * k_slow1
+        macd_line.append(ema_fast - ema_slow)
     k_sig = 2 / (signal_period + 1)
-    signal_val = sum(macd_series[:signal_period]) / signal_period
-    for x in macd_series[signal_period:]:
-        signal_val = x * k_sig + signal_val * (1 - k_sig)
-    macd_val = macd_series[-1]
+    k_sig1 = 1 - k_sig
+    signal_val = sum(macd_line[:signal_period]) / signal_period
+    for x in macd_line[signal_period:]:
+        signal_val = x * k_sig + signal_val * k_sig1
+    macd_val = macd_line[-1]
     return {'macd': macd_val, 'signal': signal_val, 'histogram': macd_val - signal_val}
 
 
@@ -171,10 +210,8 @@ def bollinger_bands(closes, period=20, std_dev=2):
     if len(closes) < period:
         p = closes[-1] if closes else 0
         return {'upper': p, 'middle': p, 'lower': p, 'width': 0}
-    slc = closes[-period:]
-    middle = sum(slc) / period
-    variance = sum((x - middle) ** 2 for x in slc) / period
-    std = variance ** 0.5
+    st = rolling.window_stats(closes, period)
+    middle, std = st.mean, st.std
     return {
         'upper': middle + std * std_dev,
         'middle': middle,
@@ -186,27 +223,13 @@ def bollinger_bands(closes, period=20, std_dev=2):
 def stochastic(candles, k_period=14, d_period=3):
     if len(candles) < k_period:
         return {'k': 50, 'd': 50}
-    k_values = []
-    for i in range(k_period - 1, len(candles)):
-        window = candles[i - k_period + 1:i + 1]
-        high = max(c['h'] for c in window)
-        low = min(c['l'] for c in window)
-        close = candles[i]['c']
-        if high == low:
-            k_values.append(50)
-        else:
-            k_values.append(((close - low) / (high - low)) * 100)
-    k_val = k_values[-1] if k_values else 50
-    d_val = sum(k_values[-d_period:]) / min(d_period, len(k_values))
-    return {'k': k_val, 'd': d_val}
+    # Solo hacen falta las ventanas de los últimos d_period valores de %K
+    cols = engine.columns(CandleSeries.coerce(candles[-(k_period + d_period - 1):]))
+    st = engine.stochastic_series(cols.h, cols.l, cols.c, k_period, d_period)
+    return {'k': float(st['k'][-1]), 'd': float(st['d'][-1])}
 
 
-def volume_analysis(candles, period=20):
-    if len(candles) < period:
-        return {'ratio': 1.0, 'trend': 'normal'}
-    vols = [c['v'] for c in candles]
-    avg = sum(vols[-period:]) / period
-    current = vols[-1]
+def _volume_summary(current, avg):
     ratio = current / avg if avg > 0 else 1.0
     if ratio > 3.0:
         trend = 'spike'
@@ -219,13 +242,26 @@ def volume_analysis(candles, period=20):
     return {'ratio': round(ratio, 2), 'trend': trend}
 
 
+def volume_analysis(candles, period=20):
+    if len(candles) < period:
+        return {'ratio': 1.0, 'trend': 'normal'}
+    volumes = _column(candles, 'v')
+    avg = rolling.window_stats(volumes[-period:], period).mean
+    return _volume_summary(volumes[-1], avg)
+
+
 def detect_divergence(candles, period=14):
     if len(candles) < period + 5:
         return 'none'
-    closes = [c['c'] for c in candles]
+    closes = _column(candles, 'c')
+    # Una sola pasada incremental en vez de recalcular RSI sobre 5 prefijos
+    stream = StreamingRSI(period)
+    for x in closes[:-5]:
+        stream.push(x)
     rsi_vals = []
-    for i in range(len(candles) - 5, len(candles)):
-        rsi_vals.append(rsi(closes[:i + 1], period))
+    for x in closes[-5:]:
+        stream.push(x)
+        rsi_vals.append(stream.value)
     price_trend = closes[-1] - closes[-5]
     rsi_trend = rsi_vals[-1] - rsi_vals[0]
     if price_trend > 0 and rsi_trend < -3:
@@ -235,15 +271,93 @@ def detect_divergence(candles, period=14):
     return 'none'
 
 
+# === CONTEXTO DE INDICADORES ===
+
+class IndicatorContext:
+    """Indicadores de un set de velas (symbol, interval).
+
+    Cada indicador se calcula la primera vez que se pide y queda memoizado,
+    así los bots, calculate_tp_sl() y los análisis LONG/SHORT del mismo
+    símbolo comparten el trabajo. Acepta una CandleSeries o velas dict; las
+    velas dict no se convierten: cada indicador lee solo las columnas que usa.
+
+    Con `window` (streaming.WindowState de candles[:-1], ver
+    KlineCache.window) EMA, RSI, MACD y ATR salen del estado incremental más
+    la última vela, con el mismo valor que las funciones escalares.
+    """
+
+    def __init__(self, candles, window=None):
+        self.candles = CandleSeries.empty() if candles is None else candles
+        self.window = window
+        self._memo = {}
+
+    @classmethod
+    def wrap(cls, candles):
+        return candles if isinstance(candles, cls) else cls(candles)
+
+    def __len__(self):
+        return len(self.candles)
+
+    def _get(self, key, fn, *args):
+        try:
+            return self._memo[key]
+        except KeyError:
+            val = self._memo[key] = fn(*args)
+            return val
+
+    @property
+    def closes(self):
+        return self._get('closes', _column, self.candles, 'c')
+
+    @property
+    def volumes(self):
+        return self._get('volumes', _column, self.candles, 'v')
+
+    def _recursive(self, spec, fn, *args):
+        """Indicador recursivo `spec`: del estado de la ventana si hay, si no fn(*args)"""
+        if self.window is None:
+            return self._get(spec, fn, *args)
+        return self._get(spec, self.window.value, spec, self.candles[-1])
+
+    def ema(self, period):
+        return self._recursive(('ema', period), ema, self.closes, period)
+
+    def rsi(self, period=14):
+        return self._recursive(('rsi', period), rsi, self.closes, period)
+
+    def macd(self, fast=12, slow=26, signal_period=9):
+        return self._recursive(('macd', fast, slow, signal_period),
+                               macd, self.closes, fast, slow, signal_period)
+
+    def bollinger(self, period=20, std_dev=2):
+        return self._get(('bb', period, std_dev), bollinger_bands, self.closes, period, std_dev)
+
+    def atr(self, period=14):
+        return self._recursive(('atr', period), atr, self.candles, period)
+
+    def stochastic(self, k_period=14, d_period=3):
+        return self._get(('stoch', k_period, d_period), stochastic, self.candles, k_period, d_period)
+
+    def volume_avg(self, period=20):
+        return self._get(('vol_avg', period),
+                         lambda: rolling.window_stats(self.volumes[-period:], period).mean)
+
+    def volume(self, period=20):
+        if len(self.candles) < period:
+            return {'ratio': 1.0, 'trend': 'normal'}
+        return self._get(('volume', period),
+                         lambda: _volume_summary(self.volumes[-1], self.volume_avg(period)))
+
+
 # === BOTS DE ANÁLISIS ===
 
 def bot_trend(candles, price, direction):
-    if len(candles) < 21:
+    ctx = IndicatorContext.wrap(candles)
+    if len(ctx) < 21:
         return None
-    closes = [c['c'] for c in candles]
-    ema9 = ema(closes, 9)
-    ema21 = ema(closes, 21)
-    ema50 = ema(closes, 50) if len(closes) >= 50 else ema21
+    ema9 = ctx.ema(9)
+    ema21 = ctx.ema(21)
+    ema50 = ctx.ema(50) if len(ctx) >= 50 else ema21
     score = 0
     reasons = []
     if direction == 'LONG':
@@ -294,10 +408,11 @@ def bot_bitcoin(symbol, btc_change):
 
 
 def bot_rsi(candles, direction, interval='15m'):
+    ctx = IndicatorContext.wrap(candles)
     period = RSI_PERIODS.get(interval, 14)
-    if len(candles) < period + 1:
+    if len(ctx) < period + 1:
         return None
-    rsi_val = rsi([c['c'] for c in candles], period)
+    rsi_val = ctx.rsi(period)
     if direction == 'LONG':
         if rsi_val > 80:
             return {'name': 'RSI', 'signal': 'RED', 'score': 0,
@@ -339,13 +454,14 @@ def bot_rsi(candles, direction, interval='15m'):
 
 
 def bot_whales(candles):
-    if len(candles) < 20:
+    ctx = IndicatorContext.wrap(candles)
+    if len(ctx) < 20:
         return None
-    vol_data = volume_analysis(candles)
-    vols = [c['v'] for c in candles]
-    avg = sum(vols[-20:]) / 20
-    spikes = sum(1 for v in vols[-5:] if v > avg * 3)
-    big_spikes = sum(1 for v in vols[-5:] if v > avg * 5)
+    vol_data = ctx.volume(20)
+    avg = ctx.volume_avg(20)
+    recent = ctx.volumes[-5:]
+    spikes = sum(1 for v in recent if v > avg * 3)
+    big_spikes = sum(1 for v in recent if v > avg * 5)
     if big_spikes >= 2:
         return {'name': 'Ballenas', 'signal': 'RED', 'score': 10,
                 'reason': f'Manipulación extrema ({big_spikes} mega-spikes)', 'weight': 1.0}
@@ -376,15 +492,15 @@ def bot_quality(symbol):
 
 
 def bot_macd_bb(candles, direction, interval='15m'):
+    ctx = IndicatorContext.wrap(candles)
     bb_period = BB_PERIODS.get(interval, 20)
     macd_fast, macd_slow, macd_signal = MACD_PARAMS.get(interval, (12, 26, 9))
     min_candles = max(bb_period, macd_slow + macd_signal) + 5
-    if len(candles) < min_candles:
+    if len(ctx) < min_candles:
         return None
-    closes = [c['c'] for c in candles]
-    price = closes[-1]
-    macd_data = macd(closes, macd_fast, macd_slow, macd_signal)
-    bb = bollinger_bands(closes, bb_period)
+    price = ctx.closes[-1]
+    macd_data = ctx.macd(macd_fast, macd_slow, macd_signal)
+    bb = ctx.bollinger(bb_period)
     score = 0
     reasons = []
     if direction == 'LONG':
@@ -460,14 +576,16 @@ def bot_macro(btc_change, eth_change, direction):
 # === MOTOR DE ANÁLISIS ===
 
 def analyze(symbol, direction, candles, price, btc_change, eth_change, base_lev=50, interval='15m'):
+    # candles puede ser un IndicatorContext ya construido (p.ej. LONG y SHORT del mismo símbolo)
+    ctx = IndicatorContext.wrap(candles)
     results = []
     bots = [
-        bot_trend(candles, price, direction),
+        bot_trend(ctx, price, direction),
         bot_bitcoin(symbol, btc_change),
-        bot_rsi(candles, direction, interval),  # NUEVO: pasa interval para adaptar período
-        bot_whales(candles),
+        bot_rsi(ctx, direction, interval),  # NUEVO: pasa interval para adaptar período
+        bot_whales(ctx),
         bot_quality(symbol),
-        bot_macd_bb(candles, direction, interval),  # NUEVO: pasa interval para adaptar períodos
+        bot_macd_bb(ctx, direction, interval),  # NUEVO: pasa interval para adaptar períodos
         bot_macro(btc_change, eth_change, direction),
     ]
     results = [b for b in bots if b is not None]
@@ -573,167 +691,336 @@ def calculate_tp_sl(price, direction, atr_val, interval):
     return tp, sl, rr
 
 
-# === HANDLER HTTP ===
-# CAMBIADO: Futures API (fapi/v1) con fallback a Spot (api/v3)
-
-FUTURES_HOSTS = [
-    "fapi.binance.com",
-]
-
-SPOT_HOSTS = [
-    "api.binance.com",
-    "api1.binance.com",
-    "api2.binance.com",
-    "api3.binance.com",
-    "api4.binance.com",
-    "data-api.binance.vision",
-]
-
-# NUEVO: Caché simple con TTL (funciona en warm starts de Vercel)
-import time
-_cache = {}
-_CACHE_TTL = 5  # segundos
-
-def _get_cached(key):
-    """Obtener valor de caché si no expiró"""
-    if key in _cache:
-        data, timestamp = _cache[key]
-        if time.time() - timestamp < _CACHE_TTL:
-            return data
-        del _cache[key]
-    return None
-
-def _set_cached(key, data):
-    """Guardar en caché con timestamp"""
-    _cache[key] = (data, time.time())
-    # Limpiar caché viejo (máximo 50 entries)
-    if len(_cache) > 50:
-        oldest = min(_cache.keys(), key=lambda k: _cache[k][1])
-        del _cache[oldest]
-
-
-def _fetch_json(hosts, path, ctx):
-    """Helper para fetch con SSL, timeout y fallback de hosts"""
-    last_error = None
-    for host in hosts:
+# === PIPELINE DE ANÁLISIS ===
+
+MAX_BATCH = 50
+MAX_LOOKBACK = 1000
+
+
+class AnalyzeError(Exception):
+    """Error de una solicitud de análisis con su status HTTP"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_request(item):
+    """Normalizar {symbol, direction, interval, leverage} y validar"""
+    if not isinstance(item, dict):
+        raise AnalyzeError(400, 'Cada solicitud debe ser un objeto JSON')
+    symbol = (item.get('symbol') or 'BTC').upper().replace('USDT', '')
+    direction = (item.get('direction') or 'LONG').upper()
+    base_lev = item.get('leverage') or 50
+    interval = item.get('interval') or '15m'
+    if direction not in ('LONG', 'SHORT'):
+        raise AnalyzeError(400, f'Direction inválida: {direction}')
+    if interval not in VALID_INTERVALS:
+        raise AnalyzeError(400, f'Interval inválido: {interval}')
+    return symbol, direction, base_lev, interval
+
+
+def _load_klines(symbol, interval, timings=None):
+    """Klines desde la caché LRU (Futures primero, fallback Spot)"""
+    return kline_cache.get_klines(symbol, interval, 100, timings)
+
+
+def _load_history(symbol, interval, lookback, timings=None):
+    """Velas cerradas del store local + la vela abierta de la caché.
+
+    El store se pide de la misma fuente que la caché: si el archivo es de la
+    otra (Futures vs Spot), se descarta y se vuelve a bajar, así nunca se
+    mezclan precios de los dos mercados.
+    """
+    live, live_source = kline_cache.get_klines(symbol, interval, 2, timings)
+    if not isinstance(live, CandleSeries):
+        live = live_source = None
+    view = candle_store.store.tail(symbol, interval, lookback - 1, source=live_source)
+    # Las columnas del store son memoryviews sobre el mmap: se copian una vez al concatenar
+    history = CandleSeries({name: view[name] for name in NAMES})
+    if live is None:
+        return history, view.source
+    last_t = view['t'][-1] if len(view) else -1
+    return CandleSeries.concat([history, live[bisect_right(live['t'], last_t):]]), view.source
+
+
+def _load_candles(symbol, interval, timings=None, lookback=100):
+    """(IndicatorContext, data_source) para un símbolo/intervalo.
+
+    Con lookback > 100 la historia sale del candle store local.
+    """
+    # La caché ya valida la estructura de cada kline al parsearla
+    try:
+        if lookback > 100:
+            candles, data_source = _load_history(symbol, interval, lookback, timings)
+        else:
+            candles, data_source = _load_klines(symbol, interval, timings)
+    except MalformedKlines as e:
+        raise AnalyzeError(400, str(e))
+
+    # NUEVO: Validar que klines sea un array válido
+    if not isinstance(candles, CandleSeries) or len(candles) == 0:
+        raise AnalyzeError(400, f'Símbolo inválido o sin datos: {symbol}USDT')
+    if lookback > 100:
+        return IndicatorContext(candles), data_source
+    # Ventana de la caché: entre ticks de la misma vela solo cambia la vela abierta
+    return IndicatorContext(candles, kline_cache.cache.window(symbol, interval, candles)), data_source
+
+
+def _load_tickers(data_source, timings=None):
+    """Snapshot de tickers de la MISMA fuente que klines (la otra como fallback)"""
+    try:
+        return ticker_snapshot.get_snapshot(data_source, timings=timings)
+    except ValueError as e:
+        raise AnalyzeError(502, str(e))
+    except Exception as e:
+        raise AnalyzeError(502, f'No se pudo obtener tickers: {str(e)}')
+
+
+def _load_market(symbol, interval, timings=None, lookback=100):
+    """(IndicatorContext, data_source, TickerSnapshot) con klines y tickers en paralelo.
+
+    Los tickers de la fuente más probable (Futures, o Spot si el snapshot de
+    arranque dice que el par no existe en Futures) se piden junto con las
+    klines; si las klines salen de la otra fuente se piden esos tickers, así
+    la fuente de tickers sigue siendo la misma que la de klines.
+    """
+    guess = warm_snapshot.source_order(symbol)[0]
+    speculative = binance.submit(_load_tickers, guess, timings)
+    indicators, data_source = _load_candles(symbol, interval, timings, lookback)
+    if data_source == guess:
+        return indicators, data_source, speculative.result()
+    return indicators, data_source, _load_tickers(data_source, timings)
+
+
+def _run_analysis(symbol, direction, base_lev, interval, indicators, data_source, tickers):
+    """analyze() + TP/SL sobre datos ya descargados (tickers: TickerSnapshot)"""
+    btc_change = tickers.change('BTCUSDT')
+    eth_change = tickers.change('ETHUSDT')
+    ticker = tickers.get(f'{symbol}USDT') if symbol not in ('BTC', 'ETH') else None
+    price = ticker.price if ticker else (indicators.closes[-1] if len(indicators) else 0.0)
+    return analysis_result(symbol, direction, base_lev, interval, indicators, data_source,
+                           price, btc_change, eth_change)
+
+
+def analysis_result(symbol, direction, base_lev, interval, indicators, data_source,
+                    price, btc_change, eth_change):
+    """analyze() + TP/SL con precio y contexto macro ya resueltos"""
+    result = analyze(symbol, direction, indicators, price, btc_change, eth_change, base_lev, interval)
+
+    # Calculate TP/SL with proper precision
+    atr_val = indicators.atr()
+    tp, sl, rr = calculate_tp_sl(price, direction, atr_val, interval)
+
+    result['tp'] = tp
+    result['sl'] = sl
+    result['rr_ratio'] = rr
+    result['price'] = round_price(price, price)
+    result['direction'] = direction
+    result['symbol'] = symbol
+    result['atr'] = round_price(atr_val, price)
+    result['atr_pct'] = round(atr_val / price * 100, 4) if price > 0 else 0
+    result['interval'] = interval
+    result['source'] = data_source
+    return result
+
+
+def _error_item(e):
+    if isinstance(e, AnalyzeError):
+        return {'error': str(e), 'status': e.status}
+    if isinstance(e, urllib.error.URLError):
+        return {'error': f'Binance no responde: {str(e)}', 'status': 502}
+    return {'error': str(e), 'status': 500}
+
+
+def analyze_batch(items):
+    """Analizar varias solicitudes compartiendo descargas.
+
+    Las klines se deduplican por (symbol, interval) y se bajan en paralelo;
+    cada fuente de datos usa un único snapshot de tickers. Un error afecta
+    solo a su item.
+    """
+    parsed = []
+    for item in items:
+        try:
+            parsed.append(_parse_request(item))
+        except AnalyzeError as e:
+            parsed.append(e)
+
+    keys = list(dict.fromkeys((p[0], p[3]) for p in parsed if not isinstance(p, Exception)))
+    tickers = {}
+    loaded = {}
+    if keys:
+        # Tickers de Futures en paralelo con las klines (la fuente más común)
+        speculative = binance.submit(_load_tickers, 'futures')
+        futures = {key: binance.submit(_load_candles, key[0], key[1]) for key in keys}
+        for key, fut in futures.items():
+            try:
+                loaded[key] = fut.result()
+            except Exception as e:
+                loaded[key] = e
         try:
-            url = f"https://{host}{path}"
-            req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-            resp = urllib.request.urlopen(req, timeout=10, context=ctx)
-            return json.loads(resp.read().decode())
+            tickers['futures'] = speculative.result()
         except Exception as e:
-            last_error = e
+            tickers['futures'] = e
+
+    results = []
+    for p, item in zip(parsed, items):
+        if isinstance(p, Exception):
+            results.append({**_error_item(p), 'request': item})
             continue
-    raise last_error
+        symbol, direction, base_lev, interval = p
+        try:
+            data = loaded[(symbol, interval)]
+            if isinstance(data, Exception):
+                raise data
+            indicators, data_source = data
+            if data_source not in tickers:
+                try:
+                    tickers[data_source] = _load_tickers(data_source)
+                except Exception as e:
+                    tickers[data_source] = e
+            if isinstance(tickers[data_source], Exception):
+                raise tickers[data_source]
+            results.append(_run_analysis(symbol, direction, base_lev, interval,
+                                         indicators, data_source, tickers[data_source]))
+        except Exception as e:
+            results.append({**_error_item(e), 'symbol': symbol, 'direction': direction,
+                            'interval': interval})
+    return results
 
 
-class handler(BaseHTTPRequestHandler):
-    def do_OPTIONS(self):
-        self._send_json(200, {})
+# === MULTI-TIMEFRAME ===
 
-    def do_POST(self):
+MAX_TIMEFRAMES = 5
+# Peso de cada timeframe en la confluencia: los mayores filtran más ruido
+MTF_WEIGHTS = {
+    '1m': 0.5, '3m': 0.6, '5m': 0.7, '15m': 1.0, '30m': 1.1,
+    '1h': 1.3, '2h': 1.4, '4h': 1.6, '1d': 1.8, '1w': 2.0
+}
+
+
+def confluence(results):
+    """Score combinado de varios timeframes (CANCEL cuenta como 0)"""
+    valid = {tf: r for tf, r in results.items() if 'decision' in r}
+    if not valid:
+        return {'score': 0, 'decision': 'WAIT', 'aligned': 0, 'total': 0,
+                'reason': 'Sin timeframes válidos'}
+    total_w = sum(MTF_WEIGHTS.get(tf, 1.0) for tf in valid)
+    score = int(sum((0 if r['decision'] == 'CANCEL' else r['confidence']) * MTF_WEIGHTS.get(tf, 1.0)
+                    for tf, r in valid.items()) / total_w)
+    n = len(valid)
+    enters = len([r for r in valid.values() if r['decision'] == 'ENTER'])
+    cancels = len([r for r in valid.values() if r['decision'] == 'CANCEL'])
+    if cancels * 2 >= n:
+        decision, label = 'CANCEL', 'Timeframes en contra'
+    elif enters == n and score >= 60:
+        decision, label = 'ENTER', 'Confluencia total'
+    elif enters * 3 >= n * 2 and cancels == 0 and score >= 55:
+        decision, label = 'ENTER', 'Confluencia parcial'
+    else:
+        decision, label = 'WAIT', 'Sin confluencia'
+    return {'score': score, 'decision': decision, 'aligned': enters, 'total': n,
+            'reason': f'{label} ({enters}/{n} ENTER, {cancels} CANCEL) - Score: {score}%'}
+
+
+def analyze_multi_tf(symbol, direction, base_lev, intervals):
+    """analyze() + calculate_tp_sl() por timeframe, con descargas en paralelo"""
+    t_start = time.perf_counter()
+    timings = []
+    guess = warm_snapshot.source_order(symbol)[0]
+    speculative = binance.submit(_load_tickers, guess, timings)
+    futures = {iv: binance.submit(_load_candles, symbol, iv, timings) for iv in intervals}
+
+    results = {}
+    tickers = {}
+    for iv, fut in futures.items():
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = json.loads(self.rfile.read(content_length).decode()) if content_length else {}
+            indicators, data_source = fut.result()
+            if data_source not in tickers:
+                tickers[data_source] = (speculative.result() if data_source == guess
+                                        else _load_tickers(data_source, timings))
+            results[iv] = _run_analysis(symbol, direction, base_lev, iv,
+                                        indicators, data_source, tickers[data_source])
+        except Exception as e:
+            results[iv] = _error_item(e)
 
-            symbol = (body.get('symbol') or 'BTC').upper().replace('USDT', '')
-            direction = (body.get('direction') or 'LONG').upper()
-            base_lev = body.get('leverage') or 50
-            interval = body.get('interval') or '15m'
+    return {
+        'symbol': symbol,
+        'direction': direction,
+        'timeframes': results,
+        'confluence': confluence(results),
+        'latency': {
+            'total_ms': round((time.perf_counter() - t_start) * 1000, 1),
+            'upstream': timings,
+        },
+    }
 
-            if direction not in ('LONG', 'SHORT'):
-                self._send_json(400, {'error': f'Direction inválida: {direction}'})
-                return
-            if interval not in VALID_INTERVALS:
-                self._send_json(400, {'error': f'Interval inválido: {interval}'})
-                return
 
-            ctx = ssl.create_default_context()
+# === HANDLER HTTP ===
 
-            # --- KLINES: Con caché + Futures primero, fallback Spot ---
-            kline_path = f"?symbol={symbol}USDT&interval={interval}&limit=100"
-            cache_key = f"klines:{symbol}:{interval}"
-            cached = _get_cached(cache_key)
+class handler(metrics.ServerTiming, BaseHTTPRequestHandler):
+    def do_OPTIONS(self):
+        self._send_json(200, {})
 
-            if cached:
-                klines, data_source = cached
-            else:
-                data_source = 'futures'
-                try:
-                    klines = _fetch_json(FUTURES_HOSTS, f"/fapi/v1/klines{kline_path}", ctx)
-                except Exception:
-                    klines = _fetch_json(SPOT_HOSTS, f"/api/v3/klines{kline_path}", ctx)
-                    data_source = 'spot'
-                _set_cached(cache_key, (klines, data_source))
-
-            # NUEVO: Validar que klines sea un array válido
-            if not isinstance(klines, list) or len(klines) == 0:
-                self._send_json(400, {'error': f'Símbolo inválido o sin datos: {symbol}USDT'})
+    @metrics.timed('analyze')
+    def do_POST(self):
+        try:
+            with metrics.phase('parse'):
+                content_length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(content_length).decode()) if content_length else {}
+
+            # Batch: {"requests": [{symbol, direction, interval, leverage}, ...]} o un array
+            items = body if isinstance(body, list) else body.get('requests')
+            if items is not None:
+                if not isinstance(items, list) or not items:
+                    self._send_json(400, {'error': 'requests debe ser un array no vacío'})
+                    return
+                if len(items) > MAX_BATCH:
+                    self._send_json(400, {'error': f'Máximo {MAX_BATCH} solicitudes por batch'})
+                    return
+                with metrics.phase('batch'):
+                    results = analyze_batch(items)
+                self._send_json(200, {'results': results, 'count': len(results)})
                 return
 
-            # NUEVO: Validar estructura de cada kline antes de procesar
-            try:
-                candles = [{'o': float(k[1]), 'h': float(k[2]), 'l': float(k[3]),
-                            'c': float(k[4]), 'v': float(k[5])} for k in klines]
-            except (IndexError, ValueError, TypeError) as e:
-                self._send_json(400, {'error': f'Datos de klines malformados: {str(e)}'})
+            # Multi-timeframe: {"symbol", "direction", "intervals": ["15m", "1h", "4h"]}
+            if body.get('intervals') is not None:
+                intervals = body['intervals']
+                if not isinstance(intervals, list) or not intervals:
+                    self._send_json(400, {'error': 'intervals debe ser un array no vacío'})
+                    return
+                if not all(isinstance(iv, str) for iv in intervals):
+                    self._send_json(400, {'error': 'intervals debe contener strings'})
+                    return
+                intervals = list(dict.fromkeys(intervals))
+                if len(intervals) > MAX_TIMEFRAMES:
+                    self._send_json(400, {'error': f'Máximo {MAX_TIMEFRAMES} intervals'})
+                    return
+                for iv in intervals:
+                    _parse_request({**body, 'interval': iv})
+                symbol, direction, base_lev, _ = _parse_request(body)
+                with metrics.phase('multi_tf'):
+                    result = analyze_multi_tf(symbol, direction, base_lev, intervals)
+                self._send_json(200, result)
                 return
 
-            # --- TICKERS: Con caché + usar MISMA fuente que klines para consistencia ---
-            ticker_cache_key = f"tickers:{data_source}"
-            tickers = _get_cached(ticker_cache_key)
-
-            if not tickers:
-                try:
-                    if data_source == 'futures':
-                        tickers = _fetch_json(FUTURES_HOSTS, "/fapi/v1/ticker/24hr", ctx)
-                    else:
-                        tickers = _fetch_json(SPOT_HOSTS, "/api/v3/ticker/24hr", ctx)
-                except Exception:
-                    # Si falla, intentar la otra fuente como fallback
-                    try:
-                        if data_source == 'futures':
-                            tickers = _fetch_json(SPOT_HOSTS, "/api/v3/ticker/24hr", ctx)
-                        else:
-                            tickers = _fetch_json(FUTURES_HOSTS, "/fapi/v1/ticker/24hr", ctx)
-                    except Exception as e:
-                        self._send_json(502, {'error': f'No se pudo obtener tickers: {str(e)}'})
-                        return
-                _set_cached(ticker_cache_key, tickers)
-
-            # Validar que tickers sea un array
-            if not isinstance(tickers, list):
-                self._send_json(502, {'error': 'Respuesta de tickers inválida'})
+            symbol, direction, base_lev, interval = _parse_request(body)
+            lookback = body.get('lookback')
+            lookback = 100 if lookback is None else lookback
+            # bool es subclase de int: `true` no es lookback=1
+            if isinstance(lookback, bool) or not isinstance(lookback, int) or not 1 <= lookback <= MAX_LOOKBACK:
+                self._send_json(400, {'error': f'lookback debe ser un entero entre 1 y {MAX_LOOKBACK}'})
                 return
-
-            btc_change, eth_change, price = 0.0, 0.0, candles[-1]['c'] if candles else 0.0
-            for t in tickers:
-                if t['symbol'] == 'BTCUSDT':
-                    btc_change = float(t['priceChangePercent'])
-                elif t['symbol'] == 'ETHUSDT':
-                    eth_change = float(t['priceChangePercent'])
-                elif t['symbol'] == f'{symbol}USDT':
-                    price = float(t['lastPrice'])
-
-            result = analyze(symbol, direction, candles, price, btc_change, eth_change, base_lev, interval)
-
-            # Calculate TP/SL with proper precision
-            atr_val = atr(candles)
-            tp, sl, rr = calculate_tp_sl(price, direction, atr_val, interval)
-
-            result['tp'] = tp
-            result['sl'] = sl
-            result['rr_ratio'] = rr
-            result['price'] = round_price(price, price)
-            result['direction'] = direction
-            result['symbol'] = symbol
-            result['atr'] = round_price(atr_val, price)
-            result['atr_pct'] = round(atr_val / price * 100, 4) if price > 0 else 0
-            result['interval'] = interval
-            result['source'] = data_source
-
+            with metrics.phase('fetch'):
+                indicators, data_source, tickers = _load_market(symbol, interval, lookback=lookback)
+            with metrics.phase('analysis'):
+                result = _run_analysis(symbol, direction, base_lev, interval,
+                                       indicators, data_source, tickers)
             self._send_json(200, result)
 
+        except AnalyzeError as e:
+            self._send_json(e.status, {'error': str(e)})
         except urllib.error.URLError as e:
             self._send_json(502, {'error': f'Binance no responde: {str(e)}'})
         except json.JSONDecodeError:
@@ -742,10 +1029,12 @@ class handler(BaseHTTPRequestHandler):
             self._send_json(500, {'error': str(e)})
 
     def _send_json(self, status, data):
+        with metrics.phase('serialize'):
+            body = json.dumps(data).encode()
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
@@ -1,51 +1,42 @@
 from http.server import BaseHTTPRequestHandler
+from array import array
+from bisect import bisect_right
+import gzip
+import hashlib
 import json
-import urllib.request
-import ssl
+import sys
+import time
+import urllib.error
 from urllib.parse import urlparse, parse_qs
 
+from api._core import candle_store, kline_cache, metrics
+from api._core.candles import COLUMNS, CandleSeries
+from api._core.kline_cache import INTERVAL_MS
+
 VALID_INTERVALS = ['1m', '3m', '5m', '15m', '30m', '1h', '2h', '4h', '1d', '1w']
 VALID_SYMBOLS = ['BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'ADA', 'DOGE', 'AVAX',
                  'DOT', 'LINK', 'POL', 'LTC', 'ARB', 'OP', 'INJ']
 MAX_LIMIT = 500
+MAX_RANGE_LIMIT = 5000  # por página en modo rango (startTime/endTime)
 
-# Binance FUTURES endpoints (USD-M)
-FUTURES_HOSTS = [
-    "fapi.binance.com",
-]
-
-# Fallback: Spot API
-SPOT_HOSTS = [
-    "api.binance.com",
-    "api1.binance.com",
-    "api2.binance.com",
-    "api3.binance.com",
-    "api4.binance.com",
-    "data-api.binance.vision",
-]
-
-
-def _fetch_with_fallback(hosts, path, ctx, timeout=10):
-    last_error = None
-    for host in hosts:
-        try:
-            url = f"https://{host}{path}"
-            req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-            resp = urllib.request.urlopen(req, timeout=timeout, context=ctx)
-            return json.loads(resp.read().decode())
-        except Exception as e:
-            last_error = e
-            continue
-    raise last_error
+# json: un objeto por vela | columnar: arrays paralelos | binary: buffers little-endian
+FORMATS = ('json', 'columnar', 'binary')
+GZIP_MIN_BYTES = 1024
 
 
-class handler(BaseHTTPRequestHandler):
+class handler(metrics.ServerTiming, BaseHTTPRequestHandler):
+    @metrics.timed('klines')
     def do_GET(self):
         try:
             query = parse_qs(urlparse(self.path).query)
             symbol = query.get('symbol', ['BTC'])[0].upper()
             interval = query.get('interval', ['15m'])[0]
-            limit = min(int(query.get('limit', ['100'])[0]), MAX_LIMIT)
+            fmt = query.get('format', ['json'])[0]
+            range_mode = 'startTime' in query or 'endTime' in query
+            if range_mode:
+                limit = min(int(query.get('limit', ['1000'])[0]), MAX_RANGE_LIMIT)
+            else:
+                limit = min(int(query.get('limit', ['100'])[0]), MAX_LIMIT)
 
             if symbol not in VALID_SYMBOLS:
                 self._send_json(400, {'error': f'Symbol inválido: {symbol}'})
@@ -56,34 +47,33 @@ class handler(BaseHTTPRequestHandler):
             if limit < 1:
                 self._send_json(400, {'error': 'Limit debe ser >= 1'})
                 return
+            if fmt not in FORMATS:
+                self._send_json(400, {'error': f'Format inválido: {fmt}'})
+                return
+
+            if range_mode:
+                self._send_range(query, symbol, interval, limit, fmt)
+                return
+
+            # Caché de klines compartida: Futures primero, fallback a Spot
+            with metrics.phase('fetch'):
+                series, source = kline_cache.get_klines(symbol, interval, limit)
+            if not isinstance(series, CandleSeries):
+                self._send_json(502, {'error': 'Respuesta inesperada de Binance'})
+                return
+
+            # La vela abierta cambia en cada tick: entra entera en el ETag
+            t = series['t']
+            n_closed = bisect_right(t, int(time.time() * 1000) - INTERVAL_MS[interval])
+            etag = self._etag(symbol, interval, fmt, source, len(series),
+                              t[0] if len(t) else None,
+                              t[n_closed - 1] if n_closed else None,
+                              list(series[n_closed:]))
+            if self._not_modified(etag):
+                return
 
-            ctx = ssl.create_default_context()
-            kline_path = f"?symbol={symbol}USDT&interval={interval}&limit={limit}"
-
-            # Intentar Futures API primero, fallback a Spot
-            try:
-                data = _fetch_with_fallback(
-                    FUTURES_HOSTS, f"/fapi/v1/klines{kline_path}", ctx
-                )
-                source = 'futures'
-            except Exception:
-                data = _fetch_with_fallback(
-                    SPOT_HOSTS, f"/api/v3/klines{kline_path}", ctx
-                )
-                source = 'spot'
-
-            candles = [{
-                't': k[0],
-                'o': float(k[1]),
-                'h': float(k[2]),
-                'l': float(k[3]),
-                'c': float(k[4]),
-                'v': float(k[5]),
-                'trades': int(k[8]),
-                'source': source
-            } for k in data]
-
-            self._send_json(200, candles)
+            cols = {name: series[name] for name, _ in COLUMNS}
+            self._send_candles(cols, source, fmt, {'ETag': etag})
 
         except urllib.error.URLError as e:
             self._send_json(502, {'error': f'Binance no responde: {str(e)}'})
@@ -92,10 +82,114 @@ class handler(BaseHTTPRequestHandler):
         except Exception as e:
             self._send_json(500, {'error': str(e)})
 
-    def _send_json(self, status, data):
+    def _send_range(self, query, symbol, interval, limit, fmt='json'):
+        """Historia profunda desde el store local (solo velas cerradas).
+
+        Pagina con X-Next-Start-Time: pedir de nuevo con startTime=<ese valor>.
+        """
+        iv = INTERVAL_MS[interval]
+        end_t = int(query['endTime'][0]) if 'endTime' in query else int(time.time() * 1000)
+        start_t = int(query['startTime'][0]) if 'startTime' in query else end_t - limit * iv
+        if start_t > end_t:
+            self._send_json(400, {'error': 'startTime debe ser <= endTime'})
+            return
+
+        with metrics.phase('fetch'):
+            view, next_t = candle_store.store.range(symbol, interval, start_t, end_t, limit)
+        cols = {name: view[name] for name, _ in COLUMNS}
+        t = cols['t']
+        # Solo velas cerradas: el rango exacto identifica el contenido
+        headers = {'ETag': self._etag(symbol, interval, fmt, view.source, len(view),
+                                      t[0] if len(view) else None,
+                                      t[-1] if len(view) else None, next_t)}
+        if next_t is not None:
+            headers['X-Next-Start-Time'] = str(next_t)
+        if self._not_modified(headers['ETag'], headers):
+            return
+        self._send_candles(cols, view.source, fmt, headers)
+
+    # === FORMATOS ===
+
+    def _etag(self, *key):
+        """ETag fuerte por representación (incluye la codificación negociada)"""
+        raw = json.dumps([*key, self._wants_gzip()], default=str)
+        return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+    def _wants_gzip(self):
+        return 'gzip' in (self.headers.get('Accept-Encoding') or '').lower()
+
+    def _not_modified(self, etag, headers=None):
+        tags = [x.strip() for x in (self.headers.get('If-None-Match') or '').split(',')]
+        if etag not in tags and '*' not in tags:
+            return False
+        self.send_response(304)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'public, max-age=5')
+        self.send_header('Vary', 'Accept-Encoding')
+        for key, value in {'ETag': etag, **(headers or {})}.items():
+            self.send_header(key, value)
+        self.end_headers()
+        return True
+
+    def _send_candles(self, cols, source, fmt, headers):
+        with metrics.phase('serialize'):
+            body, content_type, headers = self._encode_candles(cols, source, fmt, headers)
+        self._send_body(200, body, content_type, headers)
+
+    def _encode_candles(self, cols, source, fmt, headers):
+        """(body, content-type, headers) de las velas en el formato pedido.
+
+        Las columnas son memoryviews (de la CandleSeries o del mmap del store).
+        """
+        n = len(cols['t'])
+        if fmt == 'binary':
+            # Columnas contiguas en el orden de COLUMNS, 8 bytes por valor
+            parts = []
+            for name, code in COLUMNS:
+                col = cols[name]
+                if sys.byteorder == 'big':
+                    col = array(code, col)
+                    col.byteswap()
+                parts.append(col.tobytes())
+            headers = dict(headers, **{
+                'X-Kline-Count': str(n),
+                'X-Kline-Columns': ','.join(f"{name}:{'i64' if code == 'q' else 'f64'}" for name, code in COLUMNS),
+                'X-Kline-Source': source,
+            })
+            return b''.join(parts), 'application/octet-stream', headers
+        if fmt == 'columnar':
+            data = {'source': source, 'count': n}
+            data.update((name, cols[name].tolist()) for name, _ in COLUMNS)
+        else:
+            names = [name for name, _ in COLUMNS]
+            data = [dict(zip(names, row), source=source) for row in zip(*(cols[k].tolist() for k in names))]
+        return json.dumps(data).encode(), 'application/json', headers
+
+    def _send_body(self, status, body, content_type, headers=None):
+        gz = self._wants_gzip() and len(body) >= GZIP_MIN_BYTES
+        if gz:
+            with metrics.phase('gzip'):
+                body = gzip.compress(body, compresslevel=5)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'public, max-age=5')
+        self.send_header('Vary', 'Accept-Encoding')
+        if gz:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode()
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Cache-Control', 'public, max-age=5')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
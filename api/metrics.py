@@ -0,0 +1,55 @@
+"""GET /api/metrics: histogramas y contadores de la instancia (Prometheus text 0.0.4).
+
+En Vercel la ruta es pública, así que exige METRICS_TOKEN:
+
+    curl -H 'Authorization: Bearer $METRICS_TOKEN' https://.../api/metrics
+
+Sin METRICS_TOKEN configurado responde 404. server.py monta local_handler:
+con METRICS_LOOPBACK=1 acepta sin token a clientes de loopback (solo si el
+server no está detrás de un proxy del mismo host, que llega desde 127.0.0.1).
+"""
+import hmac
+import os
+from http.server import BaseHTTPRequestHandler
+
+from api._core import metrics
+
+TOKEN = os.environ.get('METRICS_TOKEN', '')
+LOOPBACK_OPEN = os.environ.get('METRICS_LOOPBACK', '0') == '1'
+LOOPBACK = ('127.0.0.1', '::1')
+
+
+class handler(BaseHTTPRequestHandler):
+    def _authorized(self):
+        if not TOKEN:
+            return False
+        auth = self.headers.get('Authorization', '')
+        return hmac.compare_digest(auth.encode(), f'Bearer {TOKEN}'.encode())
+
+    def do_GET(self):
+        if not self._authorized():
+            # 404 sin token configurado: no delatar que la ruta existe
+            self._send(401 if TOKEN else 404, b'', {'WWW-Authenticate': 'Bearer'} if TOKEN else {})
+            return
+        # Histogramas por endpoint/fase y contadores de esta instancia
+        self._send(200, metrics.render().encode(),
+                   {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class local_handler(handler):
+    """Para server.py: loopback sin token solo con METRICS_LOOPBACK=1
+    (en Vercel todo llega por un proxy local)"""
+
+    def _authorized(self):
+        if LOOPBACK_OPEN and self.client_address[0] in LOOPBACK:
+            return True
+        return super()._authorized()
@@ -0,0 +1,193 @@
+from http.server import BaseHTTPRequestHandler
+import contextvars
+import json
+import os
+import threading
+import time
+import urllib.error
+from urllib.parse import urlparse, parse_qs
+
+from api import analyze as A
+from api._core import kline_cache, metrics, ratelimit, swr, universe
+from api._core.candles import CandleSeries
+
+# === CONSTANTES ===
+
+# Pares más líquidos que entran al barrido (0 = todo el universo USDT). El
+# tope es deliberado: cada par fuera de caché pesa KLINE_WEIGHT, así 150 pares
+# (300) entran en la ráfaga del bucket; los ~400 de Futures (800 por barrido,
+# uno cada SCAN_TTL) superarían el presupuesto de WEIGHT_PER_MIN.
+SCAN_UNIVERSE = int(os.environ.get('SCAN_UNIVERSE', '150'))
+SCAN_TTL = 30            # segundos que se comparte un barrido por interval
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+FETCH_WORKERS = 8        # threads propios: la espera de peso no ocupa binance.io_pool
+
+# Presupuesto de peso para klines (limit=100 pesa 2); Binance permite 2400/min por IP
+KLINE_WEIGHT = 2
+WEIGHT_PER_MIN = 1200
+WEIGHT_BURST = 400
+BUDGET_WAIT = 5          # segundos máximos esperando peso antes de saltear el par
+
+_budget = ratelimit.TokenBucket(WEIGHT_PER_MIN / 60, WEIGHT_BURST)
+_pool_lock = threading.Lock()
+_fetch_pool = None
+
+_scans = {}
+_scan_locks = {iv: threading.Lock() for iv in A.VALID_INTERVALS}
+
+
+# === ANÁLISIS ===
+
+def _analyze_all(interval, base_lev, btc_change, eth_change, items):
+    """ENTERs de [(symbol, price, source, CandleSeries)] en ambas direcciones.
+
+    Corre en el proceso: ~200 µs por par no pagan picklear la serie a otro
+    proceso (150 pares: ~30 ms acá contra ~45 ms con un pool forkserver), y
+    así comparte con /api/analyze el estado incremental de kline_cache.
+    """
+    out = []
+    for symbol, price, source, series in items:
+        ctx = A.IndicatorContext(series, kline_cache.cache.window(symbol, interval, series))
+        for direction in ('LONG', 'SHORT'):
+            r = A.analysis_result(symbol, direction, base_lev, interval, ctx, source,
+                                  price, btc_change, eth_change)
+            if r['decision'] == 'ENTER':
+                r.pop('bots', None)
+                out.append(r)
+    return out
+
+
+# === BARRIDO ===
+
+def _fetch_executor():
+    """Pool de los fetches del barrido, separado de binance.io_pool: hasta
+    BUDGET_WAIT segundos de espera por par no le quitan workers a /api/analyze"""
+    global _fetch_pool
+    with _pool_lock:
+        if _fetch_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='scan-fetch')
+        return _fetch_pool
+
+
+def _fetch(pair, interval):
+    """(pair, CandleSeries, source, error) respetando el presupuesto de peso.
+
+    Solo una entrada fresh sale sin tocar Binance: stale dispara una
+    revalidación de fondo y miss/vencida un fetch, así que esas pesan.
+    """
+    state = kline_cache.cache.peek(pair['symbol'], interval, 100)
+    if state != swr.FRESH and not _budget.acquire(KLINE_WEIGHT, timeout=BUDGET_WAIT):
+        return pair, None, None, 'Sin presupuesto de peso'
+    try:
+        series, source = kline_cache.get_klines(pair['symbol'], interval, 100)
+    except Exception as e:
+        # Incluye MalformedKlines ('Datos de klines malformados: ...')
+        return pair, None, None, str(e)
+    if not isinstance(series, CandleSeries) or not len(series):
+        return pair, None, None, 'Sin datos'
+    return pair, series, source, None
+
+
+def run_scan(interval, base_lev=50):
+    """analyze() LONG/SHORT sobre los SCAN_UNIVERSE pares USDT más líquidos"""
+    t_start = time.perf_counter()
+    market = universe.get_market('futures')
+    snapshot = market.snapshot
+    pairs = market.by_volume[:SCAN_UNIVERSE] if SCAN_UNIVERSE > 0 else market.by_volume
+    btc_change = snapshot.change('BTCUSDT')
+    eth_change = snapshot.change('ETHUSDT')
+
+    items, skipped = [], []
+    pool = _fetch_executor()
+    fetches = [pool.submit(contextvars.copy_context().run, _fetch, p, interval) for p in pairs]
+    for pair, series, source, error in (f.result() for f in fetches):
+        if error is not None:
+            skipped.append({'symbol': pair['symbol'], 'error': error})
+            continue
+        symbol = pair['symbol']
+        # Igual que /api/analyze: BTC y ETH toman el precio del último cierre
+        price = series['c'][-1] if symbol in ('BTC', 'ETH') else pair['price']
+        items.append((symbol, price, source, series))
+
+    candidates = _analyze_all(interval, base_lev, btc_change, eth_change, items) if items else []
+    candidates.sort(key=lambda r: (r['confidence'], r['rr_ratio']), reverse=True)
+    return {
+        'interval': interval,
+        'candidates': candidates,
+        'scanned': len(items),
+        'universe': len(market.by_volume),
+        'skipped': skipped,
+        'source': snapshot.source,
+        'generated_at': time.time(),
+        'duration_ms': round((time.perf_counter() - t_start) * 1000, 1),
+    }
+
+
+def get_scan(interval):
+    """Barrido compartido por interval: uno por SCAN_TTL aunque lleguen muchos clientes"""
+    scan = _scans.get(interval)
+    if scan is not None and time.time() - scan['generated_at'] < SCAN_TTL:
+        metrics.cache('scan', 'hit')
+        return scan
+    with _scan_locks[interval]:
+        scan = _scans.get(interval)
+        if scan is None or time.time() - scan['generated_at'] >= SCAN_TTL:
+            metrics.cache('scan', 'miss')
+            scan = _scans[interval] = run_scan(interval)
+        else:
+            metrics.cache('scan', 'hit')
+        return scan
+
+
+# === HANDLER HTTP ===
+
+class handler(metrics.ServerTiming, BaseHTTPRequestHandler):
+    @metrics.timed('scan')
+    def do_GET(self):
+        try:
+            query = parse_qs(urlparse(self.path).query)
+            interval = query.get('interval', ['15m'])[0]
+            direction = query.get('direction', [''])[0].upper()
+            limit = min(int(query.get('limit', [str(DEFAULT_LIMIT)])[0]), MAX_LIMIT)
+
+            if interval not in A.VALID_INTERVALS:
+                self._send_json(400, {'error': f'Interval inválido: {interval}'})
+                return
+            if direction and direction not in ('LONG', 'SHORT'):
+                self._send_json(400, {'error': f'Direction inválida: {direction}'})
+                return
+            if limit < 1:
+                self._send_json(400, {'error': f'limit debe ser >= 1: {limit}'})
+                return
+
+            with metrics.phase('scan'):
+                scan = get_scan(interval)
+            candidates = scan['candidates']
+            if direction:
+                candidates = [c for c in candidates if c['direction'] == direction]
+
+            self._send_json(200, {
+                **scan,
+                'candidates': candidates[:limit],
+                'total': len(candidates),
+                'age_s': round(time.time() - scan['generated_at'], 1),
+            })
+
+        except ValueError as e:
+            self._send_json(400, {'error': f'Parámetro inválido: {str(e)}'})
+        except urllib.error.URLError as e:
+            self._send_json(502, {'error': f'Binance no responde: {str(e)}'})
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+
+    def _send_json(self, status, data):
+        with metrics.phase('serialize'):
+            body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', f'public, max-age={SCAN_TTL // 2}')
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,367 @@
+"""Backtest de analyze() + calculate_tp_sl() sobre velas históricas locales.
+
+Recorre las velas en orden, alimenta los indicadores de forma incremental
+(StreamingContext) y en cada vela cerrada sin posición abierta corre los
+mismos bots que /api/analyze. Un ENTER abre posición al cierre con el TP/SL
+de calculate_tp_sl(), que se evalúa vela a vela desde la siguiente.
+
+Fixtures: SYMBOL_INTERVAL.json (klines crudas de Binance, como las devuelve
+/fapi/v1/klines) o SYMBOL_INTERVAL.bin del candle store. Si en el mismo
+directorio hay BTC_INTERVAL / ETH_INTERVAL se usan para el cambio 24h de los
+bots Bitcoin y Macro; si no, se asume 0%.
+
+    python backtest.py fixtures/ --workers 8 > resultado.json
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from api import analyze as A
+from api._core import candle_store
+from api._core.kline_cache import INTERVAL_MS
+from api._core.rolling import RollingStats
+from api._core.streaming import StreamingATR, StreamingEMA, StreamingMACD, StreamingRSI
+
+WARMUP = 50          # velas antes de la primera evaluación (EMA50 lista)
+WINDOW = 100         # velas por análisis en modo 'window' (igual que el endpoint)
+FEE = 0.0004         # comisión taker por lado
+DAY_MS = 86_400_000
+
+
+# === CONTEXTO INCREMENTAL ===
+
+class StreamingContext(A.IndicatorContext):
+    """IndicatorContext alimentado vela a vela: O(1) por vela.
+
+    Expone solo lo que piden los bots de analyze() y calculate_tp_sl() para
+    `interval`. A diferencia del endpoint (ventana de 100 velas), las
+    recursiones arrancan en la primera vela del histórico.
+    """
+
+    TAIL = 20  # velas recientes que los bots leen directo (volumes[-5:], closes[-1])
+
+    def __init__(self, interval):
+        super().__init__(None)
+        self.n = 0
+        self._emas = {p: StreamingEMA(p) for p in (9, 21, 50)}
+        self._rsi_period = A.RSI_PERIODS.get(interval, 14)
+        self._rsi = StreamingRSI(self._rsi_period)
+        self._macd_params = A.MACD_PARAMS.get(interval, (12, 26, 9))
+        self._macd = StreamingMACD(*self._macd_params)
+        self._bb = RollingStats(A.BB_PERIODS.get(interval, 20))
+        self._atr = StreamingATR(14)
+        self._vol = RollingStats(20)
+        self._closes = deque(maxlen=self.TAIL)
+        self._volumes = deque(maxlen=self.TAIL)
+
+    def update(self, candle):
+        c, v = candle['c'], candle['v']
+        self.n += 1
+        for e in self._emas.values():
+            e.push(c)
+        self._rsi.push(c)
+        self._macd.push(c)
+        self._bb.push(c)
+        self._atr.update(candle)
+        self._vol.push(v)
+        self._closes.append(c)
+        self._volumes.append(v)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def closes(self):
+        return list(self._closes)
+
+    @property
+    def volumes(self):
+        return list(self._volumes)
+
+    def ema(self, period):
+        return self._emas[period].value
+
+    def rsi(self, period=14):
+        if period != self._rsi_period:
+            raise ValueError(f'RSI({period}) no se sigue en este contexto')
+        return self._rsi.value
+
+    def macd(self, fast=12, slow=26, signal_period=9):
+        if (fast, slow, signal_period) != self._macd_params:
+            raise ValueError(f'MACD{(fast, slow, signal_period)} no se sigue en este contexto')
+        return self._macd.value
+
+    def bollinger(self, period=20, std_dev=2):
+        bb = self._bb
+        if period != bb.period:
+            raise ValueError(f'Bollinger({period}) no se sigue en este contexto')
+        if not bb.full:
+            p = self._closes[-1] if self._closes else 0
+            return {'upper': p, 'middle': p, 'lower': p, 'width': 0}
+        middle, std = bb.mean, bb.std
+        return {
+            'upper': middle + std * std_dev,
+            'middle': middle,
+            'lower': middle - std * std_dev,
+            'width': (2 * std * std_dev) / middle * 100 if middle > 0 else 0
+        }
+
+    def atr(self, period=14):
+        return self._atr.value
+
+    def volume_avg(self, period=20):
+        return self._vol.mean
+
+    def volume(self, period=20):
+        if self.n < period:
+            return {'ratio': 1.0, 'trend': 'normal'}
+        return A._volume_summary(self._volumes[-1], self._vol.mean)
+
+
+# === FIXTURES ===
+
+def parse_name(path):
+    """('SOL', '15m') a partir de .../SOL_15m.json"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    symbol, _, interval = stem.rpartition('_')
+    if not symbol or interval not in INTERVAL_MS:
+        raise ValueError(f'Nombre de fixture inválido (se espera SYMBOL_INTERVAL): {path}')
+    return symbol.upper().replace('USDT', ''), interval
+
+
+def load_candles(path):
+    """Velas {'t','o','h','l','c','v'} de un fixture .json o .bin"""
+    _, interval = parse_name(path)
+    if path.endswith('.bin'):
+        cf = candle_store.CandleFile(path, INTERVAL_MS[interval])
+        view = cf.view(0, cf.count)
+        t, o, h, l, c, v = (view[k] for k in ('t', 'o', 'h', 'l', 'c', 'v'))
+        return [{'t': t[i], 'o': o[i], 'h': h[i], 'l': l[i], 'c': c[i], 'v': v[i]}
+                for i in range(len(view))]
+    with open(path) as f:
+        rows = json.load(f)
+    return [{'t': int(k[0]), 'o': float(k[1]), 'h': float(k[2]), 'l': float(k[3]),
+             'c': float(k[4]), 'v': float(k[5])} for k in rows]
+
+
+def _find_fixture(directory, symbol, interval):
+    for ext in ('.json', '.bin'):
+        path = os.path.join(directory, f'{symbol}_{interval}{ext}')
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def change_24h(candles, interval):
+    """{open_time: % de cambio del cierre contra 24h antes}"""
+    lag = max(1, DAY_MS // INTERVAL_MS[interval])
+    out = {}
+    for i, c in enumerate(candles):
+        ref = candles[i - lag]['c'] if i >= lag else candles[0]['o']
+        out[c['t']] = (c['c'] / ref - 1) * 100 if ref else 0.0
+    return out
+
+
+def load_macro(directory, interval):
+    """{open_time: (btc_change, eth_change)} desde los fixtures de BTC/ETH"""
+    changes = []
+    for sym in ('BTC', 'ETH'):
+        path = _find_fixture(directory, sym, interval)
+        changes.append(change_24h(load_candles(path), interval) if path else {})
+    btc, eth = changes
+    return {t: (btc.get(t, 0.0), eth.get(t, 0.0)) for t in btc.keys() | eth.keys()}
+
+
+# === SIMULACIÓN ===
+
+def _exit(pos, candle):
+    """(precio, motivo) si la vela toca TP o SL; SL primero si toca ambos"""
+    o, h, l = candle['o'], candle['h'], candle['l']
+    tp, sl = pos['tp'], pos['sl']
+    if pos['direction'] == 'LONG':
+        if o <= sl:
+            return o, 'SL'
+        if o >= tp:
+            return o, 'TP'
+        if l <= sl:
+            return sl, 'SL'
+        if h >= tp:
+            return tp, 'TP'
+    else:
+        if o >= sl:
+            return o, 'SL'
+        if o <= tp:
+            return o, 'TP'
+        if h >= sl:
+            return sl, 'SL'
+        if l <= tp:
+            return tp, 'TP'
+    return None
+
+
+def _close(pos, candle, price, reason, bars, fee):
+    sign = 1 if pos['direction'] == 'LONG' else -1
+    pnl = (price / pos['entry'] - 1) * sign - 2 * fee
+    return dict(pos, exit_t=candle['t'], exit=price, reason=reason, bars=bars,
+                pnl_pct=round(pnl * 100, 4), roi_pct=round(pnl * pos['leverage'] * 100, 4))
+
+
+def backtest(candles, symbol, interval, directions=('LONG', 'SHORT'), base_lev=50,
+             macro=None, mode='stream', window=WINDOW, warmup=WARMUP, max_hold=None, fee=FEE):
+    """Lista de trades simulados sobre `candles` (una posición a la vez).
+
+    mode='stream' usa StreamingContext; mode='window' rearma un
+    IndicatorContext con las últimas `window` velas en cada paso (réplica
+    exacta del endpoint, mucho más lento).
+    """
+    macro = macro or {}
+    ctx = StreamingContext(interval) if mode == 'stream' else None
+    trades = []
+    pos = None
+    for i, candle in enumerate(candles):
+        if pos is not None:
+            held = i - pos['index']
+            hit = _exit(pos, candle)
+            if hit is None and max_hold and held >= max_hold:
+                hit = candle['c'], 'TIMEOUT'
+            if hit is not None:
+                trades.append(_close(pos, candle, hit[0], hit[1], held, fee))
+                pos = None
+
+        if ctx is not None:
+            ctx.update(candle)
+        if pos is not None or i + 1 < warmup:
+            continue
+
+        view = ctx if ctx is not None else A.IndicatorContext(candles[max(0, i + 1 - window):i + 1])
+        price = candle['c']
+        btc_change, eth_change = macro.get(candle['t'], (0.0, 0.0))
+        best = None
+        for direction in directions:
+            result = A.analyze(symbol, direction, view, price, btc_change, eth_change, base_lev, interval)
+            if result['decision'] == 'ENTER' and (best is None or result['confidence'] > best[1]['confidence']):
+                best = direction, result
+        if best is None:
+            continue
+        direction, result = best
+        tp, sl, rr = A.calculate_tp_sl(price, direction, view.atr(), interval)
+        pos = {'symbol': symbol, 'interval': interval, 'direction': direction,
+               'entry_t': candle['t'], 'entry': price, 'tp': tp, 'sl': sl, 'rr': rr,
+               'leverage': result['leverage'], 'confidence': result['confidence'], 'index': i}
+
+    if pos is not None and candles:
+        last = candles[-1]
+        trades.append(_close(pos, last, last['c'], 'END', len(candles) - 1 - pos['index'], fee))
+    for t in trades:
+        del t['index']
+    return trades
+
+
+def summarize(trades):
+    """Estadísticas de una lista de trades (retornos sin apalancar, netos de comisión)"""
+    n = len(trades)
+    if not n:
+        return {'trades': 0}
+    rets = [t['pnl_pct'] for t in trades]
+    gains = sum(r for r in rets if r > 0)
+    losses = -sum(r for r in rets if r <= 0)
+    wins = sum(1 for r in rets if r > 0)
+    equity = peak = max_dd = 0.0
+    for t in sorted(trades, key=lambda t: t['exit_t']):
+        equity += t['pnl_pct']
+        peak = max(peak, equity)
+        max_dd = max(max_dd, peak - equity)
+    return {
+        'trades': n,
+        'wins': wins,
+        'losses': n - wins,
+        'win_rate': round(wins / n * 100, 2),
+        'total_pct': round(sum(rets), 4),
+        'avg_pct': round(sum(rets) / n, 4),
+        'avg_roi_pct': round(sum(t['roi_pct'] for t in trades) / n, 4),
+        'profit_factor': round(gains / losses, 3) if losses > 0 else None,
+        'max_drawdown_pct': round(max_dd, 4),
+        'avg_bars': round(sum(t['bars'] for t in trades) / n, 2),
+        'exits': dict(Counter(t['reason'] for t in trades)),
+        'directions': dict(Counter(t['direction'] for t in trades)),
+    }
+
+
+# === EJECUCIÓN ===
+
+def run_file(path, **opts):
+    """Backtest de un fixture: {'symbol','interval','bars','trades','summary'}"""
+    symbol, interval = parse_name(path)
+    candles = load_candles(path)
+    macro = load_macro(os.path.dirname(path) or '.', interval)
+    trades = backtest(candles, symbol, interval, macro=macro, **opts)
+    return {'file': path, 'symbol': symbol, 'interval': interval, 'bars': len(candles),
+            'trades': trades, 'summary': summarize(trades)}
+
+
+def _run_job(job):
+    path, opts = job
+    return run_file(path, **opts)
+
+
+def run_many(paths, workers=None, **opts):
+    """Un backtest por fixture, repartidos en `workers` procesos"""
+    workers = workers or os.cpu_count() or 1
+    jobs = [(p, opts) for p in paths]
+    if workers == 1 or len(jobs) <= 1:
+        return [_run_job(j) for j in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(_run_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def expand(paths):
+    out = []
+    for p in paths:
+        if os.path.isdir(p):
+            out.extend(sorted(glob.glob(os.path.join(p, '*.json')) + glob.glob(os.path.join(p, '*.bin'))))
+        else:
+            out.append(p)
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Backtest de analyze() sobre fixtures locales')
+    ap.add_argument('paths', nargs='+', help='fixtures SYMBOL_INTERVAL.json/.bin o directorios')
+    ap.add_argument('--directions', default='LONG,SHORT')
+    ap.add_argument('--mode', choices=('stream', 'window'), default='stream')
+    ap.add_argument('--window', type=int, default=WINDOW)
+    ap.add_argument('--warmup', type=int, default=WARMUP)
+    ap.add_argument('--max-hold', type=int, default=None, help='velas máximas por trade')
+    ap.add_argument('--fee', type=float, default=FEE)
+    ap.add_argument('--leverage', type=int, default=50)
+    ap.add_argument('--workers', type=int, default=None)
+    ap.add_argument('--trades', action='store_true', help='incluir la lista de trades')
+    args = ap.parse_args(argv)
+
+    paths = expand(args.paths)
+    opts = {'directions': tuple(d.strip().upper() for d in args.directions.split(',')),
+            'base_lev': args.leverage, 'mode': args.mode, 'window': args.window,
+            'warmup': args.warmup, 'max_hold': args.max_hold, 'fee': args.fee}
+    t0 = time.perf_counter()
+    results = run_many(paths, args.workers, **opts)
+    elapsed = time.perf_counter() - t0
+
+    bars = sum(r['bars'] for r in results)
+    out = {
+        'summary': summarize([t for r in results for t in r['trades']]),
+        'files': [{k: v for k, v in r.items() if k != 'trades' or args.trades} for r in results],
+        'bars': bars,
+        'elapsed_s': round(elapsed, 3),
+        'bars_per_s': round(bars / elapsed) if elapsed > 0 else None,
+    }
+    json.dump(out, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
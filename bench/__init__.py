@@ -0,0 +1 @@
+"""Benchmarks contra un Binance falso local (sin red ni rate limits)."""
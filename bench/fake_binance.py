@@ -0,0 +1,196 @@
+"""Binance falso y determinístico para benchmarks.
+
+    python -m bench.fake_binance --port 8081 --latency 40
+    UPSTREAM_OVERRIDE=http://127.0.0.1:8081 python server.py
+
+Sirve klines, ticker/24hr y exchangeInfo de Futures y Spot con los mismos
+formatos que Binance. Los precios salen de una función de (symbol, interval,
+open time) sembrada, así dos corridas ven exactamente los mismos datos y una
+vela ya cerrada nunca cambia. Los pares de SPOT_ONLY no existen en Futures
+(fapi responde 400, como con un par real que no lista).
+"""
+import argparse
+import gzip
+import json
+import math
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from api._core.kline_cache import INTERVAL_MS
+
+MAJORS = ['BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'ADA', 'DOGE', 'AVAX', 'DOT', 'LINK',
+          'POL', 'LTC', 'ARB', 'OP', 'INJ', 'SUI', 'SEI', 'TIA', 'JUP', 'WIF']
+N_PAIRS = 200
+SPOT_ONLY = ['SPOTA', 'SPOTB', 'SPOTC']
+MAX_KLINES = {'futures': 1500, 'spot': 1000}
+
+
+def universe(n_pairs=N_PAIRS):
+    """{symbol: precio base} de los pares USDT de Futures"""
+    r = random.Random('universe')
+    symbols = MAJORS + [f'ALT{i:03d}' for i in range(n_pairs - len(MAJORS))]
+    return {s: round(10 ** r.uniform(-3, 4.8), 6) for s in symbols}
+
+
+def kline_row(symbol, base, interval_ms, t):
+    """Fila de kline en formato Binance para la vela que abre en `t`"""
+    r = random.Random(f'{symbol}:{interval_ms}:{t}')
+    i = t // interval_ms
+
+    def mid(k):
+        return base * (1 + 0.08 * math.sin(k / 97) + 0.02 * math.sin(k / 13)
+                       + 0.004 * math.sin(k * 2.7 + len(symbol)))
+
+    o, c = mid(i), mid(i + 1) * (1 + r.gauss(0, 0.002))
+    h = max(o, c) * (1 + abs(r.gauss(0, 0.002)))
+    lo = min(o, c) * (1 - abs(r.gauss(0, 0.002)))
+    v = r.expovariate(1 / 1000) * (6 if r.random() < 0.05 else 1)
+    return [t, f'{o:.8g}', f'{h:.8g}', f'{lo:.8g}', f'{c:.8g}', f'{v:.4f}',
+            t + interval_ms - 1, f'{v * c:.4f}', r.randint(50, 5000), f'{v / 2:.4f}', f'{v * c / 2:.4f}', '0']
+
+
+def ticker(symbol, base, now_ms):
+    hour = INTERVAL_MS['1h']
+    rows = [kline_row(symbol, base, hour, (now_ms // hour - k) * hour) for k in range(24)]
+    last, first = float(rows[0][4]), float(rows[-1][1])
+    return {
+        'symbol': f'{symbol}USDT',
+        'lastPrice': rows[0][4],
+        'priceChangePercent': f'{(last / first - 1) * 100:.3f}',
+        'highPrice': max((row[2] for row in rows), key=float),
+        'lowPrice': min((row[3] for row in rows), key=float),
+        'volume': f'{sum(float(row[5]) for row in rows):.4f}',
+        'quoteVolume': f'{sum(float(row[7]) for row in rows):.4f}',
+    }
+
+
+class FakeBinance(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, n_pairs=N_PAIRS):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.pairs = {'futures': universe(n_pairs)}
+        self.pairs['spot'] = dict(self.pairs['futures'], **{s: 1.0 + i for i, s in enumerate(SPOT_ONLY)})
+        self.hits = {}
+        self._lock = threading.Lock()
+        self._tickers = {}  # (source, minuto) -> body
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, path):
+        with self._lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+
+    def tickers(self, source):
+        now_ms = int(time.time() * 1000)
+        key = (source, now_ms // 60_000)
+        body = self._tickers.get(key)
+        if body is None:
+            body = json.dumps([ticker(s, b, now_ms) for s, b in self.pairs[source].items()]).encode()
+            self._tickers = {key: body}
+        return body
+
+    def klines(self, source, query):
+        symbol = query.get('symbol', [''])[0]
+        pairs = self.pairs[source]
+        if not symbol.endswith('USDT') or symbol[:-4] not in pairs:
+            return 400, {'code': -1121, 'msg': 'Invalid symbol.'}
+        interval = query.get('interval', [''])[0]
+        if interval not in INTERVAL_MS:
+            return 400, {'code': -1120, 'msg': 'Invalid interval.'}
+        iv = INTERVAL_MS[interval]
+        limit = min(int(query.get('limit', ['500'])[0]), MAX_KLINES[source])
+        now_open = int(time.time() * 1000) // iv * iv
+        end = min(int(query['endTime'][0]) // iv * iv, now_open) if 'endTime' in query else now_open
+        if 'startTime' in query:
+            start = -(-int(query['startTime'][0]) // iv) * iv
+            end = min(end, start + (limit - 1) * iv)
+        else:
+            start = end - (limit - 1) * iv
+        base = pairs[symbol[:-4]]
+        return 200, [kline_row(symbol[:-4], base, iv, t) for t in range(start, end + 1, iv)]
+
+    def exchange_info(self, source):
+        return {'symbols': [{'symbol': f'{s}USDT', 'status': 'TRADING', 'baseAsset': s,
+                             'quoteAsset': 'USDT'} for s in self.pairs[source]]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Headers y body van en writes separados: sin esto Nagle + delayed ACK
+        # suman ~40 ms a cada respuesta keep-alive
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        srv = self.server
+        srv.count(url.path)
+        if srv.latency:
+            time.sleep(srv.latency)
+        source = 'futures' if url.path.startswith('/fapi/') else 'spot'
+        try:
+            if url.path.endswith('/klines'):
+                status, data = srv.klines(source, query)
+                body = json.dumps(data).encode()
+            elif url.path.endswith('/ticker/24hr'):
+                status, body = 200, srv.tickers(source)
+            elif url.path.endswith('/exchangeInfo'):
+                status, body = 200, json.dumps(srv.exchange_info(source)).encode()
+            else:
+                status, body = 404, b'{"code":-1,"msg":"Not found"}'
+        except ValueError as e:
+            status, body = 400, json.dumps({'code': -1100, 'msg': str(e)}).encode()
+
+        gz = 'gzip' in (self.headers.get('Accept-Encoding') or '')
+        if gz:
+            body = gzip.compress(body, compresslevel=1)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if gz:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start(host='127.0.0.1', port=0, latency=0.0, n_pairs=N_PAIRS):
+    """Levantar el servidor en un thread daemon (latency en segundos);
+    server.url va en UPSTREAM_OVERRIDE"""
+    srv = FakeBinance((host, port), latency, n_pairs)
+    threading.Thread(target=srv.serve_forever, name='fake-binance', daemon=True).start()
+    return srv
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Binance falso para benchmarks')
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8081)
+    ap.add_argument('--latency', type=float, default=0.0, help='ms agregados a cada respuesta')
+    args = ap.parse_args(argv)
+    srv = FakeBinance((args.host, args.port), args.latency / 1000)
+    print(f'Binance falso en {srv.url}')
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+
+
+if __name__ == '__main__':
+    main()
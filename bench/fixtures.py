@@ -0,0 +1,51 @@
+"""Velas sintéticas sembradas para los benchmarks.
+
+Random walk multiplicativo con mechas, picos de volumen y algún tramo plano,
+así los indicadores recorren también las ramas de rango 0 y volumen 0. La
+misma (n, seed) siempre produce las mismas velas.
+"""
+import random
+from functools import lru_cache
+
+SEED = 1234
+SIZES = (100, 1_000, 10_000, 100_000)
+
+
+@lru_cache(maxsize=None)
+def _candles(n, seed):
+    r = random.Random(seed)
+    out = []
+    p = 100.0
+    for _ in range(n):
+        if r.random() < 0.01:
+            out.append({'o': p, 'h': p, 'l': p, 'c': p, 'v': 0.0})
+            continue
+        o = p
+        c = max(1e-6, o * (1 + r.gauss(0, 0.01)))
+        h = max(o, c) * (1 + abs(r.gauss(0, 0.004)))
+        lo = min(o, c) * (1 - abs(r.gauss(0, 0.004)))
+        v = r.expovariate(1 / 1000) * (8 if r.random() < 0.05 else 1)
+        out.append({'o': o, 'h': h, 'l': lo, 'c': c, 'v': v})
+        p = c
+    return tuple(out)
+
+
+def candles(n, seed=SEED):
+    """Lista nueva de n velas {'o','h','l','c','v'} (las dicts se comparten: no mutarlas)"""
+    return list(_candles(n, seed))
+
+
+def closes(n, seed=SEED):
+    return [c['c'] for c in _candles(n, seed)]
+
+
+@lru_cache(maxsize=None)
+def _kline_rows(n, seed, interval_ms):
+    return tuple([i * interval_ms, repr(c['o']), repr(c['h']), repr(c['l']), repr(c['c']), repr(c['v']),
+                  (i + 1) * interval_ms - 1, repr(c['v'] * c['c']), 100 + i % 900, '0', '0', '0']
+                 for i, c in enumerate(_candles(n, seed)))
+
+
+def kline_rows(n, seed=SEED, interval_ms=900_000):
+    """Las mismas velas como filas crudas de /klines (precios en string, como Binance)"""
+    return list(_kline_rows(n, seed, interval_ms))
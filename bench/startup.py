@@ -0,0 +1,136 @@
+"""Cold start por endpoint: import del módulo -> primera respuesta.
+
+    python -m bench.startup --runs 5 --output startup.json
+    python -m bench.startup --baseline startup.json --tolerance 0.25
+
+Cada corrida es un intérprete nuevo (como una instancia fría de Vercel) que
+importa api/<endpoint>.py, monta su handler y atiende una request contra el
+Binance falso de bench/fake_binance.py. Se reporta la mediana de:
+
+- process_ms: arranque del intérprete + todo lo demás, visto desde afuera
+- import_ms: import del módulo del endpoint
+- first_response_ms: import + primera respuesta completa
+
+Con --baseline sale con código 1 si first_response_ms de algún endpoint
+empeora más que --tolerance respecto del archivo de referencia.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from bench import fake_binance
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# endpoint -> (método, path, body)
+ENDPOINTS = {
+    'analyze': ('POST', '/api/analyze', {'symbol': 'BTC', 'direction': 'LONG', 'interval': '15m'}),
+    'prices': ('GET', '/api/prices', None),
+    'symbols': ('GET', '/api/symbols', None),
+    'klines': ('GET', '/api/klines?symbol=BTC&interval=15m', None),
+    'scan': ('GET', '/api/scan?interval=15m', None),
+}
+
+CHILD = '''
+import time
+t0 = time.perf_counter()
+import http.client, importlib, json, sys, threading
+from http.server import HTTPServer
+name, method, path, body = json.loads(sys.argv[1])
+mod = importlib.import_module('api.' + name)
+t_import = time.perf_counter()
+srv = HTTPServer(('127.0.0.1', 0), mod.handler)
+threading.Thread(target=srv.handle_request, daemon=True).start()
+conn = http.client.HTTPConnection('127.0.0.1', srv.server_address[1])
+conn.request(method, path, body=json.dumps(body) if body is not None else None,
+             headers={'Content-Type': 'application/json'})
+resp = conn.getresponse()
+data = resp.read()
+t_first = time.perf_counter()
+print(json.dumps({'status': resp.status, 'bytes': len(data),
+                  'import_ms': (t_import - t0) * 1000, 'first_response_ms': (t_first - t0) * 1000}))
+'''
+
+
+def run_once(name, upstream_url):
+    method, path, body = ENDPOINTS[name]
+    env = dict(os.environ, UPSTREAM_OVERRIDE=upstream_url)
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', CHILD, json.dumps([name, method, path, body])],
+                         cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    elapsed = (time.perf_counter() - t0) * 1000
+    if out.returncode != 0:
+        raise RuntimeError(f'{name}: {out.stderr.strip().splitlines()[-1:]}')
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result['process_ms'] = elapsed
+    return result
+
+
+def measure(endpoints, runs, upstream_url):
+    report = {}
+    for name in endpoints:
+        samples = [run_once(name, upstream_url) for _ in range(runs)]
+        report[name] = {
+            'status': samples[-1]['status'],
+            'bytes': samples[-1]['bytes'],
+            **{key: round(statistics.median(s[key] for s in samples), 1)
+               for key in ('import_ms', 'first_response_ms', 'process_ms')},
+        }
+    return report
+
+
+def regressions(report, baseline, tolerance):
+    """[(endpoint, antes, ahora)] de first_response_ms que empeoraron"""
+    out = []
+    for name, cur in report.items():
+        ref = baseline.get('endpoints', {}).get(name)
+        if ref and cur['first_response_ms'] > ref['first_response_ms'] * (1 + tolerance):
+            out.append((name, ref['first_response_ms'], cur['first_response_ms']))
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Benchmark de cold start por endpoint')
+    ap.add_argument('endpoints', nargs='*', default=list(ENDPOINTS), help=', '.join(ENDPOINTS))
+    ap.add_argument('--runs', type=int, default=5)
+    ap.add_argument('--output', help='archivo JSON con el resultado')
+    ap.add_argument('--baseline', help='resultado anterior contra el que comparar')
+    ap.add_argument('--tolerance', type=float, default=0.25, help='empeoramiento admitido (0.25 = 25%%)')
+    args = ap.parse_args(argv)
+    unknown = sorted(set(args.endpoints) - set(ENDPOINTS))
+    if unknown:
+        ap.error(f'endpoints inexistentes: {", ".join(unknown)}')
+
+    upstream = fake_binance.start()
+    try:
+        report = {
+            'python': sys.version.split()[0],
+            'runs': args.runs,
+            'endpoints': measure(args.endpoints, args.runs, upstream.url),
+        }
+    finally:
+        upstream.shutdown()
+
+    for name, r in report['endpoints'].items():
+        print(f"{name:8} {r['status']}  import {r['import_ms']:7.1f} ms  "
+              f"primera respuesta {r['first_response_ms']:7.1f} ms  proceso {r['process_ms']:7.1f} ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        worse = regressions(report['endpoints'], baseline, args.tolerance)
+        for name, before, now in worse:
+            print(f'REGRESIÓN {name}: {before} ms -> {now} ms')
+        if worse:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
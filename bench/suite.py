@@ -0,0 +1,291 @@
+"""Suite de benchmarks: indicadores, bots, analyze() y handlers HTTP.
+
+    python -m bench.suite                               # todo, 100 a 100k velas
+    python -m bench.suite --sizes 100,1000 -k rsi
+    python -m bench.suite --output new.json --compare base.json
+
+Grupos:
+
+- candles: CandleSeries, parseo desde filas de /klines y acceso a columnas
+- indicators: funciones escalares de analyze.py (rsi, ema, atr, ...)
+- series: series completas de api/_core/indicators.py y rolling.py
+- bots: cada bot de analyze.py sobre velas crudas (sin memo previo)
+- analyze: analyze() y calculate_tp_sl() de punta a punta
+- handlers: cada handler de api/ en proceso contra bench/fake_binance.py,
+  con cachés calientes (warm) y vacías antes de cada request (miss)
+
+Las velas salen de bench/fixtures.py (sembradas). Cada caso se repite hasta
+MIN_TIME segundos con al menos MIN_RUNS corridas y se reporta mediana, p95
+y mínimo en µs. El resultado va en JSON a --output (bench_results.json);
+--compare marca como regresión (código de salida 1) los casos cuya mediana
+empeora más que --tolerance respecto de otra corrida.
+"""
+import argparse
+import http.client
+import json
+import platform
+import statistics
+import sys
+import threading
+import time
+from collections import namedtuple
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import api.analyze as A
+from api import klines, prices, scan, symbols
+from api._core import indicators as engine
+from api._core.candles import CandleSeries
+from api._core import kline_cache, ratelimit, rolling, tickers, upstream
+from bench import fake_binance, fixtures
+
+MIN_TIME = 0.2       # segundos por caso
+MIN_RUNS = 5
+MAX_RUNS = 10_000
+DEFAULT_OUTPUT = 'bench_results.json'
+
+Case = namedtuple('Case', ['group', 'name', 'size', 'fn', 'setup'])
+
+
+def case_id(group, name, size):
+    return f'{group}/{name}/{size}'
+
+
+# === MEDICIÓN ===
+
+def measure(fn, setup=None, min_time=MIN_TIME, min_runs=MIN_RUNS, max_runs=MAX_RUNS):
+    """Tiempos de fn() en µs; setup() corre antes de cada llamada, fuera del tiempo"""
+    if setup is not None:
+        setup()
+    fn()  # calentamiento (imports diferidos, cachés de CPython)
+    samples = []
+    spent = 0.0
+    while len(samples) < max_runs and (spent < min_time or len(samples) < min_runs):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        samples.append(dt * 1e6)
+        spent += dt
+    samples.sort()
+    return {
+        'runs': len(samples),
+        'median_us': round(statistics.median(samples), 2),
+        'p95_us': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+        'min_us': round(samples[0], 2),
+    }
+
+
+# === CASOS: INDICADORES Y BOTS ===
+
+def compute_cases(sizes):
+    cases = []
+    for n in sizes:
+        cs = fixtures.candles(n)
+        cl = fixtures.closes(n)
+        price = cl[-1]
+        cols = engine.columns(cs)
+        rows = fixtures.kline_rows(n)
+        cseries = CandleSeries.from_klines(rows)
+        candles = {
+            'from_klines': lambda rows=rows: CandleSeries.from_klines(rows),
+            'from_candles': lambda cs=cs: CandleSeries.from_candles(cs),
+            'columns': lambda s=cseries: engine.columns(s),
+            'tail_100': lambda s=cseries: s[-100:]['c'],
+            'last_candle': lambda s=cseries: s[-1],
+        }
+        scalar = {
+            'rsi': lambda cl=cl: A.rsi(cl),
+            'ema': lambda cl=cl: A.ema(cl, 50),
+            'sma': lambda cl=cl: A.sma(cl, 20),
+            'atr': lambda cs=cs: A.atr(cs),
+            'macd': lambda cl=cl: A.macd(cl),
+            'bollinger_bands': lambda cl=cl: A.bollinger_bands(cl),
+            'stochastic': lambda cs=cs: A.stochastic(cs),
+            'volume_analysis': lambda cs=cs: A.volume_analysis(cs),
+            'detect_divergence': lambda cs=cs: A.detect_divergence(cs),
+        }
+        series = {
+            'columns': lambda cs=cs: engine.columns(cs),
+            'stochastic_series': lambda c=cols: engine.stochastic_series(c.h, c.l, c.c),
+            'rolling_mean_std': lambda c=cols: rolling.rolling_mean_std(c.c, 20),
+            'rolling_max': lambda c=cols: rolling.rolling_max(c.h, 14),
+        }
+        bots = {
+            'bot_trend': lambda cs=cs, p=price: A.bot_trend(cs, p, 'LONG'),
+            'bot_rsi': lambda cs=cs: A.bot_rsi(cs, 'LONG'),
+            'bot_whales': lambda cs=cs: A.bot_whales(cs),
+            'bot_macd_bb': lambda cs=cs: A.bot_macd_bb(cs, 'LONG'),
+        }
+        e2e = {
+            'analyze': lambda cs=cs, p=price: A.analyze('ETH', 'LONG', cs, p, 1.2, -0.8),
+            'analyze_long_short': lambda cs=cs, p=price: [
+                A.analyze('ETH', d, ctx, p, 1.2, -0.8)
+                for ctx in [A.IndicatorContext(cs)] for d in ('LONG', 'SHORT')],
+            'calculate_tp_sl': lambda cs=cs, p=price: A.calculate_tp_sl(p, 'LONG', A.IndicatorContext(cs).atr(), '15m'),
+        }
+        for group, fns in (('candles', candles), ('indicators', scalar), ('series', series),
+                           ('bots', bots), ('analyze', e2e)):
+            cases += [Case(group, name, n, fn, None) for name, fn in fns.items()]
+
+    # Bots que no dependen de las velas
+    cases += [
+        Case('bots', 'bot_bitcoin', 0, lambda: A.bot_bitcoin('ETH', 1.5), None),
+        Case('bots', 'bot_quality', 0, lambda: A.bot_quality('ARB'), None),
+        Case('bots', 'bot_macro', 0, lambda: A.bot_macro(1.5, -0.5, 'LONG'), None),
+    ]
+    return cases
+
+
+# === CASOS: HANDLERS ===
+
+class HandlerClient:
+    """Un handler de api/ servido en proceso"""
+
+    def __init__(self, handler_cls):
+        quiet = type(handler_cls.__name__, (handler_cls,), {'log_message': lambda self, *args: None})
+        self.srv = ThreadingHTTPServer(('127.0.0.1', 0), quiet)
+        self.srv.daemon_threads = True
+        threading.Thread(target=self.srv.serve_forever, daemon=True).start()
+
+    def request(self, method, path, body=None):
+        conn = http.client.HTTPConnection('127.0.0.1', self.srv.server_address[1], timeout=60)
+        try:
+            conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                         headers={'Content-Type': 'application/json'})
+            resp = conn.getresponse()
+            data = resp.read()
+        finally:
+            conn.close()
+        if resp.status != 200:
+            raise RuntimeError(f'{method} {path}: {resp.status} {data[:200]!r}')
+        return data
+
+    def close(self):
+        self.srv.shutdown()
+        self.srv.server_close()
+
+
+def clear_caches():
+    kline_cache.cache.clear()
+    tickers._snapshots.clear()
+    scan._scans.clear()
+    # El Binance falso no cobra peso: que el miss mida el barrido, no la espera
+    scan._budget = ratelimit.TokenBucket(scan.WEIGHT_PER_MIN / 60, scan.WEIGHT_BURST)
+
+
+# nombre -> (handler, método, path, body)
+HANDLER_REQUESTS = {
+    'analyze': (A.handler, 'POST', '/api/analyze', {'symbol': 'BTC', 'direction': 'LONG', 'interval': '15m'}),
+    'analyze_batch': (A.handler, 'POST', '/api/analyze',
+                      {'requests': [{'symbol': s, 'direction': 'LONG'} for s in ('BTC', 'ETH', 'SOL', 'BNB', 'XRP')]}),
+    'analyze_mtf': (A.handler, 'POST', '/api/analyze',
+                    {'symbol': 'ETH', 'direction': 'SHORT', 'intervals': ['5m', '15m', '1h', '4h']}),
+    'prices': (prices.handler, 'GET', '/api/prices', None),
+    'symbols': (symbols.handler, 'GET', '/api/symbols', None),
+    'symbols_search': (symbols.handler, 'GET', '/api/symbols?mode=search&q=AL', None),
+    'klines': (klines.handler, 'GET', '/api/klines?symbol=BTC&interval=15m&limit=500', None),
+    'klines_binary': (klines.handler, 'GET', '/api/klines?symbol=BTC&interval=15m&limit=500&format=binary', None),
+    'scan': (scan.handler, 'GET', '/api/scan?interval=15m', None),
+}
+
+
+def handler_cases(clients):
+    cases = []
+    for name, (cls, method, path, body) in HANDLER_REQUESTS.items():
+        if cls not in clients:
+            clients[cls] = HandlerClient(cls)
+        client = clients[cls]
+        fn = lambda c=client, m=method, p=path, b=body: c.request(m, p, b)
+        cases.append(Case('handlers', f'{name}:warm', 0, fn, None))
+        cases.append(Case('handlers', f'{name}:miss', 0, fn, clear_caches))
+    return cases
+
+
+# === REPORTE ===
+
+def compare(results, baseline, tolerance):
+    """[(id, mediana antes, mediana ahora)] de los casos que empeoraron"""
+    before = {r['id']: r for r in baseline.get('results', [])}
+    worse = []
+    for r in results:
+        ref = before.get(r['id'])
+        if ref and r['median_us'] > ref['median_us'] * (1 + tolerance):
+            worse.append((r['id'], ref['median_us'], r['median_us']))
+    return worse
+
+
+def _fmt_us(us):
+    if us >= 1e6:
+        return f'{us / 1e6:8.2f} s '
+    if us >= 1e3:
+        return f'{us / 1e3:8.2f} ms'
+    return f'{us:8.1f} µs'
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Benchmarks de indicadores, analyze() y handlers')
+    ap.add_argument('--sizes', default=','.join(map(str, fixtures.SIZES)),
+                    help='cantidad de velas por fixture, separadas por coma')
+    ap.add_argument('-k', dest='filter', default='', help='solo casos cuyo id contenga esto')
+    ap.add_argument('--groups', default='candles,indicators,series,bots,analyze,handlers')
+    ap.add_argument('--min-time', type=float, default=MIN_TIME)
+    ap.add_argument('--latency', type=float, default=0.0, help='ms de latencia del Binance falso')
+    ap.add_argument('--output', default=DEFAULT_OUTPUT, help='archivo JSON con los resultados')
+    ap.add_argument('--compare', help='resultados anteriores contra los que comparar')
+    ap.add_argument('--tolerance', type=float, default=0.2, help='empeoramiento admitido (0.2 = 20%%)')
+    args = ap.parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    groups = set(args.groups.split(','))
+
+    fake = clients = None
+    cases = compute_cases(sizes) if groups - {'handlers'} else []
+    if 'handlers' in groups:
+        fake = fake_binance.start(latency=args.latency / 1000)
+        upstream.client.override = urlparse(fake.url)
+        clients = {}
+        cases += handler_cases(clients)
+    cases = [c for c in cases if c.group in groups and args.filter in case_id(c.group, c.name, c.size)]
+
+    results = []
+    try:
+        for c in cases:
+            r = {'id': case_id(c.group, c.name, c.size), 'group': c.group, 'name': c.name, 'size': c.size,
+                 **measure(c.fn, c.setup, min_time=args.min_time)}
+            results.append(r)
+            print(f"{r['id']:48} {_fmt_us(r['median_us'])}  p95 {_fmt_us(r['p95_us'])}  ({r['runs']} runs)")
+    finally:
+        for client in (clients or {}).values():
+            client.close()
+        if fake is not None:
+            fake.shutdown()
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': getattr(rolling.np, '__version__', None) if rolling.np is not None else None,
+            'numpy_min_len': rolling.NUMPY_MIN_LEN,
+            'platform': platform.platform(),
+            'seed': fixtures.SEED,
+            'sizes': sizes,
+            'min_time': args.min_time,
+            'upstream_latency_ms': args.latency,
+            'timestamp': int(time.time()),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            worse = compare(results, json.load(f), args.tolerance)
+        for cid, before, now in worse:
+            print(f'REGRESIÓN {cid}: {_fmt_us(before).strip()} -> {_fmt_us(now).strip()}')
+        if worse:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
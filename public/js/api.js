@@ -77,9 +77,10 @@ const API = {
         }
     },
 
-    /** Fetch prices */
-    async getPrices() {
-        return this._fetch(CONFIG.API.PRICES);
+    /** Fetch prices (con `since`: solo los símbolos que cambiaron desde esa versión) */
+    async getPrices(since = null) {
+        const url = since === null ? CONFIG.API.PRICES : `${CONFIG.API.PRICES}?since=${since}`;
+        return this._fetch(url);
     },
 
     /** Fetch candles */
@@ -88,6 +89,16 @@ const API = {
         return this._fetch(url);
     },
 
+    /** Pares USDT con ticker 24h (ordenados por volumen) */
+    async getSymbols() {
+        return this._fetch(CONFIG.API.SYMBOLS);
+    },
+
+    /** Candidatos ENTER del barrido del servidor */
+    async getScan(interval = '15m', limit = 10) {
+        return this._fetch(`${CONFIG.API.SCAN}?interval=${interval}&limit=${limit}`, {}, 0);
+    },
+
     /** Run analysis */
     async analyze(symbol, direction, leverage, interval) {
         return this._enqueue(() => this._fetch(CONFIG.API.ANALYZE, {
@@ -107,6 +118,7 @@ const API = {
 const DataService = {
 
     _priceInterval: null,
+    _priceVersion: 0,
     _candleInterval: null,
     _running: false,
     _failCount: 0,
@@ -196,9 +208,17 @@ const DataService = {
         this._fetchingPrices = true;
 
         try {
-            const data = await API.getPrices();
-            // Soportar nuevo formato {data, source} y formato legacy
-            const prices = data.data || data;
+            const data = await API.getPrices(this._priceVersion);
+            let prices;
+            if (data.version !== undefined) {
+                // Delta versionado: completo la primera vez o si la versión quedó vieja
+                prices = data.full ? { ...data.data } : { ...State.prices, ...data.data };
+                (data.removed || []).forEach(sym => delete prices[sym]);
+                this._priceVersion = data.version;
+            } else {
+                // Soportar nuevo formato {data, source} y formato legacy
+                prices = data.data || data;
+            }
             State.updatePrices(prices);
             this._failCount = 0;
         } catch (error) {
@@ -1,11 +1,13 @@
 /**
  * Scanner — Volatility & New Pairs Scanner
- * Fetches all Binance Futures pairs and identifies opportunities
+ * Tickers from /api/symbols, ENTER signals from the server-side /api/scan
  */
 const Scanner = {
     _allSymbols: [],
+    _tickers: {},
     _volatilityData: [],
     _newPairs: [],
+    _signals: [],
     _lastScan: 0,
     _SCAN_INTERVAL: 60000, // 1 minute
     _initialized: false,
@@ -33,6 +35,7 @@ const Scanner = {
 
     async _fetchAllSymbols() {
         try {
+            // Solo para las fechas de listado (onboardDate): ningún endpoint propio las expone
             const response = await fetch('https://fapi.binance.com/fapi/v1/exchangeInfo');
             const data = await response.json();
 
@@ -76,29 +79,30 @@ const Scanner = {
 
         await Promise.all([
             this._scanVolatility(),
-            this._scanNewPairs()
+            this._scanSignals()
         ]);
+        this._scanNewPairs();
 
         this.render();
     },
 
     async _scanVolatility() {
         try {
-            // Get 24h ticker for all symbols
-            const response = await fetch('https://fapi.binance.com/fapi/v1/ticker/24hr');
-            const tickers = await response.json();
+            // Snapshot de tickers compartido del servidor (volume = quoteVolume)
+            const data = await API.getSymbols();
+            this._tickers = {};
+            data.symbols.forEach(s => { this._tickers[s.pair] = s; });
 
             // Calculate volatility score
-            this._volatilityData = tickers
-                .filter(t => t.symbol.endsWith('USDT'))
-                .map(t => ({
-                    symbol: t.symbol,
-                    price: parseFloat(t.lastPrice),
-                    change: parseFloat(t.priceChangePercent),
-                    volume: parseFloat(t.quoteVolume),
-                    high: parseFloat(t.highPrice),
-                    low: parseFloat(t.lowPrice),
-                    volatility: this._calcVolatility(t)
+            this._volatilityData = data.symbols
+                .map(s => ({
+                    symbol: s.pair,
+                    price: s.price,
+                    change: s.change,
+                    volume: s.volume,
+                    high: s.high,
+                    low: s.low,
+                    volatility: this._calcVolatility(s)
                 }))
                 .filter(t => t.volume > 1000000) // Min $1M volume
                 .sort((a, b) => b.volatility - a.volatility)
@@ -109,54 +113,75 @@ const Scanner = {
         }
     },
 
+    async _scanSignals() {
+        try {
+            const data = await API.getScan(State.timeframe, 10);
+            this._signals = data.candidates || [];
+        } catch (e) {
+            console.error('Scanner: Signal scan failed', e);
+        }
+    },
+
     _calcVolatility(ticker) {
-        const high = parseFloat(ticker.highPrice);
-        const low = parseFloat(ticker.lowPrice);
-        const price = parseFloat(ticker.lastPrice);
-        const change = Math.abs(parseFloat(ticker.priceChangePercent));
+        const { high, low, price } = ticker;
+        const change = Math.abs(ticker.change);
 
         // Volatility = (High-Low range) + absolute change
         const range = ((high - low) / price) * 100;
         return range + change;
     },
 
-    async _scanNewPairs() {
+    _scanNewPairs() {
         const now = Date.now();
         const thirtyDaysAgo = now - (30 * 24 * 60 * 60 * 1000);
 
-        // Find pairs listed in last 30 days
+        // Find pairs listed in last 30 days, priced from the tickers already loaded
         this._newPairs = this._allSymbols
             .filter(s => s.onboardDate > thirtyDaysAgo)
             .sort((a, b) => b.onboardDate - a.onboardDate)
-            .slice(0, 10);
-
-        // Get prices for new pairs
-        if (this._newPairs.length > 0) {
-            try {
-                const symbols = this._newPairs.map(p => p.symbol);
-                const response = await fetch('https://fapi.binance.com/fapi/v1/ticker/24hr');
-                const tickers = await response.json();
-
-                this._newPairs = this._newPairs.map(p => {
-                    const ticker = tickers.find(t => t.symbol === p.symbol);
-                    return {
-                        ...p,
-                        price: ticker ? parseFloat(ticker.lastPrice) : 0,
-                        change: ticker ? parseFloat(ticker.priceChangePercent) : 0,
-                        volume: ticker ? parseFloat(ticker.quoteVolume) : 0
-                    };
-                });
-            } catch (e) {
-                console.error('Scanner: New pairs price fetch failed', e);
-            }
-        }
+            .slice(0, 10)
+            .map(p => {
+                const ticker = this._tickers[p.symbol];
+                return {
+                    ...p,
+                    price: ticker ? ticker.price : 0,
+                    change: ticker ? ticker.change : 0,
+                    volume: ticker ? ticker.volume : 0
+                };
+            });
     },
 
     render() {
+        this._renderSignals();
         this._renderVolatility();
         this._renderNewPairs();
     },
 
+    _renderSignals() {
+        const container = document.getElementById('scannerSignals');
+        if (!container) return;
+
+        if (this._signals.length === 0) {
+            container.innerHTML = '<div class="scanner-empty">Sin señales</div>';
+            return;
+        }
+
+        container.innerHTML = this._signals.map(item => `
+            <div class="scanner-item" onclick="Scanner.selectSymbol('${item.symbol}USDT')">
+                <div>
+                    <div class="scanner-item-symbol">${item.symbol}</div>
+                    <div class="scanner-item-vol">R:R ${item.rr_ratio} · $${Utils.formatPrice(item.price)}</div>
+                </div>
+                <div>
+                    <div class="scanner-item-change ${item.direction === 'LONG' ? 'up' : 'down'}">
+                        ${item.direction === 'LONG' ? '▲' : '▼'} ${item.direction}
+                    </div>
+                    <div class="scanner-item-vol">Conf: ${item.confidence}%</div>
+                </div>
+            </div>
+        `).join('');
+    },
+
     _renderVolatility() {
         const container = document.getElementById('scannerVolatility');
         if (!container) return;
@@ -54,46 +54,25 @@ const Watchlist = {
     },
 
     async _fetchAllData() {
-        await Promise.all([
-            this._fetchSymbols(),
-            this._fetchTickers()
-        ]);
+        await this._fetchTickers();
         this._loaded = true;
         this.render();
     },
 
-    async _fetchSymbols() {
-        try {
-            const response = await fetch('https://fapi.binance.com/fapi/v1/exchangeInfo');
-            const data = await response.json();
-
-            this._allSymbols = data.symbols
-                .filter(s => s.status === 'TRADING' && s.quoteAsset === 'USDT')
-                .map(s => s.baseAsset);
-
-            console.log(`📋 Watchlist: Loaded ${this._allSymbols.length} symbols`);
-        } catch (e) {
-            console.error('Watchlist: Failed to fetch symbols', e);
-            this._allSymbols = Object.keys(CONFIG.TOKENS);
-        }
-    },
-
     async _fetchTickers() {
         try {
-            const response = await fetch('https://fapi.binance.com/fapi/v1/ticker/24hr');
-            const data = await response.json();
-
-            data.forEach(t => {
-                if (t.symbol.endsWith('USDT')) {
-                    const base = t.symbol.replace('USDT', '');
-                    this._tickers[base] = {
-                        price: parseFloat(t.lastPrice),
-                        change: parseFloat(t.priceChangePercent),
-                        volume: parseFloat(t.quoteVolume),
-                        high: parseFloat(t.highPrice),
-                        low: parseFloat(t.lowPrice)
-                    };
-                }
+            // Pares y tickers salen del snapshot compartido del servidor (/api/symbols)
+            const data = await API.getSymbols();
+
+            this._allSymbols = data.symbols.map(s => s.symbol);
+            data.symbols.forEach(s => {
+                this._tickers[s.symbol] = {
+                    price: s.price,
+                    change: s.change,
+                    volume: s.volume,
+                    high: s.high,
+                    low: s.low
+                };
             });
 
             // Update State.prices for compatibility
@@ -106,6 +85,7 @@ const Watchlist = {
             if (this._loaded) this.render();
         } catch (e) {
             console.error('Watchlist: Failed to fetch tickers', e);
+            if (this._allSymbols.length === 0) this._allSymbols = Object.keys(CONFIG.TOKENS);
         }
     },
 
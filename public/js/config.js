@@ -14,6 +14,8 @@ const CONFIG = {
         PRICES: '/api/prices',
         KLINES: '/api/klines',
         ANALYZE: '/api/analyze',
+        SYMBOLS: '/api/symbols',
+        SCAN: '/api/scan',
     },
 
     // Refresh Intervals (ms) - defaults, usuario puede cambiar
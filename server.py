@@ -0,0 +1,233 @@
+"""Servidor standalone: las funciones de api/ en un proceso de larga vida.
+
+    python server.py --port 8000 --workers 16 --warm
+
+Monta los handlers de api/ (analyze, prices, symbols, klines, scan, metrics) bajo un
+único ThreadingHTTPServer y sirve public/ como hace el rewrite de Vercel.
+Todo comparte las cachés de api/_core (tickers, klines, pool keep-alive y
+salud de hosts), así que no hay cold starts entre requests. --workers acota
+cuántas requests se procesan a la vez; los streams SSE no ocupan ese cupo.
+
+Además de lo que corre en Vercel expone GET /api/stream (Server-Sent
+Events), que necesita conexiones largas y por eso solo existe en este modo:
+
+    /api/stream?symbols=BTC,ETH&candles=BTC:15m,ETH:1h
+
+Eventos: `ticker` (fila de /api/prices + symbol) y `candle` (vela abierta
+con symbol/interval). Todos los clientes comparten un único poller contra
+upstream (api/_core/stream_hub.py); UPSTREAM_OVERRIDE apunta ese poller a un
+Binance falso local.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from api import analyze, klines, metrics, prices, scan, symbols
+from api._core import tickers, universe, upstream
+from api._core.kline_cache import INTERVAL_MS
+from api._core.stream_hub import hub
+
+PUBLIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'public')
+DEFAULT_WORKERS = 16
+QUEUE_TIMEOUT = 30   # segundos esperando un worker libre antes de responder 503
+
+DEFAULT_SYMBOLS = ['BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'ADA', 'DOGE', 'AVAX',
+                   'DOT', 'LINK', 'POL', 'LTC', 'ARB', 'OP', 'INJ']
+MAX_SYMBOLS = 50
+MAX_CANDLES = 10
+HEARTBEAT = 15       # segundos entre comentarios keep-alive
+WRITE_TIMEOUT = 10   # un cliente que no drena su socket en este tiempo se corta
+SYMBOL_RE = re.compile(r'^[A-Z0-9]{1,20}$')
+
+
+# === STREAMING (SSE) ===
+
+class StreamHandler(BaseHTTPRequestHandler):
+    def do_OPTIONS(self):
+        self._send_json(200, {})
+
+    def do_GET(self):
+        try:
+            symbols, candles = self._parse_filters()
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.end_headers()
+
+        self.connection.settimeout(WRITE_TIMEOUT)
+        sub = hub.subscribe(symbols, candles)
+        try:
+            self.wfile.write(b'retry: 3000\n\n')
+            self.wfile.flush()
+            while True:
+                events = sub.drain(HEARTBEAT)
+                if not events:
+                    self.wfile.write(b': ping\n\n')
+                for event, _, data in events:
+                    self.wfile.write(f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, socket.timeout):
+            pass
+        finally:
+            hub.unsubscribe(sub)
+
+    def _parse_filters(self):
+        query = parse_qs(urlparse(self.path).query)
+        raw = query.get('symbols', [''])[0]
+        symbols = [s.strip().upper() for s in raw.split(',') if s.strip()] or DEFAULT_SYMBOLS
+        if len(symbols) > MAX_SYMBOLS:
+            raise ValueError(f'Máximo {MAX_SYMBOLS} symbols')
+        candles = []
+        for item in query.get('candles', [''])[0].split(','):
+            if not item.strip():
+                continue
+            sym, _, interval = item.strip().partition(':')
+            candles.append((sym.upper(), interval or '15m'))
+        if len(candles) > MAX_CANDLES:
+            raise ValueError(f'Máximo {MAX_CANDLES} candles')
+        for sym in symbols + [c[0] for c in candles]:
+            if not SYMBOL_RE.match(sym):
+                raise ValueError(f'Symbol inválido: {sym}')
+        for _, interval in candles:
+            if interval not in INTERVAL_MS:
+                raise ValueError(f'Interval inválido: {interval}')
+        return symbols, candles
+
+    def _send_json(self, status, data):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.end_headers()
+        self.wfile.write(json.dumps(data).encode())
+
+
+# === ROUTER ===
+
+class NotFoundHandler(BaseHTTPRequestHandler):
+    def _not_found(self):
+        self.send_response(404)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps({'error': f'Ruta inexistente: {urlparse(self.path).path}'}).encode())
+
+    do_GET = do_POST = do_OPTIONS = _not_found
+
+
+class StaticHandler(SimpleHTTPRequestHandler):
+    directory = PUBLIC_DIR
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Dispatch:
+    """Elige el handler por path después de parsear la request.
+
+    Cada handler montado es una subclase (_Dispatch, handler): el objeto
+    cambia de clase a la de su ruta y BaseHTTPRequestHandler sigue igual
+    (do_GET/do_POST, _send_json y demás de cada archivo de api/).
+    """
+    routes = {}        # path -> handler montado; None -> 404 de /api, '' -> estáticos
+    workers = None     # semáforo de requests concurrentes (None = sin límite)
+    unlimited = ()     # paths que no ocupan worker (streams)
+
+    def handle_one_request(self):
+        self._slot = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self._slot is not None:
+                self._slot.release()
+
+    def parse_request(self):
+        if not super().parse_request():
+            return False
+        path = urlparse(self.path).path.rstrip('/') or '/'
+        if path in self.routes:
+            self.__class__ = self.routes[path]
+        else:
+            self.__class__ = self.routes[None if path.startswith('/api/') else '']
+        if self.workers is not None and path not in self.unlimited:
+            if not self.workers.acquire(timeout=QUEUE_TIMEOUT):
+                self.send_error(503, 'Servidor saturado')
+                return False
+            self._slot = self.workers
+        return True
+
+
+def mount(routes, workers=None, unlimited=('/api/stream',), static_dir=PUBLIC_DIR):
+    """{path: handler} -> clase base para el servidor"""
+    dispatch = type('Dispatch', (_Dispatch,), {
+        'routes': {},
+        'workers': threading.BoundedSemaphore(workers) if workers else None,
+        'unlimited': frozenset(unlimited),
+    })
+    for path, cls in routes.items():
+        dispatch.routes[path] = type(cls.__name__, (dispatch, cls), {})
+    dispatch.routes[None] = type('NotFoundHandler', (dispatch, NotFoundHandler), {})
+    dispatch.routes[''] = type('StaticHandler', (dispatch, StaticHandler), {'directory': static_dir})
+    return dispatch.routes[None]
+
+
+ROUTES = {
+    '/api/analyze': analyze.handler,
+    '/api/prices': prices.handler,
+    '/api/symbols': symbols.handler,
+    '/api/klines': klines.handler,
+    '/api/scan': scan.handler,
+    '/api/metrics': metrics.local_handler,
+    '/api/stream': StreamHandler,
+}
+
+
+def make_server(host='127.0.0.1', port=8000, routes=None, workers=DEFAULT_WORKERS):
+    srv = ThreadingHTTPServer((host, port), mount(routes or ROUTES, workers))
+    srv.daemon_threads = True
+    # Un keep-alive idle por worker hacia cada host de Binance
+    upstream.client.max_idle = max(upstream.client.max_idle, workers or 0)
+    return srv
+
+
+def warm():
+    """Precargar el snapshot de tickers y el universo antes del primer request"""
+    try:
+        universe.get_market('futures')
+        tickers.get_snapshot('spot', fallback=False)
+    except Exception as e:
+        print(f'Warm-up incompleto: {e}')
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Servidor standalone de la API')
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8000)
+    ap.add_argument('--workers', type=int, default=int(os.environ.get('SERVER_WORKERS', DEFAULT_WORKERS)),
+                    help='requests procesándose a la vez (0 = sin límite)')
+    ap.add_argument('--warm', action='store_true', help='precargar tickers antes de atender')
+    args = ap.parse_args(argv)
+    if args.warm:
+        warm()
+    srv = make_server(args.host, args.port, workers=args.workers)
+    print(f'Escuchando en http://{args.host}:{srv.server_address[1]} ({args.workers or "sin límite de"} workers)')
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+
+
+if __name__ == '__main__':
+    main()
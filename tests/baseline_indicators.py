@@ -0,0 +1,81 @@
+"""Fórmulas escalares de analyze.py antes de las optimizaciones (referencia).
+
+Copiadas tal cual: los tests exigen que las versiones actuales den
+exactamente los mismos floats.
+"""
+
+
+def rsi(closes, period=14):
+    if len(closes) < period + 1:
+        return 50.0
+    gains, losses = 0.0, 0.0
+    for i in range(1, period + 1):
+        change = closes[i] - closes[i - 1]
+        if change > 0:
+            gains += change
+        else:
+            losses -= change
+    avg_gain = gains / period
+    avg_loss = losses / period
+    for i in range(period + 1, len(closes)):
+        change = closes[i] - closes[i - 1]
+        if change > 0:
+            avg_gain = (avg_gain * (period - 1) + change) / period
+            avg_loss = (avg_loss * (period - 1)) / period
+        else:
+            avg_gain = (avg_gain * (period - 1)) / period
+            avg_loss = (avg_loss * (period - 1) - change) / period
+    if avg_loss == 0:
+        return 100.0
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def ema(data, period):
+    if not data or len(data) < period:
+        return data[-1] if data else 0.0
+    k = 2 / (period + 1)
+    val = sum(data[:period]) / period
+    for x in data[period:]:
+        val = x * k + val * (1 - k)
+    return val
+
+
+def atr(candles, period=14):
+    if len(candles) < period + 1:
+        if len(candles) >= 2:
+            trs = [c['h'] - c['l'] for c in candles[-min(len(candles), period):]]
+            return sum(trs) / len(trs) if trs else 0.0
+        return 0.0
+    trs = []
+    for i in range(1, len(candles)):
+        h, l, pc = candles[i]['h'], candles[i]['l'], candles[i - 1]['c']
+        trs.append(max(h - l, abs(h - pc), abs(l - pc)))
+    if not trs:
+        return 0.0
+    atr_val = sum(trs[:period]) / period
+    for tr in trs[period:]:
+        atr_val = (atr_val * (period - 1) + tr) / period
+    return atr_val
+
+
+def macd(closes, fast=12, slow=26, signal_period=9):
+    if len(closes) < slow + signal_period:
+        return {'macd': 0, 'signal': 0, 'histogram': 0}
+    k_fast = 2 / (fast + 1)
+    k_slow = 2 / (slow + 1)
+    ema_fast = sum(closes[:fast]) / fast
+    ema_slow = sum(closes[:slow]) / slow
+    macd_series = []
+    for i in range(slow, len(closes)):
+        ema_fast = closes[i] * k_fast + ema_fast * (1 - k_fast)
+        ema_slow = closes[i] * k_slow + ema_slow * (1 - k_slow)
+        macd_series.append(ema_fast - ema_slow)
+    if len(macd_series) < signal_period:
+        return {'macd': macd_series[-1] if macd_series else 0, 'signal': 0, 'histogram': 0}
+    k_sig = 2 / (signal_period + 1)
+    signal_val = sum(macd_series[:signal_period]) / signal_period
+    for x in macd_series[signal_period:]:
+        signal_val = x * k_sig + signal_val * (1 - k_sig)
+    macd_val = macd_series[-1]
+    return {'macd': macd_val, 'signal': signal_val, 'histogram': macd_val - signal_val}
@@ -0,0 +1,76 @@
+"""Fixtures compartidos: los tests corren sin red y sin reloj real de Binance.
+
+    python -m pytest -q
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api._core import kline_cache  # noqa: E402
+from bench import fixtures  # noqa: E402
+
+IV = kline_cache.INTERVAL_MS['1m']
+
+
+class FakeKlines:
+    """Reemplazo de binance.fetch_json para /klines: historia de 1m que
+    termina en la vela abierta actual; respeta startTime y limit."""
+
+    def __init__(self, n=500, before=None):
+        open_t = int(time.time() * 1000) // IV * IV
+        self.rows = [[open_t - (n - 1 - i) * IV, *r[1:]] for i, r in enumerate(fixtures.kline_rows(n))]
+        self.calls = []
+        self.before = before  # callable(query) que corre antes de responder
+
+    def __call__(self, hosts, path, timings=None, **kwargs):
+        query = dict(p.split('=') for p in path.split('?', 1)[1].split('&'))
+        self.calls.append(query)
+        if self.before is not None:
+            self.before(query)
+        rows = self.rows
+        if 'startTime' in query:
+            rows = [r for r in rows if r[0] >= int(query['startTime'])][:int(query['limit'])]
+        else:
+            rows = rows[-int(query['limit']):]
+        return [list(r) for r in rows]
+
+
+@pytest.fixture
+def fake_klines(monkeypatch):
+    """Fábrica de FakeKlines ya instalado en kline_cache"""
+    def install(**kwargs):
+        fake = FakeKlines(**kwargs)
+        monkeypatch.setattr(kline_cache.binance, 'fetch_json', fake)
+        return fake
+    return install
+
+
+@pytest.fixture(scope='module')
+def api():
+    """request(method, path, body=None) -> (status, headers, body) contra server.py en un puerto libre"""
+    import http.client
+    import json
+    import threading
+
+    import server
+
+    srv = server.make_server(port=0)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    def request(method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection('127.0.0.1', srv.server_address[1], timeout=30)
+        try:
+            conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                         headers={'Content-Type': 'application/json', **(headers or {})})
+            resp = conn.getresponse()
+            return resp.status, dict(resp.getheaders()), resp.read()
+        finally:
+            conn.close()
+
+    yield request
+    srv.shutdown()
+    srv.server_close()
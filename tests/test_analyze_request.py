@@ -0,0 +1,22 @@
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize('lookback', [True, False, 0, -1, 1.5, '200', 10_000_000])
+def test_invalid_lookback_is_rejected(api, lookback):
+    status, _, body = api('POST', '/api/analyze', {'symbol': 'BTC', 'direction': 'LONG', 'lookback': lookback})
+    assert status == 400
+    assert 'lookback' in json.loads(body)['error']
+
+
+@pytest.mark.parametrize('intervals', [[['1h']], [{'iv': '1h'}], ['1h', 4], [None]])
+def test_non_string_intervals_are_rejected(api, intervals):
+    status, _, body = api('POST', '/api/analyze', {'symbol': 'BTC', 'direction': 'LONG', 'intervals': intervals})
+    assert status == 400
+    assert json.loads(body)['error'] == 'intervals debe contener strings'
+
+
+def test_unknown_interval_is_rejected(api):
+    status, _, _ = api('POST', '/api/analyze', {'symbol': 'BTC', 'direction': 'LONG', 'intervals': ['1h', '7m']})
+    assert status == 400
@@ -0,0 +1,166 @@
+import threading
+import types
+from datetime import datetime, timezone
+
+import pytest
+
+from api._core import candle_store
+from api._core.candle_store import CandleFile, CandleStore
+from bench import fixtures
+
+IV = 900_000
+WEEK = 7 * 86_400_000
+
+
+@pytest.fixture
+def small_capacity(monkeypatch):
+    monkeypatch.setattr(candle_store, 'INITIAL_CAPACITY', 4)
+
+
+def _rows(start, stop):
+    return fixtures.kline_rows(stop, interval_ms=IV)[start:stop]
+
+
+def _check(cf, rows):
+    assert cf.count == len(rows)
+    assert list(cf.column('t')) == [r[0] for r in rows]
+    assert list(cf.column('c')) == [float(r[4]) for r in rows]
+    assert list(cf.column('trades')) == [r[8] for r in rows]
+
+
+def test_append_in_place(tmp_path, small_capacity):
+    cf = CandleFile(str(tmp_path / 'BTC_15m.bin'), IV)
+    cf.append(_rows(0, 2))
+    cf.append(_rows(2, 4))
+    assert cf.capacity == 4
+    _check(cf, _rows(0, 4))
+
+
+def test_capacity_doubles_when_full(tmp_path, small_capacity):
+    path = str(tmp_path / 'BTC_15m.bin')
+    cf = CandleFile(path, IV)
+    cf.append(_rows(0, 3))
+    cf.append(_rows(3, 5))
+    assert cf.capacity == 8
+    cf.append(_rows(5, 20))
+    assert cf.capacity == 32
+    _check(cf, _rows(0, 20))
+    # Lo reescrito está en disco: otro CandleFile lo relee igual
+    _check(CandleFile(path, IV), _rows(0, 20))
+
+
+def test_prepend_keeps_order_and_grows(tmp_path, small_capacity):
+    cf = CandleFile(str(tmp_path / 'BTC_15m.bin'), IV)
+    cf.append(_rows(10, 13))
+    view = cf.view(0, cf.count)
+    cf.prepend(_rows(0, 10))
+    assert cf.capacity == 16
+    _check(cf, _rows(0, 13))
+    # Las vistas tomadas antes de reescribir siguen leyendo el mmap anterior
+    assert list(view['t']) == [r[0] for r in _rows(10, 13)]
+
+
+def test_index_range_and_view(tmp_path):
+    cf = CandleFile(str(tmp_path / 'BTC_15m.bin'), IV)
+    cf.append(_rows(0, 50))
+    i, j = cf.index_range(10 * IV, 19 * IV)
+    assert (i, j) == (10, 20)
+    view = cf.view(i, j)
+    assert len(view) == 10
+    assert list(view['o']) == [float(r[1]) for r in _rows(10, 20)]
+
+
+# === LLENADO DESDE UPSTREAM ===
+
+class Upstream:
+    """fetch_json falso: velas de `iv` desde `first_t` hasta la que contiene `now_ms`"""
+
+    def __init__(self, first_t, now_ms, iv, fail=()):
+        self.rows = []
+        t = first_t
+        for r in fixtures.kline_rows(10_000, interval_ms=iv):
+            if t > now_ms:
+                break
+            self.rows.append([t, *r[1:]])
+            t += iv
+        self.fail = set(fail)  # fuentes que responden con error
+        self.calls = []
+        self.during = None
+
+    def __call__(self, hosts, path, timings=None, **kwargs):
+        source = 'spot' if path.startswith('/api/v3') else 'futures'
+        self.calls.append(source)
+        if self.during is not None:
+            self.during()
+        if source in self.fail:
+            raise OSError(f'{source} caído')
+        q = dict(p.split('=') for p in path.split('?', 1)[1].split('&'))
+        lo, hi = int(q['startTime']), int(q.get('endTime', 2 ** 62))
+        return [list(r) for r in self.rows if lo <= r[0] <= hi][:int(q['limit'])]
+
+
+def _freeze(monkeypatch, now_ms):
+    monkeypatch.setattr(candle_store, 'time', types.SimpleNamespace(time=lambda: now_ms / 1000))
+
+
+def _ms(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def test_weekly_candles_close_on_binance_mondays(tmp_path, monkeypatch):
+    # Martes: la semanal que abrió el lunes 5 ya cerró; la del lunes 12 sigue abierta
+    now = _ms(2026, 10, 13, 12)
+    closed, current = _ms(2026, 10, 5), _ms(2026, 10, 12)
+    _freeze(monkeypatch, now)
+    upstream = Upstream(current - 30 * WEEK, now, WEEK)
+    monkeypatch.setattr(candle_store.binance, 'fetch_json', upstream)
+    store = CandleStore(str(tmp_path))
+
+    tail = store.tail('BTC', '1w', 5)
+    assert list(tail['t']) == [closed - i * WEEK for i in range(4, -1, -1)]
+
+    view, nxt = store.range('BTC', '1w', current - 30 * WEEK, now, 10)
+    assert len(view) == 10 and view['t'][0] == current - 30 * WEEK
+    assert nxt == view['t'][-1] + WEEK
+    view, nxt = store.range('BTC', '1w', closed - 2 * WEEK, now, 10)
+    assert list(view['t']) == [closed - 2 * WEEK, closed - WEEK, closed]
+    assert nxt is None
+
+
+def test_failed_spot_fallback_keeps_futures(tmp_path, monkeypatch):
+    now = _ms(2026, 10, 13, 12)
+    _freeze(monkeypatch, now)
+    upstream = Upstream(now - 200 * IV, now, IV, fail={'futures', 'spot'})
+    monkeypatch.setattr(candle_store.binance, 'fetch_json', upstream)
+    store = CandleStore(str(tmp_path))
+
+    with pytest.raises(OSError):
+        store.tail('BTC', '15m', 10)
+    assert store.file('BTC', '15m').source == 'futures'
+
+    upstream.fail = {'futures'}
+    upstream.calls.clear()
+    assert len(store.tail('BTC', '15m', 10)) == 10
+    assert upstream.calls[0] == 'futures'
+    # La fuente del fallback queda en el header
+    assert CandleFile(str(tmp_path / 'BTC_15m.bin'), IV).source == 'spot'
+
+
+def test_fetch_runs_without_the_file_lock(tmp_path, monkeypatch):
+    now = _ms(2026, 10, 13, 12)
+    _freeze(monkeypatch, now)
+    upstream = Upstream(now - 200 * IV, now, IV)
+    monkeypatch.setattr(candle_store.binance, 'fetch_json', upstream)
+    store = CandleStore(str(tmp_path))
+    cf = store.file('BTC', '15m')
+    free = []
+
+    def probe():
+        # Otro thread (un lector) tiene que poder tomar el lock mientras se baja
+        t = threading.Thread(target=lambda: free.append(cf.lock.acquire(timeout=1) and cf.lock.release() is None))
+        t.start()
+        t.join()
+
+    upstream.during = probe
+    store.tail('BTC', '15m', 50)
+    assert free and all(free)
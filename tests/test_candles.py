@@ -0,0 +1,76 @@
+"""CandleSeries: parseo de /klines, slices sin copia, concat/compact y pickle."""
+import pickle
+
+import pytest
+
+from api._core.candles import NAMES, CandleSeries, MalformedKlines
+from bench import fixtures
+
+
+def _rows(n=50):
+    return fixtures.kline_rows(n, 3)
+
+
+def test_from_klines_parses_each_column():
+    rows = _rows()
+    series = CandleSeries.from_klines(rows)
+    assert len(series) == len(rows)
+    assert series[0] == {'t': rows[0][0], 'o': float(rows[0][1]), 'h': float(rows[0][2]),
+                         'l': float(rows[0][3]), 'c': float(rows[0][4]), 'v': float(rows[0][5]),
+                         'trades': rows[0][8]}
+    assert list(series['c']) == [float(r[4]) for r in rows]
+    assert [c['t'] for c in series] == [r[0] for r in rows]
+
+
+@pytest.mark.parametrize('rows', [[[1, '2', '3']], [[1, 'x', '1', '1', '1', '1', 0, '0', 5]], [None]])
+def test_malformed_rows_raise(rows):
+    with pytest.raises(MalformedKlines):
+        CandleSeries.from_klines(rows)
+
+
+def test_slices_share_buffers():
+    series = CandleSeries.from_klines(_rows())
+    tail = series[-10:]
+    assert len(tail) == 10
+    assert tail[0] == series[40] and tail[-1] == series[-1]
+    assert tail.nbytes == series.nbytes
+    assert len(series[60:]) == 0 and len(series[30:20]) == 0
+    assert list(tail[2:4]['t']) == list(series['t'][42:44])
+    with pytest.raises(ValueError):
+        series[::2]
+
+
+def test_compact_and_concat_copy_only_the_visible_rows():
+    series = CandleSeries.from_klines(_rows())
+    tail = series[-10:].compact()
+    assert list(tail) == list(series[-10:])
+    assert tail.nbytes == 10 * 8 * len(NAMES)
+    assert series.compact() is series
+
+    joined = CandleSeries.concat([series[:20], series[20:]])
+    assert list(joined) == list(series)
+    assert joined.nbytes == series.nbytes
+
+
+def test_from_candles_fills_missing_columns():
+    candles = fixtures.candles(5)
+    series = CandleSeries.from_candles(candles)
+    assert [c['c'] for c in series] == [c['c'] for c in candles]
+    assert list(series['t']) == [0] * 5
+    assert CandleSeries.coerce(series) is series
+    assert len(CandleSeries.from_candles([])) == 0
+
+
+def test_pickle_ships_only_the_slice():
+    series = CandleSeries.from_klines(_rows())
+    copy = pickle.loads(pickle.dumps(series[-5:]))
+    assert list(copy) == list(series[-5:])
+    assert copy.nbytes == 5 * 8 * len(NAMES)
+
+
+def test_array_is_a_view_of_the_column():
+    np = pytest.importorskip('numpy')
+    series = CandleSeries.from_klines(_rows())[-10:]
+    closes = series.array('c')
+    assert closes.dtype == np.float64 and closes.tolist() == list(series['c'])
+    assert series.array('t').dtype == np.int64
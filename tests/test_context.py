@@ -0,0 +1,51 @@
+"""IndicatorContext sobre velas dict y CandleSeries da los mismos floats que
+las fórmulas base, y calcula cada indicador una sola vez."""
+import pytest
+
+from api import analyze as A
+from api._core.candles import CandleSeries
+from bench import fixtures
+
+import baseline_indicators as base
+
+SIZES = (0, 1, 2, 5, 14, 15, 16, 26, 34, 35, 36, 50, 100, 257, 500)
+SEEDS = (1, 2, 3)
+
+
+def _indicators(closes, candles):
+    return {
+        'rsi14': (base.rsi(closes, 14), lambda x: x.rsi(14)),
+        'rsi7': (base.rsi(closes, 7), lambda x: x.rsi(7)),
+        'ema9': (base.ema(closes, 9), lambda x: x.ema(9)),
+        'ema50': (base.ema(closes, 50), lambda x: x.ema(50)),
+        'macd': (base.macd(closes), lambda x: x.macd()),
+        'macd_fast': (base.macd(closes, 6, 13, 5), lambda x: x.macd(6, 13, 5)),
+        'atr': (base.atr(candles, 14), lambda x: x.atr(14)),
+    }
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('n', SIZES)
+def test_context_matches_baseline(seed, n):
+    candles = fixtures.candles(n, seed)
+    closes = [c['c'] for c in candles]
+    series = CandleSeries.from_klines(fixtures.kline_rows(n, seed)) if n else CandleSeries.empty()
+    for name, (expected, get) in _indicators(closes, candles).items():
+        assert get(A.IndicatorContext(candles)) == expected, name
+        assert get(A.IndicatorContext(series)) == expected, name
+
+
+def test_context_memoizes_each_indicator(monkeypatch):
+    calls = []
+    real = A.rsi
+
+    def counting(*args):
+        calls.append(args[1:])
+        return real(*args)
+
+    monkeypatch.setattr(A, 'rsi', counting)
+    ctx = A.IndicatorContext(CandleSeries.from_klines(fixtures.kline_rows(100, 1)))
+    assert ctx.rsi(14) == ctx.rsi(14)
+    ctx.rsi(7)
+    assert calls == [(14,), (7,)]
+    assert A.IndicatorContext.wrap(ctx) is ctx
@@ -0,0 +1,165 @@
+"""HostRegistry (circuit breaker, half-open) y el presupuesto de fetch_json."""
+import threading
+import time
+import types
+import urllib.error
+
+import pytest
+
+from api._core import binance, hosts
+from api._core.hosts import CLOSED, COOLDOWN, HALF_OPEN, OPEN, HostRegistry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(hosts, 'time', types.SimpleNamespace(monotonic=c.monotonic))
+    return c
+
+
+def _fail(reg, host, n):
+    for _ in range(n):
+        reg.record(host, 0.1, False)
+
+
+def test_order_prefers_fast_hosts_and_keeps_unknown_last():
+    reg = HostRegistry()
+    reg.record('slow', 0.5, True)
+    reg.record('fast', 0.05, True)
+    assert reg.order(['new', 'slow', 'fast']) == ['fast', 'slow', 'new']
+
+
+def test_circuit_opens_after_threshold(clock):
+    reg = HostRegistry()
+    _fail(reg, 'a', hosts.FAILURE_THRESHOLD - 1)
+    assert reg.order(['a', 'b']) == ['a', 'b']
+    _fail(reg, 'a', 1)
+    assert reg.snapshot()['a']['state'] == OPEN
+    assert reg.order(['a', 'b']) == ['b']
+    clock.now += COOLDOWN - 0.1
+    assert reg.order(['a', 'b']) == ['b']
+
+
+def test_half_open_allows_a_single_probe(clock):
+    reg = HostRegistry()
+    _fail(reg, 'a', hosts.FAILURE_THRESHOLD)
+    clock.now += COOLDOWN
+    assert reg.order(['a']) == ['a']
+    assert reg.snapshot()['a']['state'] == HALF_OPEN
+    # Aparecer en el orden no gasta la prueba; begin() sí
+    assert reg.order(['a']) == ['a']
+    assert reg.begin('a') is True
+    assert reg.begin('a') is False
+    assert reg.order(['a']) == []
+    # Vencida la ventana de prueba sin resultado, se permite otra
+    clock.now += hosts.PROBE_WINDOW
+    assert reg.begin('a') is True
+
+
+def test_probe_success_closes_the_circuit(clock):
+    reg = HostRegistry()
+    _fail(reg, 'a', hosts.FAILURE_THRESHOLD)
+    clock.now += COOLDOWN
+    reg.order(['a'])
+    assert reg.begin('a')
+    reg.record('a', 0.1, True)
+    assert reg.snapshot()['a']['state'] == CLOSED
+    assert reg.begin('a') and reg.begin('a')
+    # Y el cooldown vuelve al inicial
+    _fail(reg, 'a', hosts.FAILURE_THRESHOLD)
+    clock.now += COOLDOWN
+    assert reg.order(['a']) == ['a']
+
+
+def test_probe_failure_doubles_the_cooldown(clock):
+    reg = HostRegistry()
+    _fail(reg, 'a', hosts.FAILURE_THRESHOLD)
+    cooldown = COOLDOWN
+    for _ in range(8):
+        clock.now += cooldown
+        assert reg.order(['a']) == ['a']
+        assert reg.begin('a')
+        reg.record('a', 0.1, False)
+        assert reg.snapshot()['a']['state'] == OPEN
+        cooldown = min(cooldown * 2, hosts.MAX_COOLDOWN)
+        clock.now += cooldown - 0.1
+        assert reg.order(['a']) == []
+        clock.now -= cooldown - 0.1
+    assert cooldown == hosts.MAX_COOLDOWN
+
+
+def test_business_errors_do_not_count_against_the_host():
+    assert not binance._is_host_failure(urllib.error.HTTPError('u', 400, 'bad', {}, None))
+    assert binance._is_host_failure(urllib.error.HTTPError('u', 429, 'slow', {}, None))
+    assert binance._is_host_failure(urllib.error.HTTPError('u', 503, 'down', {}, None))
+    assert binance._is_host_failure(urllib.error.URLError('timeout'))
+
+
+class SlowUpstream:
+    """client.get_json falso: cada host tarda lo que diga `delays` (o cuelga)"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.calls = []
+        self.release = threading.Event()
+
+    def get_json(self, host, path, timeout=None):
+        self.calls.append((host, timeout))
+        delay = self.delays.get(host)
+        if delay is None:
+            # Cuelga hasta su timeout, como un host que no contesta
+            self.release.wait(timeout)
+            raise urllib.error.URLError(f'{host}: timeout')
+        time.sleep(delay)
+        return {'host': host}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(binance, 'health', HostRegistry())
+
+    def install(delays):
+        fake = SlowUpstream(delays)
+        monkeypatch.setattr(binance, 'client', fake)
+        return fake
+
+    return install
+
+
+def test_hedge_launches_second_host_after_budget(upstream):
+    fake = upstream({'b': 0.0})
+    t0 = time.monotonic()
+    assert binance.fetch_json(['a', 'b'], '/x', hedge_ms=50) == {'host': 'b'}
+    assert time.monotonic() - t0 < 1.0
+    assert [h for h, _ in fake.calls] == ['a', 'b']
+    fake.release.set()
+
+
+def test_hedged_chain_respects_the_fallback_budget(upstream, monkeypatch):
+    monkeypatch.setattr(binance, 'FALLBACK_BUDGET', 0.3)
+    fake = upstream({})
+    t0 = time.monotonic()
+    with pytest.raises(urllib.error.URLError):
+        binance.fetch_json(['a', 'b', 'c', 'd'], '/x', timeout=5, hedge_ms=50)
+    assert time.monotonic() - t0 < 1.0
+    # Ningún intento pide un timeout que pase del deadline
+    assert all(timeout <= 0.3 for _, timeout in fake.calls)
+    fake.release.set()
+
+
+def test_sequential_chain_respects_the_fallback_budget(upstream, monkeypatch):
+    monkeypatch.setattr(binance, 'FALLBACK_BUDGET', 0.2)
+    fake = upstream({})
+    t0 = time.monotonic()
+    with pytest.raises(urllib.error.URLError):
+        binance.fetch_json(['a', 'b', 'c'], '/x', timeout=5, hedge_ms=0)
+    assert time.monotonic() - t0 < 1.0
+    assert all(timeout <= 0.2 for _, timeout in fake.calls)
@@ -0,0 +1,44 @@
+"""Las funciones escalares de analyze.py dan los mismos floats que las
+fórmulas base (tests/baseline_indicators.py)."""
+import pytest
+
+from api import analyze as A
+from api._core import indicators as engine
+from api._core import rolling
+from api._core.candles import CandleSeries
+from bench import fixtures
+
+import baseline_indicators as base
+
+SIZES = (0, 1, 2, 5, 14, 15, 16, 26, 34, 35, 36, 50, 100, 257, 500)
+SEEDS = (1, 2, 3)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('n', SIZES)
+def test_scalar_functions_match_baseline(seed, n):
+    candles = fixtures.candles(n, seed)
+    closes = [c['c'] for c in candles]
+    series = CandleSeries.from_klines(fixtures.kline_rows(n, seed)) if n else CandleSeries.empty()
+
+    assert A.rsi(closes, 14) == base.rsi(closes, 14)
+    assert A.rsi(series['c'], 7) == base.rsi(closes, 7)
+    assert A.ema(closes, 21) == base.ema(closes, 21)
+    assert A.ema(series['c'], 9) == base.ema(closes, 9)
+    assert A.macd(closes) == base.macd(closes)
+    assert A.macd(series['c'], 6, 13, 5) == base.macd(closes, 6, 13, 5)
+    assert A.atr(candles, 14) == base.atr(candles, 14)
+    assert A.atr(series, 14) == base.atr(candles, 14)
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+@pytest.mark.parametrize('n', [14, 20, 300])
+def test_stochastic_series_last_value(monkeypatch, vectorized, n):
+    """La serie de indicators.py termina en el mismo %K/%D que stochastic()"""
+    monkeypatch.setattr(rolling, 'NUMPY_MIN_LEN', 0 if vectorized else 10 ** 9)
+    candles = fixtures.candles(n, 5)
+    cols = engine.columns(candles)
+    st = engine.stochastic_series(cols.h, cols.l, cols.c)
+    ref = A.stochastic(candles)
+    assert float(st['k'][-1]) == pytest.approx(ref['k'], rel=1e-12)
+    assert float(st['d'][-1]) == pytest.approx(ref['d'], rel=1e-12)
@@ -0,0 +1,75 @@
+"""KlineCache: descarga completa en el miss, refresh solo de la cola y LRU."""
+import time
+
+from api._core import kline_cache
+from api._core.kline_cache import KlineCache
+
+
+def _age(cache, key, seconds):
+    cache._entries[key].refreshed_at -= seconds
+
+
+def test_miss_fetches_once_then_serves_from_cache(fake_klines):
+    fake = fake_klines()
+    cache = KlineCache(ttl=5, grace=0)
+    series, source = cache.get('BTC', '1m', 100)
+    assert source == 'futures'
+    assert list(series['t']) == [r[0] for r in fake.rows[-100:]]
+    # Un limit menor sale de la misma entrada
+    assert len(cache.get('BTC', '1m', 100)[0]) == 100
+    assert len(cache.get('BTC', '1m', 20)[0]) == 20
+    assert fake.calls == [{'symbol': 'BTCUSDT', 'interval': '1m', 'limit': '100'}]
+    assert cache.stats()['hits'] == 2
+
+
+def test_expired_entry_refreshes_only_the_tail(fake_klines):
+    fake = fake_klines()
+    cache = KlineCache(ttl=5, grace=0)
+    cache.get('BTC', '1m', 100)
+    # La vela abierta se movió
+    fake.rows[-1][4] = '123.5'
+    _age(cache, ('BTC', '1m'), 10)
+
+    series, _ = cache.get('BTC', '1m', 100)
+    assert len(fake.calls) == 2
+    assert fake.calls[1]['startTime'] == str(fake.rows[-1][0])
+    assert series['c'][-1] == 123.5
+    assert list(series['t']) == [r[0] for r in fake.rows[-100:]]
+    stats = cache.stats()
+    assert stats['tail_refreshes'] == 1 and stats['full_fetches'] == 1
+
+
+def test_larger_limit_refetches_everything(fake_klines):
+    fake = fake_klines()
+    cache = KlineCache()
+    cache.get('BTC', '1m', 50)
+    series, _ = cache.get('BTC', '1m', 200)
+    assert len(series) == 200
+    assert [q['limit'] for q in fake.calls] == ['50', '200']
+
+
+def test_long_gap_falls_back_to_a_full_fetch(fake_klines, monkeypatch):
+    fake = fake_klines()
+    monkeypatch.setattr(kline_cache, 'MAX_TAIL', 3)
+    cache = KlineCache(ttl=5, grace=0)
+    cache.get('BTC', '1m', 100)
+    entry = cache._entries[('BTC', '1m')]
+    # La última vela cacheada quedó 5 velas atrás
+    cache._store(('BTC', '1m'), kline_cache.KlineEntry(
+        entry.series[:-5], entry.source, time.time() - 10))
+    series, _ = cache.get('BTC', '1m', 90)
+    assert 'startTime' not in fake.calls[-1]
+    assert series['t'][-1] == fake.rows[-1][0]
+
+
+def test_least_recently_used_key_is_evicted(fake_klines):
+    fake_klines()
+    cache = KlineCache(max_entries=2)
+    cache.get('BTC', '1m', 10)
+    cache.get('ETH', '1m', 10)
+    cache.get('BTC', '1m', 10)
+    cache.get('SOL', '1m', 10)
+    assert cache.peek('ETH', '1m', 10) is None
+    assert cache.peek('BTC', '1m', 10) is not None
+    assert cache.stats()['evictions'] == 1
+
@@ -0,0 +1,27 @@
+import pytest
+
+from api import metrics
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setattr(metrics, 'TOKEN', 's3cret')
+    monkeypatch.setattr(metrics, 'LOOPBACK_OPEN', False)
+
+
+def test_loopback_needs_the_token_by_default(api, token):
+    assert api('GET', '/api/metrics')[0] == 401
+    assert api('GET', '/api/metrics', headers={'Authorization': 'Bearer nope'})[0] == 401
+    status, headers, body = api('GET', '/api/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert status == 200 and headers['Content-Type'].startswith('text/plain')
+
+
+def test_loopback_bypass_is_opt_in(api, token, monkeypatch):
+    monkeypatch.setattr(metrics, 'LOOPBACK_OPEN', True)
+    assert api('GET', '/api/metrics')[0] == 200
+
+
+def test_without_token_the_route_is_hidden(api, monkeypatch):
+    monkeypatch.setattr(metrics, 'TOKEN', '')
+    monkeypatch.setattr(metrics, 'LOOPBACK_OPEN', False)
+    assert api('GET', '/api/metrics')[0] == 404
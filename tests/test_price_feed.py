@@ -0,0 +1,90 @@
+"""PriceFeed: versiones, deltas con ?since y snapshots fuera de orden."""
+import json
+
+import pytest
+
+from api import prices
+from api._core import tickers
+from api._core.price_feed import PriceFeed
+
+
+def _snapshot(prices_by_symbol, source='futures'):
+    rows = [{'symbol': f'{sym}USDT', 'lastPrice': str(p), 'priceChangePercent': '1.0',
+             'quoteVolume': '100', 'highPrice': str(p), 'lowPrice': str(p)}
+            for sym, p in prices_by_symbol.items()]
+    return tickers.TickerSnapshot(source, rows)
+
+
+def test_same_snapshot_keeps_version():
+    feed = PriceFeed(['BTC', 'ETH'])
+    snap = _snapshot({'BTC': 1, 'ETH': 2})
+    v = feed.update(snap)
+    assert v == feed.base + 1
+    assert feed.update(snap) == v
+    # Uno nuevo con las mismas filas tampoco avanza la versión
+    assert feed.update(_snapshot({'BTC': 1, 'ETH': 2})) == v
+
+
+def test_delta_since_returns_only_changed_symbols():
+    feed = PriceFeed(['BTC', 'ETH', 'SOL'])
+    v1 = feed.update(_snapshot({'BTC': 1, 'ETH': 2, 'SOL': 3}))
+    v2 = feed.update(_snapshot({'BTC': 1, 'ETH': 5, 'SOL': 3}))
+    v3 = feed.update(_snapshot({'BTC': 1, 'ETH': 5}))
+
+    d = feed.delta(v2)
+    assert d == {'version': v3, 'full': False, 'data': {}, 'removed': ['SOL']}
+    d = feed.delta(v1)
+    assert d['full'] is False
+    assert set(d['data']) == {'ETH'} and d['data']['ETH']['price'] == 5.0
+    assert d['removed'] == ['SOL']
+    assert feed.delta(v3) == {'version': v3, 'full': False, 'data': {}, 'removed': []}
+
+
+@pytest.mark.parametrize('since', ['foreign', 'future', 'evicted'])
+def test_delta_falls_back_to_full(since):
+    feed = PriceFeed(['BTC'], history=2)
+    versions = [feed.update(_snapshot({'BTC': p})) for p in (1, 2, 3, 4)]
+    since = {
+        'foreign': feed.base - 1,          # otra instancia
+        'future': versions[-1] + 1,
+        'evicted': versions[0],            # ya salió del historial
+    }[since]
+    d = feed.delta(since)
+    assert d['full'] is True
+    assert d['version'] == versions[-1]
+    assert d['data'] == {'BTC': feed.rows['BTC']}
+
+
+def test_older_snapshot_is_ignored():
+    feed = PriceFeed(['BTC'])
+    old = _snapshot({'BTC': 1})
+    new = _snapshot({'BTC': 2})
+    v = feed.update(new)
+    # La request que leyó `old` antes del refresh llega tarde
+    assert feed.update(old) == v
+    assert feed.rows['BTC']['price'] == 2.0
+    assert feed.delta(v)['data'] == {}
+
+
+def test_endpoint_serves_deltas(api, monkeypatch):
+    monkeypatch.setattr(prices, 'feed', PriceFeed(prices.SYMBOLS))
+    snap = {'snap': _snapshot({'BTC': 1, 'ETH': 2})}
+    monkeypatch.setattr(tickers, 'get_snapshot', lambda *a, **kw: snap['snap'])
+
+    status, headers, body = api('GET', '/api/prices')
+    assert status == 200
+    assert json.loads(body)['BTC']['price'] == 1.0
+    v1 = int(headers['X-Price-Version'])
+
+    snap['snap'] = _snapshot({'BTC': 1, 'ETH': 3})
+    status, headers, body = api('GET', f'/api/prices?since={v1}')
+    delta = json.loads(body)
+    assert status == 200
+    assert delta['full'] is False and set(delta['data']) == {'ETH'}
+    assert int(headers['X-Price-Version']) == delta['version'] == v1 + 1
+
+    status, _, body = api('GET', '/api/prices?since=0')
+    assert status == 200 and json.loads(body)['full'] is True
+
+    status, _, _ = api('GET', '/api/prices?since=abc')
+    assert status == 400
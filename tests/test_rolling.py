@@ -0,0 +1,61 @@
+import operator
+import random
+
+import pytest
+
+from api._core import rolling
+from api._core.rolling import MonotonicWindow, RollingStats
+from bench import fixtures
+
+
+def _brute(xs, k):
+    for i in range(k - 1, len(xs)):
+        w = xs[i - k + 1:i + 1]
+        m = sum(w) / k
+        yield i, max(w), min(w), m, (sum((v - m) ** 2 for v in w) / k) ** 0.5
+
+
+def _series(seed, n):
+    r = random.Random(seed)
+    if seed % 3 == 0:
+        return [r.choice([1.0, 2.0, 3.0]) for _ in range(n)]  # empates y ventanas planas (~sqrt(eps))
+    return fixtures.closes(n, seed)
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+@pytest.mark.parametrize('seed', range(6))
+def test_rolling_series_match_brute_force(monkeypatch, vectorized, seed):
+    monkeypatch.setattr(rolling, 'NUMPY_MIN_LEN', 0 if vectorized else 10 ** 9)
+    xs = _series(seed, 700)
+    for k in (1, 3, 14, 20, 300):
+        mx, mn = rolling.rolling_max(xs, k), rolling.rolling_min(xs, k)
+        mu, sd = rolling.rolling_mean_std(xs, k)
+        for i, hi, lo, m, s in _brute(xs, k):
+            assert (mx[i], mn[i]) == (hi, lo)
+            assert mu[i] == pytest.approx(m, rel=1e-12)
+            # La recurrencia de RollingStats deja ruido en ventanas planas (~sqrt(eps))
+            assert sd[i] == pytest.approx(s, rel=1e-9, abs=1e-7 * m)
+            if vectorized and hi == lo:
+                assert sd[i] == 0.0
+
+
+def test_monotonic_window_takes_the_comparison():
+    xs = _series(1, 200)
+    hi, lo = MonotonicWindow(5, operator.gt), MonotonicWindow(5, operator.lt)
+    for i, x in enumerate(xs):
+        w = xs[max(0, i - 4):i + 1]
+        assert (hi.push(x), lo.push(x)) == (max(w), min(w))
+    assert hi.full and hi.value == max(xs[-5:])
+
+
+def test_from_window_matches_pushing_the_window():
+    xs = _series(2, 137)
+    for k in (1, 20, 137, 200):
+        st = RollingStats.from_window(xs, k)
+        pushed = RollingStats(k).warm(xs[-k:])
+        assert st.mean == pytest.approx(pushed.mean, rel=1e-12)
+        assert st.std == pytest.approx(pushed.std, rel=1e-9)
+        assert rolling.window_stats(xs, k).mean == st.mean
+        # Sigue funcionando como ventana deslizante
+        st.push(xs[0])
+        assert st.mean == pytest.approx(RollingStats(k).warm([*xs, xs[0]][-k:]).mean, rel=1e-12)
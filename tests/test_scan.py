@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from api import scan
+from api._core import kline_cache
+from api._core.candles import CandleSeries
+from api._core.kline_cache import KlineCache, KlineEntry
+
+
+class Budget:
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.charged = 0
+
+    def acquire(self, weight, timeout=None):
+        if self.ok:
+            self.charged += weight
+        return self.ok
+
+
+@pytest.fixture
+def cache(monkeypatch, fake_klines):
+    fake = fake_klines()
+    c = KlineCache(ttl=5, grace=10)
+    monkeypatch.setattr(kline_cache, 'cache', c)
+    c.fake = fake
+    return c
+
+
+def _store(cache, symbol, age):
+    rows = cache.fake.rows[-100:]
+    cache._store((symbol, '1m'), KlineEntry(CandleSeries.from_klines(rows), 'futures', time.time() - age))
+
+
+@pytest.mark.parametrize('age,charged', [(None, scan.KLINE_WEIGHT), (1, 0), (6, scan.KLINE_WEIGHT),
+                                         (30, scan.KLINE_WEIGHT)])
+def test_only_fresh_entries_are_free(monkeypatch, cache, age, charged):
+    """miss, stale (revalidación de fondo) y vencida salen a Binance: pesan"""
+    budget = Budget()
+    monkeypatch.setattr(scan, '_budget', budget)
+    if age is not None:
+        _store(cache, 'BTC', age)
+    pair, series, source, error = scan._fetch({'symbol': 'BTC'}, '1m')
+    assert error is None and len(series) == 100
+    assert budget.charged == charged
+
+
+def test_pair_is_skipped_without_budget(monkeypatch, cache):
+    monkeypatch.setattr(scan, '_budget', Budget(ok=False))
+    assert scan._fetch({'symbol': 'BTC'}, '1m')[3] == 'Sin presupuesto de peso'
+    assert cache.fake.calls == []
+    # Una entrada fresh se sirve igual
+    _store(cache, 'BTC', 0)
+    assert scan._fetch({'symbol': 'BTC'}, '1m')[3] is None
+
+
+@pytest.mark.parametrize('limit', ['0', '-5'])
+def test_limit_below_one_is_rejected(api, limit):
+    status, _, _ = api('GET', f'/api/scan?limit={limit}')
+    assert status == 400
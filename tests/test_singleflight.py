@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from api._core import singleflight
+from api._core.kline_cache import KlineCache
+
+
+def _wait_coalesced(group, n):
+    for _ in range(1000):
+        if group.stats()['coalesced'] >= n:
+            return
+        threading.Event().wait(0.005)
+    raise AssertionError('los seguidores no se sumaron al vuelo')
+
+
+def _followers(group, key, fn, n):
+    results = [None] * n
+
+    def follow(i):
+        try:
+            results[i] = group.do(key, fn)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=follow, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def test_concurrent_callers_share_one_call():
+    group = singleflight.Group('test')
+    entered, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        entered.set()
+        release.wait(5)
+        return 'rows'
+
+    leader = []
+    t0 = threading.Thread(target=lambda: leader.append(group.do('k', fetch)))
+    t0.start()
+    entered.wait(5)
+    threads, results = _followers(group, 'k', fetch, 4)
+    _wait_coalesced(group, 4)
+    release.set()
+    for t in [t0, *threads]:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert leader == [('rows', True)]
+    assert results == [('rows', False)] * 4
+    assert group.stats() == {'leaders': 1, 'coalesced': 4, 'errors': 0, 'errors_shared': 0, 'in_flight': 0}
+
+
+def test_error_reaches_every_waiter():
+    group = singleflight.Group('test')
+    entered, release = threading.Event(), threading.Event()
+
+    def fetch():
+        entered.set()
+        release.wait(5)
+        raise ValueError('upstream caído')
+
+    errors = []
+
+    def lead():
+        try:
+            group.do('k', fetch)
+        except ValueError as e:
+            errors.append(e)
+
+    t0 = threading.Thread(target=lead)
+    t0.start()
+    entered.wait(5)
+    threads, results = _followers(group, 'k', fetch, 2)
+    _wait_coalesced(group, 2)
+    release.set()
+    for t in [t0, *threads]:
+        t.join(5)
+
+    assert len(errors) == 1
+    assert results == [errors[0], errors[0]]
+    assert group.stats()['errors_shared'] == 2
+
+
+def test_key_is_released_after_the_call():
+    group = singleflight.Group('test')
+    assert group.do('k', lambda: 1) == (1, True)
+    assert group.do('k', lambda: 2) == (2, True)
+    with pytest.raises(KeyError):
+        group.do('k', {}.__getitem__, 'x')
+    assert group.do('k', lambda: 3) == (3, True)
+
+
+def test_shared_smaller_flight_is_requeried(fake_klines):
+    """Un vuelo compartido con limit=2 no alcanza para limit=100: se vuelve a pedir"""
+    entered, release = threading.Event(), threading.Event()
+
+    def before(query):
+        if len(fake.calls) == 1:
+            entered.set()
+            release.wait(5)
+
+    fake = fake_klines(before=before)
+    cache = KlineCache(grace=0)
+    out = {}
+    small = threading.Thread(target=lambda: out.setdefault('small', cache.get('BTC', '1m', 2)))
+    small.start()
+    entered.wait(5)
+    big = threading.Thread(target=lambda: out.setdefault('big', cache.get('BTC', '1m', 100)))
+    big.start()
+    for _ in range(1000):
+        if cache._flights.stats()['coalesced']:
+            break
+        time.sleep(0.005)
+    release.set()
+    small.join(5)
+    big.join(5)
+
+    series, source = out['big']
+    assert source == 'futures'
+    assert len(out['small'][0]) == 2
+    assert len(series) == 100
+    assert list(series['t']) == [r[0] for r in fake.rows[-100:]]
+    assert [q['limit'] for q in fake.calls] == ['2', '100']
@@ -0,0 +1,141 @@
+"""Hub de streaming y /api/stream contra bench/fake_binance.py (sin red)."""
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+import server
+from api._core import binance, kline_cache, tickers
+from api._core.hosts import HostRegistry
+from api._core.stream_hub import Hub, Subscriber
+from api._core.upstream import UpstreamClient
+from bench import fake_binance
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Binance falso local con cachés y salud de hosts vacías"""
+    srv = fake_binance.start()
+    client = UpstreamClient(override=srv.url)
+    monkeypatch.setattr(binance, 'client', client)
+    monkeypatch.setattr(binance, 'health', HostRegistry())
+    monkeypatch.setattr(tickers, '_snapshots', {})
+    monkeypatch.setattr(kline_cache, 'cache', kline_cache.KlineCache())
+    yield srv
+    client.close()
+    srv.shutdown()
+    srv.server_close()
+
+
+def _collect(sub, want, timeout=5.0):
+    """Drenar `sub` hasta ver todas las claves de `want` {(evento, clave)}"""
+    seen = {}
+    deadline = time.monotonic() + timeout
+    while not want <= seen.keys() and time.monotonic() < deadline:
+        for event, key, data in sub.drain(0.1):
+            seen[(event, key)] = data
+    return seen
+
+
+def test_subscriber_conflates_per_key():
+    sub = Subscriber(['BTC'], [])
+    for price in (1, 2, 3):
+        sub.push('ticker', 'BTC', {'price': price})
+    sub.push('ticker', 'ETH', {'price': 9})
+    assert sub.drain(0) == [('ticker', 'BTC', {'price': 3}), ('ticker', 'ETH', {'price': 9})]
+    assert sub.conflated == 2
+    assert sub.drain(0) == []
+
+
+def test_hub_publishes_tickers_and_candles(upstream):
+    hub = Hub(poll_interval=0.05, idle_stop=0.2)
+    sub = hub.subscribe(['BTC', 'ETH'], [('BTC', '1m')])
+    want = {('ticker', 'BTC'), ('ticker', 'ETH'), ('candle', ('BTC', '1m'))}
+    seen = _collect(sub, want)
+    assert want <= seen.keys()
+    # Nada fuera del filtro
+    assert seen.keys() == want
+
+    snap = tickers.get_snapshot('futures')
+    assert seen[('ticker', 'BTC')]['price'] == snap.get('BTCUSDT').price
+    assert seen[('ticker', 'BTC')]['symbol'] == 'BTC'
+    candle = seen[('candle', ('BTC', '1m'))]
+    series, source = kline_cache.get_klines('BTC', '1m', 2)
+    assert candle['t'] == series[-1]['t'] and source == candle['source'] == 'futures'
+
+    # Un suscriptor nuevo recibe el último estado sin esperar al poller
+    late = hub.subscribe(['ETH'], [])
+    assert late.drain(0) == [('ticker', 'ETH', seen[('ticker', 'ETH')])]
+
+    hub.unsubscribe(sub)
+    hub.unsubscribe(late)
+    deadline = time.monotonic() + 5
+    while hub.stats()['running'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not hub.stats()['running']
+
+
+def test_many_subscribers_share_one_poller(upstream):
+    hub = Hub(poll_interval=0.05, idle_stop=0.2)
+    subs = [hub.subscribe(['BTC'], []) for _ in range(20)]
+    for sub in subs:
+        assert ('ticker', 'BTC') in _collect(sub, {('ticker', 'BTC')})
+    time.sleep(0.3)
+    # El snapshot dura tickers.TTL: 20 clientes no son 20 fetches
+    assert upstream.hits.get('/fapi/v1/ticker/24hr', 0) <= 2
+    for sub in subs:
+        hub.unsubscribe(sub)
+
+
+def test_poll_errors_are_counted_not_raised(upstream, monkeypatch):
+    def down(*args, **kwargs):
+        raise OSError('down')
+
+    monkeypatch.setattr(tickers, 'get_snapshot', down)
+    monkeypatch.setattr(kline_cache, 'get_klines', down)
+    hub = Hub()
+    hub._subs.add(Subscriber(['BTC'], [('BTC', '1m')]))
+    hub.poll_once()
+    assert hub.stats()['errors'] == 2
+
+
+def _sse_events(port, path, n, timeout=5.0):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        conn.request('GET', path)
+        resp = conn.getresponse()
+        assert resp.status == 200
+        assert resp.getheader('Content-Type') == 'text/event-stream'
+        events, event = [], None
+        while len(events) < n:
+            line = resp.fp.readline().decode().rstrip('\n')
+            if line.startswith('event: '):
+                event = line[7:]
+            elif line.startswith('data: '):
+                events.append((event, json.loads(line[6:])))
+        return events
+    finally:
+        conn.close()
+
+
+def test_sse_endpoint_streams_events(upstream, monkeypatch):
+    monkeypatch.setattr(server, 'hub', Hub(poll_interval=0.05, idle_stop=0.2))
+    srv = server.make_server(port=0)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        port = srv.server_address[1]
+        events = _sse_events(port, '/api/stream?symbols=BTC&candles=ETH:1m', 2)
+        assert sorted(e for e, _ in events) == ['candle', 'ticker']
+        data = dict(events)
+        assert data['ticker']['symbol'] == 'BTC'
+        assert (data['candle']['symbol'], data['candle']['interval']) == ('ETH', '1m')
+
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        conn.request('GET', '/api/stream?candles=BTC:7m')
+        assert conn.getresponse().status == 400
+        conn.close()
+    finally:
+        srv.shutdown()
+        srv.server_close()
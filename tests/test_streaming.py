@@ -0,0 +1,68 @@
+"""streaming.py vela a vela y el estado por ventana de kline_cache dan los
+mismos floats que las fórmulas base."""
+import pytest
+
+from api import analyze as A
+from api._core.candles import CandleSeries
+from api._core.kline_cache import KlineCache
+from api._core.streaming import StreamingATR, StreamingEMA, StreamingMACD, StreamingRSI
+from bench import fixtures
+
+import baseline_indicators as base
+
+
+def _indicators(closes, candles):
+    return {
+        'rsi14': (base.rsi(closes, 14), lambda x: x.rsi(14)),
+        'rsi7': (base.rsi(closes, 7), lambda x: x.rsi(7)),
+        'ema9': (base.ema(closes, 9), lambda x: x.ema(9)),
+        'ema50': (base.ema(closes, 50), lambda x: x.ema(50)),
+        'macd': (base.macd(closes), lambda x: x.macd()),
+        'macd_fast': (base.macd(closes, 6, 13, 5), lambda x: x.macd(6, 13, 5)),
+        'atr': (base.atr(candles, 14), lambda x: x.atr(14)),
+    }
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_streaming_matches_baseline_after_each_candle(seed):
+    candles = fixtures.candles(120, seed)
+    objs = {
+        'ema9': (StreamingEMA(9), lambda p: base.ema([c['c'] for c in p], 9)),
+        'rsi14': (StreamingRSI(14), lambda p: base.rsi([c['c'] for c in p], 14)),
+        'atr': (StreamingATR(14), lambda p: base.atr(p, 14)),
+        'macd': (StreamingMACD(), lambda p: base.macd([c['c'] for c in p])),
+        'macd_fast': (StreamingMACD(6, 13, 5), lambda p: base.macd([c['c'] for c in p], 6, 13, 5)),
+    }
+    for i, candle in enumerate(candles):
+        for name, (obj, ref) in objs.items():
+            # peek() con la vela abierta no toca el estado
+            assert obj.peek(candle) == ref(candles[:i + 1]), (i, name)
+            obj.update(candle)
+            assert obj.value == ref(candles[:i + 1]), (i, name)
+
+
+def test_window_state_matches_baseline_across_ticks():
+    """Ventanas de 100 velas que se corren de a una, con 3 ticks de la vela abierta"""
+    rows = fixtures.kline_rows(300, 7)
+    cache = KlineCache()
+    for end in range(2, len(rows) + 1):
+        for tick in range(3):
+            last = list(rows[end - 1])
+            last[4] = repr(float(last[4]) * (1 + 0.001 * tick))
+            window = CandleSeries.from_klines([*rows[max(0, end - 100):end - 1], last])
+            candles = list(window)
+            closes = [c['c'] for c in candles]
+            ctx = A.IndicatorContext(window, cache.window('BTC', '15m', window))
+            for name, (expected, get) in _indicators(closes, candles).items():
+                assert get(ctx) == expected, (end, tick, name)
+
+
+def test_window_state_is_reused_until_a_candle_closes(fake_klines):
+    fake = fake_klines()
+    cache = KlineCache()
+    series, _ = cache.get('BTC', '1m', 100)
+    state = cache.window('BTC', '1m', series)
+    assert cache.window('BTC', '1m', series) is state
+    # La ventana corrida una vela (cerró la abierta) arma estado nuevo
+    moved = CandleSeries.from_klines(fake.rows[-101:-1])
+    assert cache.window('BTC', '1m', moved) is not state
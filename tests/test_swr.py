@@ -0,0 +1,116 @@
+"""Stale-while-revalidate: estados, un refresh de fondo por clave y la caché
+de klines sirviendo stale solo mientras la vela cacheada sigue abierta."""
+import threading
+import time
+
+from api._core import swr
+from api._core.candles import CandleSeries
+from api._core.kline_cache import KlineCache, KlineEntry
+
+from conftest import IV
+
+
+def test_state_windows():
+    assert swr.state(0, 5, 10) == swr.FRESH
+    assert swr.state(4.99, 5, 10) == swr.FRESH
+    assert swr.state(5, 5, 10) == swr.STALE
+    assert swr.state(14.99, 5, 10) == swr.STALE
+    assert swr.state(15, 5, 10) == swr.EXPIRED
+    # grace=0 apaga la ventana stale
+    assert swr.state(5, 5, 0) == swr.EXPIRED
+
+
+def test_revalidator_runs_one_refresh_per_key():
+    rv = swr.Revalidator('test')
+    gate, done = threading.Event(), threading.Event()
+
+    def slow():
+        gate.wait(5)
+        done.set()
+
+    assert rv.trigger('a', slow) is True
+    assert rv.trigger('a', slow) is False
+    assert rv.stats()['running'] == 1
+    gate.set()
+    assert done.wait(5)
+    for _ in range(1000):
+        if rv.stats()['running'] == 0:
+            break
+        time.sleep(0.005)
+    assert rv.trigger('a', lambda: None) is True
+
+
+def test_revalidator_counts_failures():
+    rv = swr.Revalidator('test')
+    finished = threading.Event()
+
+    def boom():
+        finished.set()
+        raise OSError('down')
+
+    rv.trigger('a', boom)
+    assert finished.wait(5)
+    for _ in range(1000):
+        if rv.stats()['failed'] == 1 and rv.stats()['running'] == 0:
+            break
+        time.sleep(0.005)
+    assert rv.stats() == {'started': 1, 'failed': 1, 'running': 0}
+
+
+def _entry(fake, n, refreshed_at, drop_last=False):
+    rows = fake.rows[:-1] if drop_last else fake.rows
+    return KlineEntry(CandleSeries.from_klines(rows[-n:]), 'futures', refreshed_at)
+
+
+def test_stale_entry_is_served_while_the_candle_is_open(fake_klines):
+    fake = fake_klines()
+    cache = KlineCache(ttl=5, grace=10)
+    cache._store(('BTC', '1m'), _entry(fake, 100, time.time() - 1))
+    assert cache.peek('BTC', '1m') == swr.FRESH
+    cache._store(('BTC', '1m'), _entry(fake, 100, time.time() - 6))
+    assert cache.peek('BTC', '1m') == swr.STALE
+    cache._store(('BTC', '1m'), _entry(fake, 100, time.time() - 16))
+    assert cache.peek('BTC', '1m') == swr.EXPIRED
+
+
+def test_stale_get_returns_cached_and_refreshes_in_background(fake_klines):
+    gate = threading.Event()
+    fake = fake_klines(before=lambda query: gate.wait(5))
+    cache = KlineCache(ttl=5, grace=10)
+    cache._store(('BTC', '1m'), _entry(fake, 100, time.time() - 6))
+
+    # No espera al upstream (que está bloqueado en `gate`)
+    series, source = cache.get('BTC', '1m', 100)
+    assert len(series) == 100 and source == 'futures'
+    assert cache.stats()['stale_hits'] == 1
+    gate.set()
+    for _ in range(1000):
+        if cache.peek('BTC', '1m') == swr.FRESH:
+            break
+        time.sleep(0.005)
+    assert cache.peek('BTC', '1m') == swr.FRESH
+    assert len(fake.calls) == 1
+
+
+def test_stale_entry_expires_once_a_new_candle_opens(fake_klines):
+    fake = fake_klines()
+    cache = KlineCache(ttl=5, grace=10)
+    # Dentro de la ventana stale, pero la última vela cacheada ya cerró
+    cache._store(('BTC', '1m'), _entry(fake, 100, time.time() - 6, drop_last=True))
+    assert cache.peek('BTC', '1m') == swr.EXPIRED
+
+    # get() no la sirve: espera el refresh de la cola, que trae la vela actual
+    series, _ = cache.get('BTC', '1m', 100)
+    assert series['t'][-1] == fake.rows[-1][0]
+    assert len(series) == 100
+    assert len(fake.calls) == 1 and fake.calls[0]['startTime'] == str(fake.rows[-2][0])
+
+
+def test_missing_entry_is_not_servable(fake_klines):
+    fake = fake_klines()
+    cache = KlineCache()
+    assert cache.peek('BTC', '1m') is None
+    cache._store(('BTC', '1m'), _entry(fake, 50, time.time()))
+    assert cache.peek('BTC', '1m', 100) is None
+    assert cache.peek('BTC', '1m', 50) == swr.FRESH
+    assert fake.rows[-1][0] - fake.rows[-2][0] == IV